@@ -1,8 +1,7 @@
+import mimetypes
 import os
-import boto3
-from botocore.exceptions import NoCredentialsError
+import threading
 from dotenv import load_dotenv
-from urllib.parse import urlparse
 
 # .env faylidagi o'zgaruvchilarni yuklash
 load_dotenv()
@@ -12,78 +11,200 @@ _s3_client = None
 _bucket_name = None
 _endpoint_url = None
 _base_url = None
+_bucket_checked = False
+
+# Client startupda fon threadida (warm_up) va yuklash paytida yaratilishi mumkin
+_client_lock = threading.Lock()
+
+# Kichik fayllar (stikerlar, ovozli xabarlar, thumbnaillar) bitta put_object bilan yuklanadi.
+# Ularda vaqtni fayl hajmi emas, so'rov kechikishi oladi - shuning uchun parallel yuboriladi
+SMALL_OBJECT_MAX_BYTES = int(os.getenv('B2_SMALL_OBJECT_MAX_BYTES', str(8 * 1024 * 1024)))
+
+# Bir vaqtda yuboriladigan kichik yuklashlar soni (exporter dagi thread pool hajmi)
+SMALL_UPLOAD_CONCURRENCY = int(os.getenv('B2_SMALL_UPLOAD_CONCURRENCY', '16'))
+
+# Katta fayllar uchun multipart sozlamalari (upload_file / TransferConfig)
+MULTIPART_THRESHOLD_BYTES = 64 * 1024 * 1024
+MULTIPART_CHUNK_BYTES = 16 * 1024 * 1024
+MULTIPART_CONCURRENCY = int(os.getenv('B2_MULTIPART_CONCURRENCY', '8'))
+
+# HTTP ulanishlar pooli: barcha parallel put_object lar va bitta multipart yuklash sig'ishi kerak,
+# aks holda botocore ortiqcha ulanishlarni yopib, har so'rovda yangi TLS handshake qiladi
+S3_MAX_POOL_CONNECTIONS = SMALL_UPLOAD_CONCURRENCY + MULTIPART_CONCURRENCY
+
+_transfer_config = None
+
+def _s3_settings():
+    """.env dan B2 sozlamalarini o'qish (yetishmasa ValueError)"""
+    endpoint_url = os.getenv('B2_ENDPOINT_URL')
+    access_key = os.getenv('B2_ACCESS_KEY_ID')
+    secret_key = os.getenv('B2_SECRET_ACCESS_KEY')
+    bucket_name = os.getenv('B2_BUCKET_NAME')
+    
+    # Sozlamalarni tekshirish
+    missing = []
+    if not endpoint_url:
+        missing.append('B2_ENDPOINT_URL')
+    if not access_key:
+        missing.append('B2_ACCESS_KEY_ID')
+    if not secret_key:
+        missing.append('B2_SECRET_ACCESS_KEY')
+    if not bucket_name:
+        missing.append('B2_BUCKET_NAME')
+    
+    if missing:
+        error_msg = f"B2 sozlamalari to'liq emas. Quyidagilar topilmadi: {', '.join(missing)}"
+        print(f"   ❌ {error_msg}")
+        raise ValueError(error_msg)
+    
+    return endpoint_url, access_key, secret_key, bucket_name
+
+def _public_base_url(endpoint_url, bucket_name):
+    """Base URL ni yaratish (Backblaze B2 uchun)"""
+    # Avval custom public URL ni tekshirish (.env dan)
+    custom_public_url = os.getenv('B2_PUBLIC_URL_BASE')
+    if custom_public_url:
+        return custom_public_url.rstrip('/')
+    
+    # Backblaze B2 public URL formati: https://{bucket}.s3.{region}.backblazeb2.com/{key}
+    # Endpoint URL odatda: https://s3.{region}.backblazeb2.com
+    # Public URL: https://{bucket}.s3.{region}.backblazeb2.com
+    if 's3.' in endpoint_url:
+        # Endpoint: https://s3.us-west-000.backblazeb2.com
+        # Public: https://{bucket}.s3.us-west-000.backblazeb2.com
+        return endpoint_url.replace('s3.', f'{bucket_name}.s3.')
+    # Fallback: oddiy endpoint dan foydalanish
+    return endpoint_url.replace('/b2api/v1', '').rstrip('/')
 
 def _get_s3_client():
-    """S3 client ni yaratadi yoki cache qilinganini qaytaradi"""
+    """S3 client ni yaratadi yoki cache qilinganini qaytaradi
+
+    boto3 faqat shu yerda import qilinadi - S3 ishlatilmaydigan ishga tushirishlarda
+    (metadata export, benchmark) uning import vaqti sarflanmaydi. Bucket tekshiruvi
+    (head_bucket) alohida: check_bucket() / warm_up().
+    """
     global _s3_client, _bucket_name, _endpoint_url, _base_url
     
-    if _s3_client is None:
-        endpoint_url = os.getenv('B2_ENDPOINT_URL')
-        access_key = os.getenv('B2_ACCESS_KEY_ID')
-        secret_key = os.getenv('B2_SECRET_ACCESS_KEY')
-        bucket_name = os.getenv('B2_BUCKET_NAME')
-        
-        # Sozlamalarni tekshirish
-        missing = []
-        if not endpoint_url:
-            missing.append('B2_ENDPOINT_URL')
-        if not access_key:
-            missing.append('B2_ACCESS_KEY_ID')
-        if not secret_key:
-            missing.append('B2_SECRET_ACCESS_KEY')
-        if not bucket_name:
-            missing.append('B2_BUCKET_NAME')
-        
-        if missing:
-            error_msg = f"B2 sozlamalari to'liq emas. Quyidagilar topilmadi: {', '.join(missing)}"
-            print(f"   ❌ {error_msg}")
-            raise ValueError(error_msg)
-        
-        try:
-            _s3_client = boto3.client(
-                service_name='s3',
-                endpoint_url=endpoint_url,
-                aws_access_key_id=access_key,
-                aws_secret_access_key=secret_key
-            )
-            _bucket_name = bucket_name
-            _endpoint_url = endpoint_url
-            
-            # Base URL ni yaratish (Backblaze B2 uchun)
-            # Avval custom public URL ni tekshirish (.env dan)
-            custom_public_url = os.getenv('B2_PUBLIC_URL_BASE')
-            if custom_public_url:
-                _base_url = custom_public_url.rstrip('/')
-            else:
-                # Endpoint URL dan domain ni olish
-                parsed = urlparse(endpoint_url)
-                # Backblaze B2 public URL formati: https://{bucket}.s3.{region}.backblazeb2.com/{key}
-                # Endpoint URL odatda: https://s3.{region}.backblazeb2.com
-                # Public URL: https://{bucket}.s3.{region}.backblazeb2.com
-                if 's3.' in endpoint_url:
-                    # Endpoint: https://s3.us-west-000.backblazeb2.com
-                    # Public: https://{bucket}.s3.us-west-000.backblazeb2.com
-                    _base_url = endpoint_url.replace('s3.', f'{bucket_name}.s3.')
-                else:
-                    # Fallback: oddiy endpoint dan foydalanish
-                    _base_url = endpoint_url.replace('/b2api/v1', '').rstrip('/')
+    if _s3_client is not None:
+        return _s3_client, _bucket_name, _base_url
+    
+    with _client_lock:
+        if _s3_client is None:
+            endpoint_url, access_key, secret_key, bucket_name = _s3_settings()
             
-            # S3 client ni test qilish (bucket mavjudligini tekshirish)
             try:
-                _s3_client.head_bucket(Bucket=bucket_name)
-                print(f"   ✅ S3 client muvaffaqiyatli yaratildi (Bucket: {bucket_name})")
-            except Exception as test_error:
-                print(f"   ⚠️ Bucket tekshiruvida xato: {test_error}")
-                print(f"   💡 Bucket nomi va kalitlarni tekshiring.")
+                import boto3
+                from botocore.config import Config
                 
-        except Exception as e:
-            error_msg = f"S3 client yaratishda xato: {e}"
-            print(f"   ❌ {error_msg}")
-            raise ValueError(error_msg)
+                client = boto3.client(
+                    service_name='s3',
+                    endpoint_url=endpoint_url,
+                    aws_access_key_id=access_key,
+                    aws_secret_access_key=secret_key,
+                    config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS, tcp_keepalive=True),
+                )
+            except Exception as e:
+                error_msg = f"S3 client yaratishda xato: {e}"
+                print(f"   ❌ {error_msg}")
+                raise ValueError(error_msg)
+            
+            _bucket_name = bucket_name
+            _endpoint_url = endpoint_url
+            _base_url = _public_base_url(endpoint_url, bucket_name)
+            _s3_client = client
     
     return _s3_client, _bucket_name, _base_url
 
-def upload_to_b2(file_path, object_name=None, chat_folder=None, max_retries=3):
+def _get_transfer_config():
+    """Katta fayllar uchun TransferConfig (multipart, bo'laklar parallel)"""
+    global _transfer_config
+    if _transfer_config is None:
+        from boto3.s3.transfer import TransferConfig
+        
+        _transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_THRESHOLD_BYTES,
+            multipart_chunksize=MULTIPART_CHUNK_BYTES,
+            max_concurrency=MULTIPART_CONCURRENCY,
+        )
+    return _transfer_config
+
+def is_small_object(file_path):
+    """Fayl put_object yo'li bilan yuklanadimi"""
+    try:
+        return os.path.getsize(file_path) <= SMALL_OBJECT_MAX_BYTES
+    except OSError:
+        return False
+
+def content_type(object_name):
+    """Object uchun Content-Type - busiz brauzer index.html, .js (service worker) va media ni ochmaydi"""
+    guessed = mimetypes.guess_type(object_name)[0] or "application/octet-stream"
+    if guessed.startswith("text/") or guessed in ("application/javascript", "application/json"):
+        guessed += "; charset=utf-8"
+    return guessed
+
+def checksum_args(checksum, multipart=False):
+    """Yuklab olishda hisoblangan xeshlar (hashing.FileDigest) uchun so'rov parametrlari
+
+    SHA-256 object metadata siga (x-amz-meta-sha256) yoziladi. CRC32 put_object da
+    ChecksumCRC32 sifatida yuboriladi - server faylni Telegram dan kelgan baytlar bilan
+    solishtiradi. Multipart da checksum qismlar bo'yicha hisoblanadi, shuning uchun faqat metadata.
+    """
+    if checksum is None:
+        return {}
+    args = {"Metadata": {"sha256": checksum.sha256}}
+    if not multipart:
+        args["ChecksumCRC32"] = checksum.crc32_b64
+    return args
+
+def _put_small_object(s3, bucket_name, object_name, file_path, checksum=None):
+    """Kichik faylni bitta PUT bilan yuklash
+    
+    upload_file har chaqiruvda TransferManager va thread lar yaratadi, keyin esa
+    head_object qo'shimcha so'rov yuboriladi. Bu yerda 200 javob va ETag yetarli:
+    botocore so'rov tanasining checksumini yuboradi (checksum berilsa - yuklab olishdagi
+    CRC32 ni), server uni tekshiradi.
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    response = s3.put_object(
+        Bucket=bucket_name, Key=object_name, Body=data, ContentType=content_type(object_name),
+        **checksum_args(checksum),
+    )
+    if not response.get('ETag'):
+        raise Exception("Yuklash tekshiruvida xato: javobda ETag yo'q")
+    return len(data)
+
+def check_bucket():
+    """Bucket mavjudligini bir marta tekshirish (head_bucket)"""
+    global _bucket_checked
+    
+    s3, bucket_name, _ = _get_s3_client()
+    if _bucket_checked:
+        return True
+    
+    # S3 client ni test qilish (bucket mavjudligini tekshirish)
+    try:
+        s3.head_bucket(Bucket=bucket_name)
+        print(f"   ✅ S3 client muvaffaqiyatli yaratildi (Bucket: {bucket_name})")
+        _bucket_checked = True
+        return True
+    except Exception as test_error:
+        print(f"   ⚠️ Bucket tekshiruvida xato: {test_error}")
+        print(f"   💡 Bucket nomi va kalitlarni tekshiring.")
+        return False
+
+def warm_up():
+    """S3 client yaratish va bucket tekshiruvi - startupda Telegram ulanishi bilan parallel chaqiriladi
+
+    Returns:
+        bool: S3 tayyor bo'lsa True
+    """
+    try:
+        return check_bucket()
+    except ValueError:
+        return False
+
+def upload_to_b2(file_path, object_name=None, chat_folder=None, max_retries=3, metrics=None, checksum=None):
     """
     Faylni Backblaze B2 (S3 API) ga yuklash funksiyasi (retry bilan)
     
@@ -92,11 +213,14 @@ def upload_to_b2(file_path, object_name=None, chat_folder=None, max_retries=3):
         object_name: S3 da saqlash uchun object nomi (ixtiyoriy)
         chat_folder: Chat papkasi nomi (ixtiyoriy, object_name oldiga qo'shiladi)
         max_retries: Maksimal qayta urinishlar soni
+        metrics: ExportMetrics (ixtiyoriy) - yuklash vaqti, hajmi va retry lar uchun
+        checksum: hashing.FileDigest (ixtiyoriy) - yuklab olishda hisoblangan xeshlar
     
     Returns:
         tuple: (success: bool, url: str yoki None)
     """
     import time
+    from botocore.exceptions import NoCredentialsError
     
     # Agar object_name berilmagan bo'lsa, faylning o'z nomini ishlatamiz
     if object_name is None:
@@ -106,8 +230,12 @@ def upload_to_b2(file_path, object_name=None, chat_folder=None, max_retries=3):
     if chat_folder and not object_name.startswith(chat_folder):
         object_name = f"{chat_folder}/{object_name}"
     
+    started = time.perf_counter()
+    
     # Retry mechanism
     for attempt in range(max_retries):
+        if attempt > 0 and metrics:
+            metrics.inc("upload_retries_total")
         try:
             s3, bucket_name, base_url = _get_s3_client()
             
@@ -116,21 +244,33 @@ def upload_to_b2(file_path, object_name=None, chat_folder=None, max_retries=3):
             else:
                 print(f"   🔄 Qayta urinilmoqda ({attempt + 1}/{max_retries}): {object_name}...")
             
-            # Faylni yuklash
-            s3.upload_file(file_path, bucket_name, object_name)
-            
-            # Yuklash muvaffaqiyatli bo'lganini tekshirish
-            try:
-                # Object mavjudligini tekshirish
-                s3.head_object(Bucket=bucket_name, Key=object_name)
-            except Exception as verify_error:
-                raise Exception(f"Yuklash tekshiruvida xato: {verify_error}")
+            if is_small_object(file_path):
+                # Kichik fayl: bitta put_object (ulanish pooldan qayta ishlatiladi)
+                _put_small_object(s3, bucket_name, object_name, file_path, checksum)
+            else:
+                # Katta fayl: multipart yuklash
+                s3.upload_file(
+                    file_path, bucket_name, object_name,
+                    ExtraArgs={"ContentType": content_type(object_name), **checksum_args(checksum, multipart=True)},
+                    Config=_get_transfer_config(),
+                )
+                
+                # Yuklash muvaffaqiyatli bo'lganini tekshirish
+                try:
+                    # Object mavjudligini tekshirish
+                    s3.head_object(Bucket=bucket_name, Key=object_name)
+                except Exception as verify_error:
+                    raise Exception(f"Yuklash tekshiruvida xato: {verify_error}")
             
             # Public URL ni yaratish
             # Backblaze B2 public URL formati: https://{bucket}.s3.{region}.backblazeb2.com/{key}
             # object_name allaqachon chat_folder/{folder}/{filename} formatida
             public_url = f"{base_url}/{object_name}"
             
+            if metrics:
+                metrics.observe("upload_seconds", time.perf_counter() - started)
+                metrics.inc("upload_bytes_total", os.path.getsize(file_path))
+            
             if attempt > 0:
                 print(f"   ✅ Qayta urinish muvaffaqiyatli: {object_name}")
             else:
@@ -141,16 +281,22 @@ def upload_to_b2(file_path, object_name=None, chat_folder=None, max_retries=3):
 
         except FileNotFoundError:
             print(f"   ❌ Xato: Fayl topilmadi: {file_path}")
+            if metrics:
+                metrics.inc("upload_failures_total")
             return False, None
         except NoCredentialsError:
             print("   ❌ Xato: S3 kalitlari noto'g'ri yoki topilmadi.")
             print("   💡 .env faylida B2_ACCESS_KEY_ID va B2_SECRET_ACCESS_KEY ni tekshiring.")
+            if metrics:
+                metrics.inc("upload_failures_total")
             return False, None
         except Exception as e:
             error_msg = str(e)
             if attempt == max_retries - 1:
                 print(f"   ❌ S3 ga yuklashda xato ({max_retries} marta urinildi): {error_msg}")
                 print(f"   📋 Bucket: {bucket_name}, Object: {object_name}")
+                if metrics:
+                    metrics.inc("upload_failures_total")
                 return False, None
             else:
                 print(f"   ⚠️ Xato (urinish {attempt + 1}/{max_retries}): {error_msg}")
@@ -0,0 +1,861 @@
+"""
+Offline benchmark - Telegram va S3 ga ulanmasdan exporter tezligini o'lchash
+
+Soxta Telegram client (sintetik xabarlar) va lokal S3 o'rinbosari yordamida
+TelegramExporter.export() ni to'liq ishga tushiradi va natijalarni JSON
+formatda saqlaydi. Bir xil seed va sozlamalar bilan ishga tushirilgan
+natijalarni bir-biri bilan solishtirish mumkin.
+
+Ishlatish:
+    python benchmark.py --messages 5000 --mix text=0.6,photo=0.3,video=0.1
+    python benchmark.py --compare bench_results/bench_20240120_123456.json
+"""
+
+import io
+import os
+import zlib
+import base64
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+import statistics
+from pathlib import Path
+from datetime import datetime, timedelta
+from dataclasses import dataclass, field, asdict
+from typing import Any, Optional
+
+from pyrogram.enums import MessageMediaType, ChatType
+from pyrogram.errors import FloodWait
+
+import backblaze
+import exporter
+import storage
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Cold start o'lchanadigan modullar va chegara (jarayon ishga tushishi + import, ms)
+COLD_START_MODULES = ("exporter", "main")
+COLD_START_BUDGET_MS = 2500.0
+
+# Media turlari bo'yicha standart fayl hajmlari (MB)
+DEFAULT_SIZES_MB = {
+    "photo": 0.25,
+    "video": 8.0,
+    "audio": 4.0,
+    "document": 2.0,
+    "voice": 0.1,
+    "video_note": 1.5,
+    "sticker": 0.03,
+    "animation": 1.0,
+}
+
+# Media turlari uchun fayl kengaytmalari va MIME turlari
+MEDIA_EXTENSIONS = {
+    "photo": (".jpg", "image/jpeg"),
+    "video": (".mp4", "video/mp4"),
+    "audio": (".mp3", "audio/mpeg"),
+    "document": (".pdf", "application/pdf"),
+    "voice": (".ogg", "audio/ogg"),
+    "video_note": (".mp4", "video/mp4"),
+    "sticker": (".webp", "image/webp"),
+    "animation": (".mp4", "video/mp4"),
+}
+
+DEFAULT_MIX = "text=0.6,photo=0.25,video=0.05,document=0.04,sticker=0.03,voice=0.03"
+
+# Yozish uchun qayta ishlatiladigan tasodifiy blok (os.urandom har safar sekin)
+_PAYLOAD_BLOCK = random.Random(0).randbytes(1024 * 1024)
+
+
+@dataclass
+class BenchConfig:
+    """Benchmark sozlamalari"""
+
+    messages: int = 2000
+    mix: dict = field(default_factory=dict)
+    sizes_mb: dict = field(default_factory=lambda: dict(DEFAULT_SIZES_MB))
+    page_size: int = 100
+    page_latency_ms: float = 30.0
+    connect_latency_ms: float = 0.0  # Telegram ga ulanish (async with client) kechikishi
+    download_mbps: float = 0.0  # 0 - cheklovsiz
+    download_latency_ms: float = 0.0  # Har bir fayl so'rovining kechikishi (upload.GetFile RTT)
+    album_size: int = 0  # Ketma-ket rasm/videolar N tadan albomga yig'iladi (0 - albomsiz)
+    real_images: bool = False  # Rasm/stikerlar haqiqiy JPEG/WebP (transcode.py ni o'lchash uchun, Pillow kerak)
+    duplicate_every: int = 0  # Ketma-ket N ta xabar media si bir xil kontentli (qayta yuklangan forward), 0 - yo'q
+    drop_every_mb: int = 0  # stream_media har N MB da ulanishni uzadi (0 - o'chirilgan)
+    floodwait_every: int = 0  # Har N sahifada FloodWait (0 - o'chirilgan)
+    floodwait_seconds: float = 1.0
+    floodwait_raise: bool = False  # FloodWait ni exporterga xato sifatida uzatish
+    s3_latency_ms: float = 5.0
+    upload_mbps: float = 0.0  # 0 - cheklovsiz
+    download_media: bool = True
+    storage: str = "s3"  # s3 (LocalS3Client orqali) yoki local
+    bundle: str = ""  # ZIP arxiv: "", local yoki storage (exporter.EXPORT_BUNDLE)
+    seed: int = 42
+
+
+class _Fake:
+    """Pyrogram obyektlariga o'xshash: mavjud bo'lmagan atributlar None qaytaradi"""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def __getattr__(self, name):
+        return None
+
+
+class FakeMessage(_Fake):
+    """Sintetik xabar - download() faylni diskka yozadi"""
+
+    async def download(self, file_name: str = "", **kwargs) -> Optional[str]:
+        return await self._client._download(self, file_name)
+
+
+class FakeClient:
+    """Telegram Client o'rnini bosuvchi sintetik client (tarmoqsiz)"""
+
+    def __init__(self, config: BenchConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.chat = _Fake(
+            id=-1001234567890,
+            title="Benchmark Channel",
+            username="benchmark_channel",
+            type=ChatType.CHANNEL,
+            members_count=12345,
+            description="Sintetik benchmark kanali",
+            linked_chat=None,
+        )
+        self.user = _Fake(id=777, username="bench_user", first_name="Bench", last_name="User")
+
+        weights = config.mix or parse_mapping(DEFAULT_MIX)
+        self._kinds = list(weights.keys())
+        self._weights = list(weights.values())
+
+        # Statistika
+        self.pages = 0
+        self.flood_waits = 0
+        self.flood_wait_seconds = 0.0
+        self.fetch_samples: list[float] = []
+        self.download_samples: list[float] = []
+        self.downloaded_bytes = 0
+        self.stream_drops = 0
+
+    async def __aenter__(self):
+        if self.config.connect_latency_ms:
+            await asyncio.sleep(self.config.connect_latency_ms / 1000)
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get_chat(self, chat_id):
+        return self.chat
+
+    async def get_chat_history_count(self, chat_id) -> int:
+        return self.config.messages
+
+    async def get_chat_history(self, chat_id, limit: int = 0, offset_id: int = 0):
+        """Xabarlarni yangidan eskiga, sahifa-sahifa qaytaradi"""
+        cfg = self.config
+        total = cfg.messages if not limit else min(limit, cfg.messages)
+        next_id = offset_id - 1 if offset_id else cfg.messages
+        base_date = datetime(2024, 1, 20, 12, 0, 0)
+        yielded = 0
+
+        while yielded < total and next_id > 0:
+            started = time.perf_counter()
+            self.pages += 1
+
+            # Sahifa kechikishi (tarmoq + server)
+            if cfg.page_latency_ms:
+                await asyncio.sleep(cfg.page_latency_ms / 1000)
+
+            # FloodWait - pyrogram sleep_threshold dan past kutishlarni o'zi kutadi,
+            # kattalarini esa xato sifatida chaqiruvchiga uzatadi
+            if cfg.floodwait_every and self.pages % cfg.floodwait_every == 0:
+                self.flood_waits += 1
+                self.flood_wait_seconds += cfg.floodwait_seconds
+                if cfg.floodwait_raise:
+                    raise FloodWait(value=max(1, round(cfg.floodwait_seconds)))
+                await asyncio.sleep(cfg.floodwait_seconds)
+
+            page = []
+            for _ in range(min(cfg.page_size, total - yielded, next_id)):
+                page.append(self._make_message(next_id, base_date))
+                next_id -= 1
+            self.fetch_samples.append(time.perf_counter() - started)
+
+            for message in page:
+                yielded += 1
+                yield message
+
+    def _make_message(self, message_id: int, base_date: datetime) -> FakeMessage:
+        """Sozlamalardagi nisbatlar bo'yicha bitta sintetik xabar yaratadi"""
+        rng = self.rng
+        kind = rng.choices(self._kinds, self._weights)[0]
+        date = base_date - timedelta(minutes=message_id)
+
+        message = FakeMessage(
+            _client=self,
+            id=message_id,
+            date=date,
+            chat=self.chat,
+            from_user=self.user if message_id % 3 == 0 else None,
+            sender_chat=self.chat if message_id % 3 else None,
+            views=rng.randint(100, 100000),
+            forwards=rng.randint(0, 500),
+            reply_to_message_id=message_id - 1 if message_id % 17 == 0 else None,
+        )
+
+        if kind == "text":
+            message.text = "Benchmark xabari " * rng.randint(1, 40)
+            return message
+
+        message.caption = "Izoh " * rng.randint(0, 20) or None
+        message.media = MessageMediaType[kind.upper()]
+        if self.config.album_size > 1 and kind in ("photo", "video"):
+            message.media_group_id = 10**9 + message_id // self.config.album_size
+
+        ext, mime = MEDIA_EXTENSIONS.get(kind, (".bin", "application/octet-stream"))
+        if kind == "sticker" and message_id % 3 == 0:
+            # Animatsiyali (Lottie) stiker - Pillow ochmaydi, statik ko'rinish thumbnail dan
+            ext, mime = ".tgs", "application/x-tgsticker"
+        mean_size = self.config.sizes_mb.get(kind, 1.0) * 1024 * 1024
+        size = max(1, int(rng.uniform(0.5, 1.5) * mean_size))
+
+        # Kontent ID si: bir xil ID - bir xil baytlar (file_unique_id esa har xil)
+        content_id = message_id
+        if self.config.duplicate_every > 1:
+            content_id = message_id - message_id % self.config.duplicate_every
+            size = max(1, int(random.Random(content_id).uniform(0.5, 1.5) * mean_size))
+        image = None
+        if self.config.real_images and ext in _IMAGE_FORMATS:
+            image = _image_payload(ext) + content_id.to_bytes(8, "big")
+            size = len(image)
+
+        media = _Fake(
+            file_id=f"{kind}_{message_id}",
+            file_unique_id=f"u{kind}{message_id}",
+            file_size=size,
+            file_name=f"{kind}_{message_id}{ext}" if kind in ("video", "audio", "document", "animation") else None,
+            mime_type=mime,
+            width=1280,
+            height=720,
+            length=384,
+            duration=rng.randint(1, 600),
+            emoji="😀",
+            set_name="BenchStickers",
+            _ext=ext,
+            _content=content_id,
+            _image=image,
+        )
+        if kind in ("video", "video_note", "animation") or ext == ".tgs":
+            media.thumbs = [_Fake(file_id=f"thumb_{kind}_{message_id}", width=320, height=180, file_size=_THUMB_SIZE)]
+        setattr(message, kind, media)
+        return message
+
+    async def _download(self, message: FakeMessage, file_name: str) -> Optional[str]:
+        """Media ni diskka yozadi (sozlangan tezlik bilan)"""
+        started = time.perf_counter()
+        media_type = message.media.name.lower()
+        media = getattr(message, media_type)
+
+        path = Path(file_name)
+        if file_name.endswith(("/", os.sep)) or path.is_dir():
+            path = path / (media.file_name or f"{media_type}_{message.id}{media._ext}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        delay = self._transfer_delay(message, media)
+        if delay:
+            await asyncio.sleep(delay)
+
+        with open(path, "wb") as f:
+            for index in range(-(-media.file_size // len(_PAYLOAD_BLOCK))):
+                f.write(_media_chunk(media, index))
+
+        self.downloaded_bytes += media.file_size
+        self.download_samples.append(time.perf_counter() - started)
+        return str(path)
+
+    async def download_media(self, file_id: str, file_name: str = "", **kwargs) -> Optional[str]:
+        """Thumbnail (video poster, stiker statik ko'rinishi) yuklab olish - file_id bo'yicha"""
+        await asyncio.sleep(self.config.download_latency_ms / 1000)
+        path = Path(file_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if self.config.real_images:
+            path.write_bytes(_image_payload(".jpg"))
+        else:
+            _write_payload(path, _THUMB_SIZE)
+        self.downloaded_bytes += path.stat().st_size
+        return str(path)
+
+    async def stream_media(self, message: FakeMessage, limit: int = 0, offset: int = 0):
+        """pyrogram stream_media o'rinbosari: 1 MB lik bo'laklar, kerak bo'lsa ulanish uziladi"""
+        started = time.perf_counter()
+        media = getattr(message, message.media.name.lower())
+        chunk_size = len(_PAYLOAD_BLOCK)
+        total = -(-media.file_size // chunk_size)
+        end = min(total, offset + limit) if limit else total
+        chunk_delay = self._transfer_delay(message, media) / total if total else 0.0
+
+        for index in range(offset, end):
+            if self.config.drop_every_mb and index > offset and (index - offset) % self.config.drop_every_mb == 0:
+                self.stream_drops += 1
+                raise ConnectionError("benchmark: ulanish uzildi")
+            if chunk_delay:
+                await asyncio.sleep(chunk_delay)
+            chunk = _media_chunk(media, index)
+            self.downloaded_bytes += len(chunk)
+            yield chunk
+
+        self.download_samples.append(time.perf_counter() - started)
+
+    def _transfer_delay(self, message: FakeMessage, media: _Fake) -> float:
+        """Faylni yuklab olishga ketadigan soxta vaqt (sekund)"""
+        delay = self.config.download_latency_ms / 1000
+        if self.config.download_mbps:
+            delay += media.file_size / (self.config.download_mbps * 1024 * 1024)
+        return delay
+
+
+class LocalS3Client:
+    """boto3 S3 client ning lokal o'rinbosari (faqat exporter ishlatadigan metodlar)"""
+
+    def __init__(self, root: Path, latency_ms: float = 0.0, upload_mbps: float = 0.0):
+        self.root = Path(root)
+        self.latency = latency_ms / 1000
+        self.upload_mbps = upload_mbps
+        self.requests = 0
+        self.uploaded_bytes = 0
+        self.verified_checksums = 0
+        self._multipart: dict[str, dict[int, bytes]] = {}
+
+    def _path(self, bucket: str, key: str) -> Path:
+        return self.root / bucket / key
+
+    def _request(self, size: int = 0):
+        self.requests += 1
+        delay = self.latency
+        if self.upload_mbps and size:
+            delay += size / (self.upload_mbps * 1024 * 1024)
+        if delay:
+            time.sleep(delay)
+
+    def head_bucket(self, Bucket: str):
+        self._request()
+        (self.root / Bucket).mkdir(parents=True, exist_ok=True)
+        return {}
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str, ExtraArgs=None, Config=None, Callback=None):
+        size = os.path.getsize(Filename)
+        self._request(size)
+        target = self._path(Bucket, Key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(Filename, target)
+        self.uploaded_bytes += size
+
+    def put_object(self, Bucket: str, Key: str, Body=b"", **kwargs):
+        data = Body.read() if hasattr(Body, "read") else Body
+        self._request(len(data))
+        # S3 kabi: yuborilgan CRC32 tanaga mos kelmasa so'rov rad etiladi
+        if "ChecksumCRC32" in kwargs:
+            expected = base64.b64encode(zlib.crc32(data).to_bytes(4, "big")).decode("ascii")
+            if kwargs["ChecksumCRC32"] != expected:
+                raise ValueError(f"BadDigest: {Key} CRC32 mos kelmadi")
+            self.verified_checksums += 1
+        target = self._path(Bucket, Key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        self.uploaded_bytes += len(data)
+        return {"ETag": '"local"'}
+
+    def get_object(self, Bucket: str, Key: str):
+        self._request()
+        target = self._path(Bucket, Key)
+        if not target.exists():
+            raise FileNotFoundError(f"NoSuchKey: {Key}")
+        return {"Body": io.BytesIO(target.read_bytes()), "ContentLength": target.stat().st_size}
+
+    def head_object(self, Bucket: str, Key: str):
+        self._request()
+        target = self._path(Bucket, Key)
+        if not target.exists():
+            raise FileNotFoundError(f"NoSuchKey: {Key}")
+        return {"ContentLength": target.stat().st_size}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = "", ContinuationToken: str = None, MaxKeys: int = 1000):
+        self._request()
+        bucket = self.root / Bucket
+        keys = sorted(
+            path.relative_to(bucket).as_posix() for path in bucket.rglob("*")
+            if path.is_file() and path.relative_to(bucket).as_posix().startswith(Prefix)
+        )
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + MaxKeys]
+        response = {
+            "Contents": [{"Key": key, "Size": (bucket / key).stat().st_size} for key in page],
+            "IsTruncated": start + MaxKeys < len(keys),
+        }
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = str(start + MaxKeys)
+        return response
+
+    def create_multipart_upload(self, Bucket: str, Key: str, **kwargs):
+        self._request()
+        upload_id = f"upload-{len(self._multipart)}"
+        self._multipart[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body=b""):
+        data = Body.read() if hasattr(Body, "read") else Body
+        self._request(len(data))
+        self._multipart[UploadId][PartNumber] = bytes(data)
+        self.uploaded_bytes += len(data)
+        return {"ETag": f'"part-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: dict):
+        self._request()
+        parts = self._multipart.pop(UploadId)
+        target = self._path(Bucket, Key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "wb") as f:
+            for part in MultipartUpload["Parts"]:
+                f.write(parts[part["PartNumber"]])
+        return {"ETag": '"local-multipart"'}
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str):
+        self._request()
+        self._multipart.pop(UploadId, None)
+        return {}
+
+
+class StageTimer:
+    """Bosqichlar bo'yicha vaqtni yig'uvchi o'rovchi (sync va async funksiyalar uchun)"""
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, stage: str, func):
+        if asyncio.iscoroutinefunction(func):
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.add(stage, time.perf_counter() - started)
+            return async_wrapper
+
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - started)
+        return wrapper
+
+    def summary(self) -> dict[str, dict]:
+        result = {}
+        for stage, values in sorted(self.samples.items()):
+            if not values:
+                continue
+            ordered = sorted(values)
+            result[stage] = {
+                "calls": len(values),
+                "total_s": round(sum(values), 4),
+                "mean_ms": round(statistics.fmean(values) * 1000, 4),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 4),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 4),
+            }
+        return result
+
+
+def _write_payload(path: Path, size: int):
+    """Berilgan hajmdagi faylni qayta ishlatiladigan blokdan yozadi"""
+    block = _PAYLOAD_BLOCK
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            n = min(remaining, len(block))
+            f.write(block[:n] if n < len(block) else block)
+            remaining -= n
+
+
+def _media_chunk(media: _Fake, index: int) -> bytes:
+    """Fayl kontentining index-bo'lagi (1 MB); birinchi bo'lak boshida kontent ID si"""
+    start = index * len(_PAYLOAD_BLOCK)
+    size = min(len(_PAYLOAD_BLOCK), media.file_size - start)
+    if media._image is not None:
+        return media._image[start:start + size]
+    if index == 0:
+        return (media._content.to_bytes(8, "big") + _PAYLOAD_BLOCK[8:size])[:size]
+    return _PAYLOAD_BLOCK[:size]
+
+
+_IMAGE_FORMATS = {".jpg": "JPEG", ".webp": "WEBP"}
+_THUMB_SIZE = 20 * 1024
+_IMAGE_PAYLOADS: dict[str, bytes] = {}
+
+
+def _image_payload(ext: str) -> bytes:
+    """Haqiqiy rasm (1280x720, shovqinli gradient) - bir marta kodlanadi"""
+    if ext not in _IMAGE_PAYLOADS:
+        from PIL import Image
+
+        noise = Image.frombytes("L", (1280, 720), random.Random(ext).randbytes(1280 * 720))
+        gradient = Image.linear_gradient("L").resize((1280, 720))
+        image = Image.merge("RGB", (gradient, noise.point(lambda v: v // 4 + 96), gradient.rotate(180)))
+        buffer = io.BytesIO()
+        image.save(buffer, _IMAGE_FORMATS[ext], quality=92)
+        _IMAGE_PAYLOADS[ext] = buffer.getvalue()
+    return _IMAGE_PAYLOADS[ext]
+
+
+def parse_mapping(value: str) -> dict[str, float]:
+    """"text=0.6,photo=0.3" ko'rinishidagi qatorni dict ga o'tkazadi"""
+    result = {}
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        key, _, number = part.partition("=")
+        result[key.strip().lower()] = float(number)
+    return result
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Jarayonning eng yuqori RSS (MB)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux da KB, macOS da bayt
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 2)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, cwd=Path(__file__).parent, timeout=5,
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _instrument(exp: exporter.TelegramExporter, timer: StageTimer):
+    """Exporter metodlarini bosqich vaqtlarini o'lchaydigan o'rovchilar bilan almashtiradi"""
+    exp._serialize_message = timer.wrap("serialize", exp._serialize_message)
+    exp._update_stats = timer.wrap("update_stats", exp._update_stats)
+    exp._download_media = timer.wrap("media_total", exp._download_media)
+    exp._save_checkpoint = timer.wrap("checkpoint", exp._save_checkpoint)
+    exp._save_data = timer.wrap("save_data", exp._save_data)
+    exp._generate_web_viewer = timer.wrap("web_viewer", exp._generate_web_viewer)
+    exp._upload_export = timer.wrap("upload_export", exp._upload_export)
+    exp.storage.put = timer.wrap("upload", exp.storage.put)
+
+
+async def run_benchmark(
+    config: BenchConfig, workdir: Path, verbose: bool = False, client: Optional[FakeClient] = None
+) -> dict[str, Any]:
+    """Bitta benchmark ishga tushirish va natijalarni qaytarish"""
+    client = client or FakeClient(config)
+    s3 = LocalS3Client(workdir / "s3", latency_ms=config.s3_latency_ms, upload_mbps=config.upload_mbps)
+
+    # Lokal S3 o'rinbosarini backblaze cache iga joylash
+    backblaze._s3_client = s3
+    backblaze._bucket_name = "benchmark"
+    backblaze._base_url = "http://localhost/benchmark"
+    backblaze._bucket_checked = False
+
+    if config.storage == "local":
+        target = storage.LocalStorage(workdir / "storage", base_url="http://localhost/benchmark")
+    else:
+        target = storage.S3Storage()
+
+    timer = StageTimer()
+    original_download_flag = exporter.DOWNLOAD_MEDIA
+    original_bundle = exporter.EXPORT_BUNDLE
+    exporter.DOWNLOAD_MEDIA = config.download_media
+    exporter.EXPORT_BUNDLE = config.bundle
+
+    exp = exporter.TelegramExporter(
+        client.chat.id, output_dir=str(workdir / "export"), client=client, storage=target
+    )
+    _instrument(exp, timer)
+
+    output = sys.stdout if verbose else open(os.devnull, "w", encoding="utf-8")
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output):
+            await exp.export()
+    finally:
+        elapsed = time.perf_counter() - started
+        exporter.DOWNLOAD_MEDIA = original_download_flag
+        exporter.EXPORT_BUNDLE = original_bundle
+        if output is not sys.stdout:
+            output.close()
+
+    # Soxta client ichida o'lchangan bosqichlar (sahifa va fayl bo'yicha)
+    timer.samples["fetch"] = client.fetch_samples
+    timer.samples["download"] = client.download_samples
+    downloaded_mb = client.downloaded_bytes / (1024 * 1024)
+
+    return {
+        "elapsed_s": round(elapsed, 4),
+        "messages": exp.stats.total_messages,
+        "messages_per_s": round(exp.stats.total_messages / elapsed, 2) if elapsed else None,
+        "downloaded_files": exp.stats.downloaded_files,
+        "duplicate_files": exp.stats.duplicate_files,
+        "remote_files": exp.stats.remote_files,
+        "failed_downloads": exp.stats.failed_downloads,
+        "downloaded_mb": round(downloaded_mb, 3),
+        "uploaded_mb": round(s3.uploaded_bytes / (1024 * 1024), 3),
+        "verified_checksums": s3.verified_checksums,
+        "mb_per_s": round(downloaded_mb / elapsed, 3) if elapsed else None,
+        "s3_requests": s3.requests,
+        "history_pages": client.pages,
+        "flood_waits": client.flood_waits,
+        "flood_wait_s": round(client.flood_wait_seconds, 3),
+        "stream_drops": client.stream_drops,
+        "peak_rss_mb": peak_rss_mb(),
+        "startup_s": exp.metrics.snapshot()["gauges"].get("startup_seconds"),
+        "bundle_mb": round((exp.bundle.size if exp.bundle else 0) / (1024 * 1024), 3),
+        "stages": timer.summary(),
+        "metrics": exp.metrics.snapshot(),
+    }
+
+
+def measure_cold_start(modules: tuple = COLD_START_MODULES, runs: int = 3) -> dict[str, dict]:
+    """Har bir modulni yangi Python jarayonida import qilish vaqti (eng yaxshi natija)
+
+    Import paytida API kalitlari yoki tarmoq kerak bo'lmasligi kerak, shuning uchun
+    jarayonlar API_ID/B2 o'zgaruvchilarisiz ishga tushiriladi.
+    """
+    env = {k: v for k, v in os.environ.items() if not k.startswith(("API_", "B2_"))}
+    code = (
+        "import sys, time; t = time.perf_counter(); import {module}; "
+        "print(time.perf_counter() - t, 'boto3' in sys.modules, 'pyrogram' in sys.modules)"
+    )
+    results = {}
+    for module in modules:
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            proc = subprocess.run(
+                [sys.executable, "-c", code.format(module=module)],
+                cwd=Path(__file__).parent, env=env, capture_output=True, text=True,
+            )
+            wall = time.perf_counter() - started
+            if proc.returncode != 0:
+                results[module] = {"error": proc.stderr.strip().splitlines()[-1:]}
+                break
+            import_s, boto3_loaded, pyrogram_loaded = proc.stdout.split()[-3:]
+            samples.append((wall, float(import_s)))
+        else:
+            results[module] = {
+                "process_ms": round(min(s[0] for s in samples) * 1000, 1),
+                "import_ms": round(min(s[1] for s in samples) * 1000, 1),
+                "boto3_loaded": boto3_loaded == "True",
+                "pyrogram_loaded": pyrogram_loaded == "True",
+            }
+    return results
+
+
+def compare_results(current: dict, previous: dict) -> list[str]:
+    """Ikki natija o'rtasidagi asosiy ko'rsatkichlar farqini qaytaradi"""
+    lines = []
+    if current.get("config") != previous.get("config") or current.get("fixture") != previous.get("fixture"):
+        lines.append("⚠️ Sozlamalar farq qiladi - natijalar to'g'ridan-to'g'ri solishtirilmaydi")
+
+    cur, prev = current["results"], previous["results"]
+    for key in ("elapsed_s", "messages_per_s", "mb_per_s", "peak_rss_mb"):
+        if cur.get(key) is None or not prev.get(key):
+            continue
+        change = (cur[key] - prev[key]) / prev[key] * 100
+        lines.append(f"{key:>16}: {prev[key]} -> {cur[key]} ({change:+.1f}%)")
+
+    for stage, data in cur.get("stages", {}).items():
+        old = prev.get("stages", {}).get(stage)
+        if old and old["total_s"]:
+            change = (data["total_s"] - old["total_s"]) / old["total_s"] * 100
+            lines.append(f"{'stage:' + stage:>16}: {old['total_s']}s -> {data['total_s']}s ({change:+.1f}%)")
+    return lines
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Telegram exporter uchun offline benchmark")
+    parser.add_argument("--messages", type=int, default=BenchConfig.messages, help="Xabarlar soni")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Xabar turlari nisbati (text=0.6,photo=0.3,...)")
+    parser.add_argument("--size", action="append", default=[], help="Media hajmi MB da (photo=0.5,video=20)")
+    parser.add_argument("--page-size", type=int, default=BenchConfig.page_size)
+    parser.add_argument("--page-latency-ms", type=float, default=BenchConfig.page_latency_ms)
+    parser.add_argument("--connect-latency-ms", type=float, default=0.0, help="Telegram ga ulanish kechikishi")
+    parser.add_argument("--drop-every-mb", type=int, default=0,
+                        help="Katta fayllarni bo'laklab yuklashda har N MB da ulanishni uzish")
+    parser.add_argument("--download-mbps", type=float, default=0.0, help="Yuklab olish tezligi (MB/s, 0 - cheklovsiz)")
+    parser.add_argument("--download-latency-ms", type=float, default=0.0,
+                        help="Har bir media faylni yuklab olish so'rovining kechikishi")
+    parser.add_argument("--album-size", type=int, default=0,
+                        help="Ketma-ket rasm/videolarni N tadan albomga yig'ish (0 - albomsiz)")
+    parser.add_argument("--duplicate-every", type=int, default=0,
+                        help="Ketma-ket N ta xabar media si bir xil kontentli (kontent dedup ni o'lchash uchun)")
+    parser.add_argument("--real-images", action="store_true",
+                        help="Rasm/stikerlarni haqiqiy JPEG/WebP qilib yozish (IMAGE_RENDITIONS=1 ni o'lchash uchun)")
+    parser.add_argument("--upload-mbps", type=float, default=0.0, help="S3 ga yuklash tezligi (MB/s, 0 - cheklovsiz)")
+    parser.add_argument("--s3-latency-ms", type=float, default=BenchConfig.s3_latency_ms)
+    parser.add_argument("--floodwait-every", type=int, default=0, help="Har N sahifada FloodWait")
+    parser.add_argument("--floodwait-seconds", type=float, default=BenchConfig.floodwait_seconds)
+    parser.add_argument("--floodwait-raise", action="store_true", help="FloodWait ni exporterga xato sifatida uzatish")
+    parser.add_argument("--no-media", action="store_true", help="Media yuklab olishni o'chirish")
+    parser.add_argument("--storage", choices=("s3", "local"), default=BenchConfig.storage,
+                        help="Saqlash joyi: lokal S3 o'rinbosari yoki lokal papka")
+    parser.add_argument("--bundle", choices=("", "local", "storage"), default=BenchConfig.bundle,
+                        help="Export bilan parallel ZIP arxiv yig'ish")
+    parser.add_argument("--seed", type=int, default=BenchConfig.seed)
+    parser.add_argument("--fixture", help="Sintetik xabarlar o'rniga yozib olingan chat tarixi (replay.py record)")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="Yozib olingan kechikishlarni tezlashtirish koeffitsienti")
+    parser.add_argument("--output", help="Natija JSON fayli (standart: bench_results/bench_<vaqt>.json)")
+    parser.add_argument("--compare", help="Oldingi natija JSON fayli bilan solishtirish")
+    parser.add_argument("--keep", action="store_true", help="Vaqtinchalik papkani o'chirmaslik")
+    parser.add_argument("--workdir",
+                        help="Oldingi --keep papkasi: saqlash joyi qayta ishlatiladi, export papkasi (checkpoint) yo'qolgan deb olinadi")
+    parser.add_argument("--verbose", action="store_true", help="Exporter chiqishini ko'rsatish")
+    parser.add_argument("--cold-start", action="store_true",
+                        help="Modullarni import qilish vaqtini alohida jarayonlarda o'lchash")
+    parser.add_argument("--cold-start-budget-ms", type=float, default=COLD_START_BUDGET_MS,
+                        help="Cold start chegarasi (oshsa chiqish kodi 1)")
+    return parser
+
+
+def config_from_args(args: argparse.Namespace) -> BenchConfig:
+    sizes = dict(DEFAULT_SIZES_MB)
+    for item in args.size:
+        sizes.update(parse_mapping(item))
+
+    return BenchConfig(
+        messages=args.messages,
+        mix=parse_mapping(args.mix),
+        sizes_mb=sizes,
+        page_size=args.page_size,
+        page_latency_ms=args.page_latency_ms,
+        connect_latency_ms=args.connect_latency_ms,
+        download_mbps=args.download_mbps,
+        download_latency_ms=args.download_latency_ms,
+        album_size=args.album_size,
+        real_images=args.real_images,
+        duplicate_every=args.duplicate_every,
+        drop_every_mb=args.drop_every_mb,
+        floodwait_every=args.floodwait_every,
+        floodwait_seconds=args.floodwait_seconds,
+        floodwait_raise=args.floodwait_raise,
+        s3_latency_ms=args.s3_latency_ms,
+        upload_mbps=args.upload_mbps,
+        download_media=not args.no_media,
+        storage=args.storage,
+        bundle=args.bundle,
+        seed=args.seed,
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    config = config_from_args(args)
+
+    client = None
+    if args.fixture:
+        from replay import ReplayClient
+
+        client = ReplayClient(config, args.fixture, speed=args.replay_speed)
+        config.messages = client.total_messages
+        print(f"🎞️ Fixture: {args.fixture} (tezlik x{args.replay_speed})")
+
+    cold_start = None
+    if args.cold_start:
+        print("🧊 Cold start o'lchanmoqda...")
+        cold_start = measure_cold_start()
+
+    if args.workdir:
+        workdir = Path(args.workdir)
+        shutil.rmtree(workdir / "export", ignore_errors=True)
+    else:
+        workdir = Path(tempfile.mkdtemp(prefix="tg_export_bench_"))
+    print(f"🏁 Benchmark boshlanmoqda: {config.messages} ta xabar (seed={config.seed})")
+    try:
+        results = asyncio.run(run_benchmark(config, workdir, verbose=args.verbose, client=client))
+    finally:
+        if args.keep or args.workdir:
+            print(f"📂 Vaqtinchalik papka saqlandi: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "benchmark": "exporter",
+        "schema": 1,
+        "timestamp": datetime.now().isoformat(),
+        "config": asdict(config),
+        "fixture": args.fixture,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "git_commit": _git_commit(),
+        },
+        "results": results,
+        "cold_start": cold_start,
+    }
+
+    output_path = Path(args.output) if args.output else Path(
+        f"bench_results/bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ {results['messages']} ta xabar, {results['elapsed_s']}s")
+    print(f"   📨 {results['messages_per_s']} xabar/s")
+    print(f"   📦 {results['downloaded_mb']} MB, {results['mb_per_s']} MB/s")
+    print(f"   🧠 Peak RSS: {results['peak_rss_mb']} MB")
+    if results["startup_s"] is not None:
+        print(f"   🚀 Startup (ulanish + S3 tekshiruvi): {results['startup_s']}s")
+    for stage, data in results["stages"].items():
+        print(f"   ⏱️ {stage:<14} {data['total_s']:>9.3f}s  ({data['calls']} marta, p95 {data['p95_ms']} ms)")
+    print(f"💾 Natija saqlandi: {output_path}")
+
+    over_budget = False
+    for module, data in (cold_start or {}).items():
+        if "error" in data:
+            print(f"   ❌ Cold start ({module}): {data['error']}")
+            over_budget = True
+            continue
+        within = data["process_ms"] <= args.cold_start_budget_ms
+        over_budget = over_budget or not within
+        print(
+            f"   {'🧊' if within else '⚠️'} Cold start {module}: {data['process_ms']} ms "
+            f"(import {data['import_ms']} ms, boto3={'ha' if data['boto3_loaded'] else 'yo`q'}, "
+            f"chegara {args.cold_start_budget_ms:.0f} ms)"
+        )
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        print(f"\n📊 Solishtirish: {args.compare}")
+        for line in compare_results(report, previous):
+            print(f"   {line}")
+
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Export papkasini bitta ZIP faylga oqim bilan yig'ish (oflayn yuklab olish uchun)
+
+ExportBundle export davomida ishlaydi: media fayllar yuklab olinishi bilan
+navbatga qo'shiladi va fon threadida ZIP ga yoziladi, oxirida chat_data.json
+va index.html qo'shiladi. ZIP to'g'ridan-to'g'ri lokal faylga yoki
+Storage.put_stream() orqali S3 multipart yuklashga yoziladi - diskda ikkinchi
+nusxa yaratilmaydi. 4 GB dan katta arxivlar uchun ZIP64 ishlatiladi, allaqachon
+siqilgan media (jpg, mp4, ogg, ...) siqilmasdan (stored) yoziladi.
+"""
+
+import asyncio
+import io
+import os
+import queue
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import Optional
+
+from storage import Storage
+
+# Faqat shu kengaytmalar deflate bilan siqiladi, qolganlari (media) o'zgarishsiz yoziladi
+DEFLATE_EXTENSIONS = frozenset({".json", ".html", ".htm", ".txt", ".csv", ".xml", ".svg", ".md", ".log"})
+
+# Oqim bo'lagi hajmi va navbatdagi bo'laklar soni (xotira ~ CHUNK * MAX_PENDING)
+BUNDLE_CHUNK_BYTES = 4 * 1024 * 1024
+BUNDLE_MAX_PENDING_CHUNKS = 4
+
+# Chala yuklab olingan fayllar va ularning holati (downloader.py) - arxivga kirmaydi
+PARTIAL_SUFFIXES = (".part", ".part.json", ".tmp")
+
+
+def compress_type(arcname: str) -> int:
+    return zipfile.ZIP_DEFLATED if Path(arcname).suffix.lower() in DEFLATE_EXTENSIONS else zipfile.ZIP_STORED
+
+
+class _ChunkWriter(io.RawIOBase):
+    """ZipFile uchun seek qilinmaydigan fayl: baytlarni bo'laklab navbatga uzatadi
+
+    Navbat cheklangan - yuklash sekinlashsa ZIP yozuvchi thread ham kutadi.
+    """
+
+    def __init__(self, chunks: queue.Queue, aborted: threading.Event):
+        super().__init__()
+        self._chunks = chunks
+        self._aborted = aborted
+        self._buffer = bytearray()
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def _put(self, item):
+        while True:
+            if self._aborted.is_set():
+                raise OSError("ZIP oqimi to'xtatildi")
+            try:
+                self._chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self.size += len(data)
+        if len(self._buffer) >= BUNDLE_CHUNK_BYTES:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            try:
+                if self._buffer:
+                    self._put(bytes(self._buffer))
+                    self._buffer.clear()
+            finally:
+                super().close()
+
+
+class ExportBundle:
+    """Export fayllarini ZIP ga oqim bilan yozuvchi
+
+    Ishlatish:
+        bundle = ExportBundle("chat", local_path=Path("exports/chat.zip"))
+        bundle.start()
+        bundle.add(path, "photos/photo_1.jpg")   # istalgan vaqtda, bloklamaydi
+        location = await bundle.close()          # fayl yo'li yoki URL
+    """
+
+    def __init__(self, root: str, local_path: Optional[Path] = None, storage: Optional[Storage] = None,
+                 key: Optional[str] = None, metrics=None):
+        if (local_path is None) == (storage is None):
+            raise ValueError("ExportBundle uchun local_path yoki storage dan bittasi kerak")
+        self.root = root.strip("/")
+        self.local_path = Path(local_path) if local_path else None
+        self.storage = storage
+        self.key = key
+        self.metrics = metrics
+        self.files = 0
+        self.size = 0
+        self._names: set[str] = set()
+        self._files: queue.Queue = queue.Queue()
+        self._chunks: queue.Queue = queue.Queue(maxsize=BUNDLE_MAX_PENDING_CHUNKS)
+        self._aborted = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._upload: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+        self._started = 0.0
+
+    def start(self):
+        """ZIP yozuvchi threadni (va storage bo'lsa yuklash vazifasini) ishga tushiradi"""
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="zip-bundle", daemon=True)
+        self._thread.start()
+        if self.storage is not None:
+            self._upload = asyncio.create_task(self.storage.put_stream(self.key, self._iter_chunks()))
+            # Yuklash qanday tugamasin (xato bilan ham), yozuvchi thread navbatda kutib qolmasligi kerak
+            self._upload.add_done_callback(lambda _: self._aborted.set())
+
+    def add(self, file_path: str | Path, arcname: str):
+        """Faylni arxivga qo'shish uchun navbatga qo'yadi (bir xil nom ikkinchi marta qo'shilmaydi)"""
+        arcname = f"{self.root}/{arcname}" if self.root else arcname
+        if arcname in self._names:
+            return
+        self._names.add(arcname)
+        self._files.put((str(file_path), arcname))
+
+    def add_tree(self, directory: Path, folders: tuple[str, ...]):
+        """Papkadagi mavjud fayllarni qo'shadi (checkpoint dan davom etganda oldingi media)"""
+        for folder in folders:
+            for path in sorted((directory / folder).glob("*")):
+                # .part lar hali yozilayotgan bo'lishi mumkin; tugagan fayl bundle.add() orqali keladi
+                if path.is_file() and not path.name.endswith(PARTIAL_SUFFIXES):
+                    self.add(path, f"{folder}/{path.name}")
+
+    def _run(self):
+        writer = None
+        part_path = None
+        try:
+            if self.local_path is not None:
+                part_path = self.local_path.with_name(self.local_path.name + ".part")
+                target = open(part_path, "wb")
+            else:
+                target = writer = _ChunkWriter(self._chunks, self._aborted)
+
+            with target, zipfile.ZipFile(target, "w", allowZip64=True) as zf:
+                while (item := self._files.get()) is not None:
+                    file_path, arcname = item
+                    try:
+                        zf.write(file_path, arcname, compress_type=compress_type(arcname))
+                    except FileNotFoundError:
+                        print(f"   ⚠️ ZIP: fayl topilmadi: {file_path}")
+                        continue
+                    self.files += 1
+
+            if self.local_path is not None:
+                self.size = part_path.stat().st_size
+                os.replace(part_path, self.local_path)
+            else:
+                self.size = writer.size
+        except BaseException as e:
+            self._error = e
+            if part_path is not None:
+                part_path.unlink(missing_ok=True)
+        finally:
+            if writer is not None:
+                # Yuklash tomoniga oqim tugaganini bildirish (u hali o'qiyotgan bo'lsa)
+                while not self._aborted.is_set():
+                    try:
+                        self._chunks.put(None, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+
+    def _next_chunk(self) -> Optional[bytes]:
+        while not self._aborted.is_set():
+            try:
+                return self._chunks.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return None
+
+    async def _iter_chunks(self):
+        while (chunk := await asyncio.to_thread(self._next_chunk)) is not None:
+            yield chunk
+        if self._error is not None:
+            # Chala arxiv yakunlanmasin - put_stream multipart yuklashni bekor qiladi
+            raise OSError(f"ZIP yozishda xato: {self._error}")
+
+    async def close(self) -> Optional[str]:
+        """Qolgan fayllarni yozib arxivni yopadi; lokal yo'l yoki URL (xato bo'lsa None) qaytaradi"""
+        self._files.put(None)
+        await asyncio.to_thread(self._thread.join)
+
+        location = None
+        if self._upload is not None:
+            try:
+                success, url = await self._upload
+            except Exception as e:
+                print(f"   ❌ ZIP arxivni yuklashda xato: {e}")
+                success, url = False, None
+            if success and self._error is None:
+                location = url
+        elif self._error is None:
+            location = str(self.local_path)
+
+        if self._error is not None:
+            print(f"   ❌ ZIP arxiv yaratishda xato: {self._error}")
+
+        if location and self.metrics:
+            self.metrics.set("bundle_bytes", self.size)
+            self.metrics.set("bundle_seconds", round(time.perf_counter() - self._started, 4))
+        return location
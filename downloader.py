@@ -0,0 +1,280 @@
+"""
+Katta Telegram fayllarini bo'laklab, parallel va uzilgan joyidan davom ettirib yuklab olish
+
+message.download() faylni bitta ketma-ket oqimda, bir urinishda yozadi: 3 GB videoning
+2.8 GB ida ulanish uzilsa hammasi qaytadan boshlanadi. ResumableDownloader faylni
+segmentlarga (SEGMENT_CHUNKS x 1 MB) bo'ladi va har birini stream_media(offset, limit)
+bilan oldindan ajratilgan <fayl>.part dagi o'z joyiga yozadi. Katta fayllarda bir
+nechta segment parallel yuklanadi (fayl va DC bo'yicha cheklangan). Tugagan segmentlar
+<fayl>.part.json da saqlanadi: xato bo'lsa segment o'z joyidan qayta ulanadi,
+keyingi ishga tushirishda esa faqat tugamagan segmentlar yuklanadi.
+
+Kichik fayllar fetch() bilan bitta oqimda (holat faylisiz) yuklanadi. Ikkala yo'lda
+ham baytlar kelishi bilan SHA-256/CRC32 hisoblanadi (hashing.py).
+"""
+
+import asyncio
+import json
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from pyrogram.errors import FloodWait
+from pyrogram.file_id import FileId
+
+from hashing import ChunkHasher, FileDigest, file_digest
+
+# stream_media bo'lagi (Telegram upload.GetFile maksimumi)
+CHUNK_SIZE = 1024 * 1024
+
+# Shundan katta fayllar bo'laklab yuklanadi, kichiklari message.download() bilan
+RESUMABLE_MIN_BYTES = int(os.getenv("RESUMABLE_MIN_MB", "20")) * 1024 * 1024
+
+# Segment - resume va parallel yuklash birligi (bo'laklar soni)
+SEGMENT_CHUNKS = 8
+
+# Shundan katta fayllarning segmentlari parallel yuklanadi
+PARALLEL_MIN_BYTES = int(os.getenv("PARALLEL_DOWNLOAD_MIN_MB", "64")) * 1024 * 1024
+
+# Bitta fayl uchun va bitta DC uchun (barcha fayllar bo'yicha) bir vaqtdagi oqimlar soni
+CONNECTIONS_PER_FILE = int(os.getenv("DOWNLOAD_CONNECTIONS_PER_FILE", "4"))
+CONNECTIONS_PER_DC = int(os.getenv("DOWNLOAD_CONNECTIONS_PER_DC", "8"))
+
+# Ketma-ket muvaffaqiyatsiz qayta ulanishlar soni (har bir muvaffaqiyatli bo'lakdan keyin nolga tushadi)
+CHUNK_RETRIES = 5
+
+# Fayl nomi bo'lmagan media uchun kengaytmalar (pyrogram download_media dagidek)
+DEFAULT_EXTENSIONS = {
+    "video": ".mp4",
+    "animation": ".mp4",
+    "video_note": ".mp4",
+    "voice": ".ogg",
+    "audio": ".mp3",
+    "sticker": ".webp",
+    "photo": ".jpg",
+    "document": ".zip",
+}
+
+# mimetypes bilmaydigan Telegram MIME turlari
+MIME_EXTENSIONS = {"application/x-tgsticker": ".tgs"}
+
+
+def file_dc_id(media_obj) -> int:
+    """Fayl saqlangan DC (pyrogram media sessiyasi shu DC ga ochiladi)"""
+    try:
+        return FileId.decode(media_obj.file_id).dc_id
+    except Exception:
+        return 0
+
+
+def resumable_file_name(media_name: str, media_obj) -> str:
+    """Qayta ishga tushirishda ham bir xil bo'ladigan fayl nomi
+
+    pyrogram nom bo'lmagan fayllarga tasodifiy raqam qo'shadi - bunday nomdagi
+    .part ni keyingi safar topib bo'lmaydi, shuning uchun file_unique_id ishlatiladi.
+    """
+    file_name = os.path.basename(getattr(media_obj, "file_name", None) or "").replace("\x00", "")
+    if file_name and file_name not in (".", ".."):
+        return file_name
+
+    mime_type = getattr(media_obj, "mime_type", None) or ""
+    extension = MIME_EXTENSIONS.get(mime_type) or (mimetypes.guess_extension(mime_type) if mime_type else None)
+    extension = extension or DEFAULT_EXTENSIONS.get(media_name, "")
+    unique_id = re.sub(r"[^\w-]", "_", getattr(media_obj, "file_unique_id", "") or "file")
+    return f"{media_name}_{unique_id}{extension}"
+
+
+class ResumableDownloader:
+    """stream_media asosidagi segmentli, parallel va davom ettiriladigan yuklab olish"""
+
+    def __init__(self, client, metrics=None,
+                 on_flood_wait: Optional[Callable[[FloodWait], Awaitable[None]]] = None):
+        self.client = client
+        self.metrics = metrics
+        self.on_flood_wait = on_flood_wait
+        self._dc_slots: dict[int, asyncio.Semaphore] = {}
+
+    def _inc(self, name: str, value: float = 1):
+        if self.metrics:
+            self.metrics.inc(name, value)
+
+    def _dc_slot(self, dc_id: int) -> asyncio.Semaphore:
+        if dc_id not in self._dc_slots:
+            self._dc_slots[dc_id] = asyncio.Semaphore(CONNECTIONS_PER_DC)
+        return self._dc_slots[dc_id]
+
+    @staticmethod
+    def _load_state(state_path: Path) -> dict:
+        try:
+            with open(state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _save_state(state_path: Path, identity: dict, done: set[int]):
+        tmp_path = state_path.with_name(state_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({**identity, "done_segments": sorted(done)}, f)
+        os.replace(tmp_path, state_path)
+
+    def _prepare(self, part_path: Path, state_path: Path, identity: dict) -> set[int]:
+        """.part faylni tekshiradi; oldingi ishga tushirishda tugagan segmentlarni qaytaradi"""
+        state = self._load_state(state_path)
+        done = set(state.pop("done_segments", ()))
+        if state == identity and part_path.exists() and part_path.stat().st_size == identity["file_size"]:
+            return done
+
+        # Yangi yuklash: fayl to'liq hajmda oldindan ajratiladi, segmentlar o'z joyiga yoziladi
+        with open(part_path, "wb") as f:
+            f.truncate(identity["file_size"])
+        self._save_state(state_path, identity, set())
+        return set()
+
+    async def _fetch_segment(self, message, part_path: Path, start: int, count: int, hasher: ChunkHasher):
+        """[start, start + count) bo'laklarini yuklaydi; uzilsa shu segment ichida davom etadi"""
+        written = 0
+        failures = 0
+        with open(part_path, "r+b") as f:
+            while written < count:
+                f.seek((start + written) * CHUNK_SIZE)
+                try:
+                    async for chunk in self.client.stream_media(message, offset=start + written, limit=count - written):
+                        f.write(chunk)
+                        # Xesh tartibdan oldingi bo'laklarni fayldan o'qiydi - yozilgani ko'rinishi kerak
+                        f.flush()
+                        catch_up = hasher.add(start + written, chunk)
+                        written += 1
+                        if catch_up:
+                            await hasher.catch_up()
+                        failures = 0
+                    reason = None
+                except FloodWait as e:
+                    if self.on_flood_wait:
+                        await self.on_flood_wait(e)
+                    else:
+                        await asyncio.sleep(e.value or 1)
+                    continue
+                except (OSError, EOFError) as e:
+                    reason = e
+
+                if written >= count:
+                    return
+                # pyrogram get_file tarmoq xatosini log qilib oqimni jim to'xtatadi
+                reason = reason or f"oqim {written}/{count} bo'lakda tugadi"
+
+                failures += 1
+                if failures > CHUNK_RETRIES:
+                    raise OSError(f"Yuklab olish {CHUNK_RETRIES} marta qayta urinishdan keyin ham tugamadi: {reason}")
+                self._inc("download_chunk_retries_total")
+                print(f"   🔄 Ulanish uzildi ({reason}), {start + written}-bo'lakdan qayta urinilmoqda "
+                      f"({failures}/{CHUNK_RETRIES})...")
+                await asyncio.sleep(min(2 ** (failures - 1), 30))
+
+    async def fetch(self, message, media_name: str, media_obj, directory: Path) -> tuple[str, FileDigest]:
+        """Kichik faylni bitta oqimda yuklab oladi: (yo'l, xeshlar)
+
+        Uzilsa oxirgi to'liq bo'lakdan qayta ulanadi, lekin holat fayli yozilmaydi.
+        """
+        file_size = getattr(media_obj, "file_size", None) or 0
+        if not file_size:
+            raise ValueError("Oqim bilan yuklash uchun fayl hajmi ma'lum bo'lishi kerak")
+
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / resumable_file_name(media_name, media_obj)
+        part_path = target.with_name(target.name + ".part")
+        if target.exists() and target.stat().st_size == file_size and not part_path.exists():
+            return str(target), await asyncio.to_thread(file_digest, target)
+
+        hasher = ChunkHasher(part_path, CHUNK_SIZE)
+        open(part_path, "wb").close()
+        try:
+            await self._fetch_segment(message, part_path, 0, -(-file_size // CHUNK_SIZE), hasher)
+            if hasher.size != file_size:
+                raise OSError(f"Fayl to'liq yuklanmadi: {hasher.size} != {file_size} bayt")
+        except BaseException:
+            part_path.unlink(missing_ok=True)
+            raise
+
+        os.replace(part_path, target)
+        return str(target), hasher.digest()
+
+    async def download(self, message, media_name: str, media_obj, directory: Path) -> tuple[str, FileDigest]:
+        """Faylni directory ga yuklab oladi: (yo'l, xeshlar)
+
+        Qayta urinishlar tugasa xato ko'tariladi (.part keyingi safar uchun qoladi).
+        """
+        file_size = getattr(media_obj, "file_size", None) or 0
+        if not file_size:
+            raise ValueError("Bo'laklab yuklash uchun fayl hajmi ma'lum bo'lishi kerak")
+
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / resumable_file_name(media_name, media_obj)
+        part_path = target.with_name(target.name + ".part")
+        state_path = target.with_name(target.name + ".part.json")
+
+        if target.exists() and target.stat().st_size == file_size and not part_path.exists():
+            # Oldingi ishga tushirishda to'liq yuklangan (lekin checkpoint ga yozilmagan)
+            return str(target), await asyncio.to_thread(file_digest, target)
+
+        total_chunks = -(-file_size // CHUNK_SIZE)
+        segments = [
+            (start, min(SEGMENT_CHUNKS, total_chunks - start)) for start in range(0, total_chunks, SEGMENT_CHUNKS)
+        ]
+        identity = {
+            "file_unique_id": getattr(media_obj, "file_unique_id", None),
+            "file_size": file_size,
+            "chunk_size": CHUNK_SIZE,
+            "segment_chunks": SEGMENT_CHUNKS,
+        }
+        done = await asyncio.to_thread(self._prepare, part_path, state_path, identity)
+        hasher = ChunkHasher(part_path, CHUNK_SIZE)
+        if done:
+            # Oldingi ishga tushirishda yozilgan segmentlar xeshga fayldan qo'shiladi
+            await asyncio.to_thread(hasher.add_written, [
+                chunk for i in done if i < len(segments)
+                for chunk in range(segments[i][0], segments[i][0] + segments[i][1])
+            ])
+            resumed = sum(segments[i][1] for i in done if i < len(segments)) * CHUNK_SIZE
+            print(f"   ⏯️ Yuklab olish davom ettirilmoqda: {target.name} "
+                  f"({len(done)}/{len(segments)} segment tayyor)")
+            self._inc("download_resumed_bytes_total", min(resumed, file_size))
+
+        pending = iter([i for i in range(len(segments)) if i not in done])
+        dc_slot = self._dc_slot(file_dc_id(media_obj))
+
+        async def worker():
+            for index in pending:
+                start, count = segments[index]
+                async with dc_slot:
+                    await self._fetch_segment(message, part_path, start, count, hasher)
+                done.add(index)
+                self._save_state(state_path, identity, done)
+
+        connections = CONNECTIONS_PER_FILE if file_size >= PARALLEL_MIN_BYTES else 1
+        tasks = [asyncio.create_task(worker()) for _ in range(connections)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        await hasher.catch_up()
+
+        # Tekshiruv: barcha segmentlar yozilgan va hajm Telegram dagi bilan bir xil
+        size = part_path.stat().st_size
+        if len(done) != len(segments) or size != file_size:
+            part_path.unlink(missing_ok=True)
+            state_path.unlink(missing_ok=True)
+            raise OSError(f"Fayl to'liq yuklanmadi: {len(done)}/{len(segments)} segment, {size} != {file_size} bayt")
+
+        os.replace(part_path, target)
+        state_path.unlink(missing_ok=True)
+        if hasher.size != file_size:
+            # Bo'lmasligi kerak: har bir bo'lak yozilganda yoki fayldan xeshga qo'shiladi
+            return str(target), await asyncio.to_thread(file_digest, target)
+        return str(target), hasher.digest()
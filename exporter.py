@@ -5,7 +5,9 @@ Telegram Chat Exporter - Barcha contentlarni yuklab olish va web interfaceda ko'
 import os
 import sys
 import json
+import time
 import asyncio
+import hashlib
 from pathlib import Path
 from datetime import datetime
 from typing import Any, Optional
@@ -15,18 +17,47 @@ import re
 
 from pyrogram import Client
 from pyrogram.types import Message
-from pyrogram.enums import MessageMediaType
+from pyrogram.errors import FloodWait
 from dotenv import load_dotenv
-from backblaze import upload_to_b2
+from metrics import ExportMetrics, MetricsServer, MetricsFileWriter
+from progress import ExportProgress
+from media_types import MEDIA_BY_ENUM, MEDIA_FOLDERS, MEDIA_TYPES, MediaDescriptor
+from records import MessageRecord, RecordBuilder, album_index, chat_info
+from storage import Storage, create_storage, is_small_object
+from bundle import ExportBundle
+from downloader import RESUMABLE_MIN_BYTES, ResumableDownloader, resumable_file_name
+from transcode import IMAGE_RENDITIONS, ImageTranscoder, largest_thumbnail
+from posters import POSTER_MEDIA, VIDEO_POSTERS, best_thumbnail, extract_frame, poster_path
+from hashing import FileDigest, file_digest
+from viewer_data import viewer_data_paths, write_viewer_data
+from telegram_client import create_client
+import jsonio
 
 load_dotenv()
 
-API_ID = int(os.getenv("API_ID"))
-API_HASH = os.getenv("API_HASH")
-
 # Export sozlamalari
 DOWNLOAD_MEDIA = True
 MAX_FILE_SIZE_MB = 3000  # Maksimal yuklab olish uchun fayl hajmi (MB)
+HISTORY_PAGE_SIZE = 100  # Pyrogram get_chat_history bir so'rovda oladigan xabarlar soni
+MAX_FLOOD_WAIT_RETRIES = 3  # Media yuklashda FloodWait dan keyin qayta urinishlar
+
+# Metrikalar sozlamalari
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 - HTTP endpoint o'chirilgan
+METRICS_FILE_INTERVAL = 15  # metrics.json ni yozish oralig'i (sekund)
+
+# ZIP arxiv (oflayn yuklab olish uchun): "" - o'chirilgan, "local" - export papkasi yonida,
+# "storage" - to'g'ridan-to'g'ri saqlash joyiga (S3 da multipart yuklash)
+EXPORT_BUNDLE = os.getenv("EXPORT_BUNDLE", "").strip().lower()
+
+# JSON sozlamalari
+JSON_PRETTY = os.getenv("JSON_PRETTY", "0") == "1"  # chat_data.json ni indent=2 bilan yozish
+
+# Viewer service worker i brauzerda saqlaydigan rasmlar keshining chegarasi (MB)
+VIEWER_MEDIA_CACHE_MB = int(os.getenv("VIEWER_MEDIA_CACHE_MB", "200"))
+
+# Export boshida chat papkasini saqlash joyidan bir marta ro'yxatlab, u yerda bor
+# media ni qayta yuklab olmaslik (checkpoint.json yo'qolgan yoki export boshqa mashinada davom etganda)
+RECONCILE_STORAGE = os.getenv("RECONCILE_STORAGE", "1") == "1"
 
 
 @dataclass
@@ -47,7 +78,10 @@ class ExportStats:
     contacts: int = 0
     locations: int = 0
     web_pages: int = 0
+    albums: int = 0
     downloaded_files: int = 0
+    duplicate_files: int = 0  # Kontenti (SHA-256) avval yuklangan fayl bilan bir xil - qayta yuklanmagan
+    remote_files: int = 0  # Checkpoint da yo'q, lekin saqlash joyida bor (ro'yxatdan tiklangan)
     failed_downloads: int = 0
     download_size_bytes: int = 0
 
@@ -61,32 +95,47 @@ def format_file_size(size_bytes: int) -> str:
 
 def get_media_folder(media_type: str) -> str:
     """Media turi uchun papka nomini qaytaradi"""
-    folders = {
-        "photo": "photos",
-        "video": "videos",
-        "audio": "audio",
-        "document": "files",
-        "voice": "voices",
-        "video_note": "round_videos",
-        "sticker": "stickers",
-        "animation": "animations",
-    }
-    return folders.get(media_type, "other")
+    descriptor = MEDIA_TYPES.get(media_type)
+    return descriptor.folder if descriptor and descriptor.folder else "other"
 
 
 class TelegramExporter:
     """Telegram chat exporteri"""
 
-    def __init__(self, chat_id: str | int, output_dir: str = None):
+    def __init__(self, chat_id: str | int, output_dir: str = None, client: Client = None,
+                 storage: Storage = None):
         self.chat_id = chat_id
-        self.app = Client("my_account", api_id=API_ID, api_hash=API_HASH)
+        # client berilsa (masalan, benchmark uchun soxta client) o'shani ishlatamiz
+        self.app = client or create_client()
+        # Fayllar saqlanadigan joy (standart: .env dagi STORAGE_BACKEND)
+        self.storage = storage or create_storage()
         self.output_dir = Path(output_dir) if output_dir else None
         self.stats = ExportStats()
-        self.messages: list[dict] = []
+        self.metrics = ExportMetrics(self.stats)
+        self.progress = ExportProgress(metrics=self.metrics)
+        self._metrics_server: Optional[MetricsServer] = None
+        self._metrics_writer: Optional[MetricsFileWriter] = None
+        self.messages: list[MessageRecord] = []
+        self.records = RecordBuilder()
         self.chat_info: dict = {}
         self.checkpoint_file: Optional[Path] = None
         self.checkpoint_data: dict = {}
         self.chat_folder_name: str = ""
+        # Saqlash joyidagi chat obyektlari: {"photos/x.jpg": hajm} (_reconcile_storage)
+        self.remote_objects: dict[str, int] = {}
+        # Media yuklashlari: kichik fayllar fonda parallel, katta fayllar navbat bilan
+        self._upload_slots = asyncio.Semaphore(self.storage.max_concurrency)
+        self._pending_uploads: set[asyncio.Task] = set()
+        # Yuklanayotgan kontent: {sha256: (object nomi, natija future)} - takroriylar shu yuklashni kutadi
+        self._digest_uploads: dict[str, tuple[str, asyncio.Future]] = {}
+        self.bundle: Optional[ExportBundle] = None
+        self.downloader = ResumableDownloader(self.app, metrics=self.metrics, on_flood_wait=self._wait_flood)
+        self.transcoder: Optional[ImageTranscoder] = None
+        if IMAGE_RENDITIONS:
+            self.transcoder = ImageTranscoder()
+            if not self.transcoder.enabled:
+                print("⚠️ IMAGE_RENDITIONS=1, lekin Pillow o'rnatilmagan - rasm nusxalari yaratilmaydi")
+                self.transcoder = None
 
     def _setup_output_dir(self):
         """Chiqish papkasini yaratadi"""
@@ -112,53 +161,29 @@ class TelegramExporter:
         self._load_checkpoint()
 
         # Media papkalarini yaratish (vaqtinchalik saqlash uchun)
-        media_folders = [
-            "photos",
-            "videos",
-            "audio",
-            "files",
-            "voices",
-            "round_videos",
-            "stickers",
-            "animations",
-        ]
-        for folder in media_folders:
+        for folder in MEDIA_FOLDERS:
             (self.output_dir / folder).mkdir(exist_ok=True)
 
-    def _get_media_unique_id(self, message: Message, media_type: str) -> Optional[str]:
+    def _get_media_unique_id(self, message: Message, media: MediaDescriptor) -> Optional[str]:
         """Media uchun unique ID ni olish (checkpoint uchun)"""
-        try:
-            if media_type == "photo" and message.photo:
-                return message.photo.file_unique_id
-            elif media_type == "video" and message.video:
-                return message.video.file_unique_id
-            elif media_type == "audio" and message.audio:
-                return message.audio.file_unique_id
-            elif media_type == "document" and message.document:
-                return message.document.file_unique_id
-            elif media_type == "voice" and message.voice:
-                return message.voice.file_unique_id
-            elif media_type == "video_note" and message.video_note:
-                return message.video_note.file_unique_id
-            elif media_type == "sticker" and message.sticker:
-                return message.sticker.file_unique_id
-            elif media_type == "animation" and message.animation:
-                return message.animation.file_unique_id
-        except:
-            pass
+        media_obj = getattr(message, media.name, None)
+        unique_id = getattr(media_obj, "file_unique_id", None)
+        if unique_id:
+            return unique_id
         # Fallback: message ID + media type
-        return f"{message.id}_{media_type}"
+        return f"{message.id}_{media.name}"
 
     def _is_media_processed(self, unique_id: str) -> bool:
         """Media allaqachon yuklab olingan va yuklanganligini tekshirish"""
         return unique_id in self.checkpoint_data.get("processed_media", set())
 
-    def _mark_media_processed(self, unique_id: str, s3_url: str):
-        """Media ni qayta ishlangan deb belgilash"""
+    def _mark_media_processed(self, unique_id: str, s3_url: str, save: bool = True):
+        """Media ni qayta ishlangan deb belgilash (save=False - checkpoint keyingi saqlashda yoziladi)"""
         if "processed_media" not in self.checkpoint_data:
             self.checkpoint_data["processed_media"] = {}
         self.checkpoint_data["processed_media"][unique_id] = s3_url
-        self._save_checkpoint()
+        if save:
+            self._save_checkpoint()
 
     def _load_checkpoint(self):
         """Checkpoint faylini yuklash"""
@@ -181,19 +206,252 @@ class TelegramExporter:
         """Checkpoint ni saqlash"""
         if self.checkpoint_file:
             try:
-                with open(self.checkpoint_file, "w", encoding="utf-8") as f:
-                    json.dump(self.checkpoint_data, f, ensure_ascii=False, indent=2)
+                with self.metrics.timer("checkpoint_seconds"):
+                    with open(self.checkpoint_file, "w", encoding="utf-8") as f:
+                        json.dump(self.checkpoint_data, f, ensure_ascii=False, indent=2)
             except Exception as e:
                 print(f"   ⚠️ Checkpoint saqlashda xato: {e}")
 
-    async def _download_media(self, message: Message, media_type: str) -> Optional[str]:
+    def _start_metrics(self):
+        """Metrikalar endpointi va davriy metrics.json yozuvchini ishga tushirish"""
+        if METRICS_PORT:
+            try:
+                self._metrics_server = MetricsServer(self.metrics, METRICS_PORT)
+                self._metrics_server.start()
+            except OSError as e:
+                print(f"   ⚠️ Metrikalar serverini ishga tushirib bo'lmadi: {e}")
+                self._metrics_server = None
+
+        self._metrics_writer = MetricsFileWriter(
+            self.metrics, self.output_dir / "metrics.json", METRICS_FILE_INTERVAL
+        )
+        self._metrics_writer.start()
+
+    def _stop_metrics(self):
+        """Metrikalarni to'xtatish (yakuniy metrics.json yoziladi)"""
+        if self._metrics_writer:
+            self._metrics_writer.stop()
+            self._metrics_writer = None
+        if self._metrics_server:
+            self._metrics_server.stop()
+            self._metrics_server = None
+
+    def _start_bundle(self):
+        """ZIP arxivni export bilan parallel yig'ishni boshlash (EXPORT_BUNDLE yoqilgan bo'lsa)"""
+        if not EXPORT_BUNDLE:
+            return
+        if EXPORT_BUNDLE not in ("local", "storage"):
+            print(f"   ⚠️ Noma'lum EXPORT_BUNDLE: {EXPORT_BUNDLE!r} (local yoki storage) - ZIP yaratilmaydi")
+            return
+
+        name = self.output_dir.name
+        if EXPORT_BUNDLE == "storage":
+            self.bundle = ExportBundle(
+                name, storage=self.storage, key=f"{self.chat_folder_name}/{name}.zip", metrics=self.metrics
+            )
+        else:
+            self.bundle = ExportBundle(name, local_path=self.output_dir.parent / f"{name}.zip", metrics=self.metrics)
+        self.bundle.start()
+        # Checkpoint dan davom etilganda oldingi ishga tushirishdagi media ham arxivga kiradi
+        self.bundle.add_tree(self.output_dir, MEDIA_FOLDERS)
+
+    async def _warm_up_storage(self):
+        """Saqlash joyini tayyorlash (S3 client va bucket tekshiruvi) - Telegram ulanishi bilan parallel"""
+        started = time.perf_counter()
+        ready = await self.storage.warm_up()
+        self.metrics.set("storage_warm_up_seconds", round(time.perf_counter() - started, 4))
+        if not ready:
+            print(f"   ⚠️ Saqlash joyi ({self.storage.name}) tayyor emas - fayllar yuklanmasligi mumkin")
+
+    async def _reconcile_storage(self):
+        """Chat papkasini saqlash joyidan bir marta ro'yxatlash (sahifali ListObjectsV2)
+
+        checkpoint.json yo'qolsa yoki export boshqa papkada davom etsa ham saqlash
+        joyida nomi va hajmi mos media qayta yuklab olinmaydi: processed_media xabarlar
+        kelishi bilan shu ro'yxatdan (so'rovsiz) tiklanadi, nusxalar va posterlar - darhol
+        (saqlash joyidagi checkpoint.json da qayd etilgan nomlar bo'yicha).
+        """
+        if not RECONCILE_STORAGE or not DOWNLOAD_MEDIA:
+            return
+        prefix = f"{self.chat_folder_name}/"
+        started = time.perf_counter()
+        objects: dict[str, int] = {}
+        try:
+            async for key, size in self.storage.list_sizes(prefix):
+                objects[key[len(prefix):]] = size
+        except Exception as e:
+            print(f"   ⚠️ Saqlash joyini ro'yxatlab bo'lmadi, media faqat checkpoint bo'yicha o'tkazib yuboriladi: {e}")
+            return
+        self.metrics.set("reconcile_seconds", round(time.perf_counter() - started, 4))
+        self.metrics.set("remote_objects", len(objects))
+        self.remote_objects = objects
+        if objects:
+            restored = await self._restore_derived_media()
+            print(f"   ☁️ Saqlash joyida {len(objects):,} ta obyekt bor ({restored} ta nusxa/poster tiklandi)")
+
+    async def _restore_derived_media(self) -> int:
+        """Rasm nusxalari va posterlarni saqlash joyidagi checkpoint.json dan tiklash
+
+        Nomlar fayl nomidan taxmin qilinmaydi - oldingi export checkpoint ida qayd
+        etilganlari olinadi va faqat asl media hamda barcha qo'shimcha fayllari
+        ro'yxatda bor yozuvlar qabul qilinadi (yuklanmay qolganlari qayta yaratiladi).
+        """
+        if "checkpoint.json" not in self.remote_objects:
+            return 0
+        try:
+            data = await self.storage.get(f"{self.chat_folder_name}/checkpoint.json")
+            stored = json.loads(data) if data else {}
+        except Exception as e:
+            print(f"   ⚠️ Saqlash joyidagi checkpoint.json ni o'qib bo'lmadi: {e}")
+            return 0
+
+        renditions = self.checkpoint_data.get("renditions") or {}
+        posters = self.checkpoint_data.get("posters") or {}
+        restored = 0
+        for original, poster in (stored.get("posters") or {}).items():
+            if original not in posters and original in self.remote_objects and poster in self.remote_objects:
+                posters[original] = poster
+                restored += 1
+        for original, items in (stored.get("renditions") or {}).items():
+            if original in renditions or original not in self.remote_objects:
+                continue
+            if items and all(item[0] in self.remote_objects for item in items):
+                renditions[original] = items
+                restored += len(items)
+
+        if renditions:
+            self.checkpoint_data["renditions"] = renditions
+        if posters:
+            self.checkpoint_data["posters"] = posters
+        return restored
+
+    def _remote_object(self, media: MediaDescriptor, media_obj) -> Optional[str]:
+        """Saqlash joyida shu media bilan bir xil nom va hajmdagi obyekt (ro'yxatdan)
+
+        Nom resumable_file_name() bilan aniqlanadi - yuklab olingan fayl ham shu nomni oladi.
+        """
+        file_size = getattr(media_obj, "file_size", None)
+        if not self.remote_objects or not file_size:
+            return None
+        object_name = f"{media.folder}/{resumable_file_name(media.name, media_obj)}"
+        if self.remote_objects.get(object_name) == file_size:
+            return object_name
+        return None
+
+    def _reuse_remote(self, object_name: str, media_unique_id: Optional[str], file_size: int) -> str:
+        """Saqlash joyidagi obyektni qayta ishlangan deb belgilash (checkpoint keyingi davriy saqlashda yoziladi)"""
+        if media_unique_id:
+            self._mark_media_processed(
+                media_unique_id, self.storage.url_for(f"{self.chat_folder_name}/{object_name}"), save=False
+            )
+        self.stats.remote_files += 1
+        self.metrics.inc("reconciled_bytes_total", file_size)
+        print(f"   ☁️ Saqlash joyida allaqachon bor: {object_name}")
+        return object_name
+
+    async def _wait_flood(self, error: FloodWait):
+        """FloodWait ni metrikaga yozib, kerakli vaqt kutish"""
+        seconds = error.value or 1
+        self.metrics.inc("flood_waits_total")
+        self.metrics.inc("flood_wait_seconds_total", seconds)
+        print(f"   ⏳ FloodWait: {seconds} sekund kutilmoqda...")
+        await asyncio.sleep(seconds)
+
+    async def _iter_history(self):
+        """get_chat_history ustidan o'rovchi
+
+        Har bir sahifani (HISTORY_PAGE_SIZE ta xabar) kutish vaqtini o'lchaydi va
+        FloodWait dan keyin oxirgi olingan xabardan davom ettiradi.
+        """
+        offset_id = 0
+        page_wait = 0.0
+        page_count = 0
+
+        while True:
+            history = self.app.get_chat_history(self.chat_id, offset_id=offset_id)
+            try:
+                while True:
+                    started = time.perf_counter()
+                    try:
+                        message = await history.__anext__()
+                    except StopAsyncIteration:
+                        if page_count:
+                            self.metrics.observe("history_page_seconds", page_wait)
+                            self.metrics.inc("history_pages_total")
+                        return
+
+                    page_wait += time.perf_counter() - started
+                    page_count += 1
+                    if page_count >= HISTORY_PAGE_SIZE:
+                        self.metrics.observe("history_page_seconds", page_wait)
+                        self.metrics.inc("history_pages_total")
+                        page_wait, page_count = 0.0, 0
+
+                    offset_id = message.id
+                    yield message
+            except FloodWait as e:
+                await self._wait_flood(e)
+
+    async def _get_total_messages(self) -> Optional[int]:
+        """Chatdagi jami xabarlar sonini olish (progress va ETA uchun)"""
+        for attempt in range(MAX_FLOOD_WAIT_RETRIES + 1):
+            try:
+                total = await self.app.get_chat_history_count(self.chat_id)
+            except FloodWait as e:
+                if attempt < MAX_FLOOD_WAIT_RETRIES:
+                    await self._wait_flood(e)
+                    continue
+                print(f"   ⚠️ Xabarlar sonini olib bo'lmadi: {e}")
+                return None
+            except Exception as e:
+                print(f"   ⚠️ Xabarlar sonini olib bo'lmadi: {e}")
+                return None
+            return total or None
+        return None
+
+    async def _download_file(self, message: Message, media: MediaDescriptor,
+                             download_path: Path) -> tuple[Optional[str], Optional[FileDigest]]:
+        """Faylni metrikalar va FloodWait qayta urinishlari bilan yuklab olish: (yo'l, xeshlar)
+
+        Katta fayllar (RESUMABLE_MIN_BYTES dan) bo'laklab, uzilgan joyidan davom ettirib,
+        kichiklari bitta oqimda yuklanadi; ikkalasida ham xesh baytlar kelishi bilan hisoblanadi.
+        Hajmi noma'lum fayllar message.download() bilan yuklanib, keyin xeshlanadi.
+        """
+        media_obj = getattr(message, media.name, None)
+        file_size = getattr(media_obj, "file_size", None) or 0
+
+        for attempt in range(MAX_FLOOD_WAIT_RETRIES + 1):
+            try:
+                with self.metrics.in_flight("downloads"), self.metrics.timer("download_seconds"):
+                    if file_size >= RESUMABLE_MIN_BYTES:
+                        file_path, digest = await self.downloader.download(message, media.name, media_obj, download_path)
+                    elif file_size:
+                        file_path, digest = await self.downloader.fetch(message, media.name, media_obj, download_path)
+                    else:
+                        file_path = await message.download(file_name=str(download_path) + "/")
+                        digest = await asyncio.to_thread(file_digest, file_path) if file_path else None
+            except FloodWait as e:
+                if attempt == MAX_FLOOD_WAIT_RETRIES:
+                    raise
+                await self._wait_flood(e)
+                continue
+
+            if file_path:
+                size = os.path.getsize(file_path)
+                self.metrics.inc("download_bytes_total", size)
+                self.progress.media_completed(size)
+            return file_path, digest
+        return None, None
+
+    async def _download_media(self, message: Message, media: MediaDescriptor) -> Optional[str]:
         """Media faylni yuklab oladi va S3 ga yuklaydi"""
         if not DOWNLOAD_MEDIA:
             return None
 
+        claimed: Optional[FileDigest] = None  # Shu chaqiruv yuklashi kerak bo'lgan kontent
         try:
             # Media unique ID ni olish
-            media_unique_id = self._get_media_unique_id(message, media_type)
+            media_unique_id = self._get_media_unique_id(message, media)
             
             # Agar allaqachon qayta ishlangan bo'lsa, S3 URL ni qaytarish
             if media_unique_id and self._is_media_processed(media_unique_id):
@@ -202,23 +460,8 @@ class TelegramExporter:
                 return s3_url
 
             # Fayl hajmini tekshirish
-            file_size = None
-            if media_type == "photo" and message.photo:
-                file_size = message.photo.file_size
-            elif media_type == "video" and message.video:
-                file_size = message.video.file_size
-            elif media_type == "audio" and message.audio:
-                file_size = message.audio.file_size
-            elif media_type == "document" and message.document:
-                file_size = message.document.file_size
-            elif media_type == "voice" and message.voice:
-                file_size = message.voice.file_size
-            elif media_type == "video_note" and message.video_note:
-                file_size = message.video_note.file_size
-            elif media_type == "sticker" and message.sticker:
-                file_size = message.sticker.file_size
-            elif media_type == "animation" and message.animation:
-                file_size = message.animation.file_size
+            media_obj = getattr(message, media.name, None)
+            file_size = getattr(media_obj, "file_size", None)
 
             if file_size and file_size > MAX_FILE_SIZE_MB * 1024 * 1024:
                 print(
@@ -226,203 +469,346 @@ class TelegramExporter:
                 )
                 return None
 
-            folder = get_media_folder(media_type)
+            # Checkpoint da yo'q, lekin saqlash joyida bor (ZIP yig'ilayotgan bo'lsa fayl baribir kerak)
+            remote_object = self._remote_object(media, media_obj)
+            if remote_object and not self.bundle:
+                return self._reuse_remote(remote_object, media_unique_id, file_size)
+
+            self.progress.media_expected(file_size)
+
+            folder = media.folder
             download_path = self.output_dir / folder
 
-            # Faylni yuklab olish
-            file_path = await message.download(file_name=str(download_path) + "/")
+            # Faylni yuklab olish (muvaffaqiyatsiz bo'lsa kutilgan baytlar ETA dan chiqariladi)
+            try:
+                file_path, digest = await self._download_file(message, media, download_path)
+            except Exception:
+                self.progress.media_failed(file_size)
+                raise
+            if not file_path:
+                self.progress.media_failed(file_size)
 
             if file_path:
-                file_path_obj = Path(file_path)
-                file_name = file_path_obj.name
-                
-                # S3 ga yuklash
+                file_name = Path(file_path).name
                 object_name = f"{folder}/{file_name}"
+
+                if digest:
+                    duplicate = await self._find_duplicate(digest, object_name)
+                    if duplicate:
+                        return self._reuse_duplicate(file_path, duplicate, media_unique_id, digest)
+                    claimed = self._claim_digest(digest, object_name)
+
                 print(f"   📤 S3 ga yuklashga tayyorlanmoqda: {file_name} ({format_file_size(file_size) if file_size else 'N/A'})")
-                success, s3_url = upload_to_b2(
-                    str(file_path),
-                    object_name=object_name,
-                    chat_folder=self.chat_folder_name
-                )
-                
-                if success and s3_url:
-                    # Media ni qayta ishlangan deb belgilash
-                    if media_unique_id:
-                        # Checkpoint da S3 URL ni saqlash (keyinroq foydalanish uchun)
-                        self._mark_media_processed(media_unique_id, s3_url)
-                    
-                    # Lokal faylni saqlab qolish (zip yuklab olish uchun)
-                    # Fayl S3 ga yuklangan, lekin lokal nusxasi ham kerak
-                    print(f"   💾 Lokal fayl saqlanib qoldi (zip uchun): {file_name}")
-                    
-                    self.stats.downloaded_files += 1
-                    if file_size:
-                        self.stats.download_size_bytes += file_size
-                    
-                    # Nisbiy yo'l qaytarish (zip yuklab olish uchun)
-                    # Format: folder/filename (masalan: photos/photo_123.jpg)
-                    relative_path = f"{folder}/{file_name}"
-                    return relative_path
+
+                if self.transcoder and self.transcoder.supports(media.name, file_path):
+                    # Kodlash fonda, jarayonlar havzasida - keyingi xabarlar kutib turmaydi
+                    await self.transcoder.slots.acquire()
+                    task = asyncio.create_task(self._make_renditions(file_path, object_name))
+                    self._pending_uploads.add(task)
+                    task.add_done_callback(self._pending_uploads.discard)
+                elif self.transcoder and self.transcoder.needs_preview(media.name, file_path) \
+                        and not (VIDEO_POSTERS and media.name in POSTER_MEDIA):
+                    # .tgs/.webm stiker: statik ko'rinish Telegram thumbnail idan (GIF da - posterdan)
+                    thumb = largest_thumbnail(media_obj)
+                    if thumb is not None:
+                        await self.transcoder.slots.acquire()
+                        task = asyncio.create_task(self._make_renditions(file_path, object_name, thumb))
+                        self._pending_uploads.add(task)
+                        task.add_done_callback(self._pending_uploads.discard)
+
+                if VIDEO_POSTERS and media.name in POSTER_MEDIA:
+                    task = asyncio.create_task(self._make_poster(message, media, file_path, object_name))
+                    self._pending_uploads.add(task)
+                    task.add_done_callback(self._pending_uploads.discard)
+
+                if remote_object == object_name:
+                    # Faqat ZIP uchun yuklab olindi - saqlash joyiga qayta yuklanmaydi
+                    self._catalog_media(digest, object_name)
+                    self._reuse_remote(remote_object, media_unique_id, file_size)
+                    self._release_digest(claimed, object_name)
+                    claimed = None
+                elif is_small_object(file_path):
+                    # Kichik fayl: fonda yuklanadi, xabarlar oqimi kutib turmaydi
+                    await self._upload_slots.acquire()
+                    task = asyncio.create_task(
+                        self._upload_media(file_path, object_name, media_unique_id, file_size, digest)
+                    )
+                    claimed = None  # Natijani _upload_media e'lon qiladi
+                    self._pending_uploads.add(task)
+                    task.add_done_callback(self._pending_uploads.discard)
                 else:
-                    print(f"   ⚠️ S3 ga yuklash muvaffaqiyatsiz: {file_name}")
-                    print(f"   💾 Lokal fayl saqlanib qoldi: {file_path}")
-                    # Agar S3 ga yuklash muvaffaqiyatsiz bo'lsa, lokal faylni saqlab qolish
-                    return f"{folder}/{file_name}"
+                    await self._upload_slots.acquire()
+                    claimed = None
+                    await self._upload_media(file_path, object_name, media_unique_id, file_size, digest)
+
+                # Nisbiy yo'l qaytarish (zip yuklab olish uchun)
+                # Format: folder/filename (masalan: photos/photo_123.jpg)
+                # Lokal fayl S3 ga yuklash natijasidan qat'i nazar saqlanib qoladi
+                if self.bundle:
+                    self.bundle.add(file_path, object_name)
+
+                return object_name
 
         except Exception as e:
             self.stats.failed_downloads += 1
             print(f"   ❌ Yuklab olishda xato: {e}")
+        finally:
+            if claimed is not None:
+                # Yuklashgacha yetib bormadi - kutayotgan takroriylar o'zi yuklaydi
+                self._release_digest(claimed, object_name, success=False)
 
         return None
 
-    def _serialize_message(
-        self, message: Message, media_url: str = None
-    ) -> dict[str, Any]:
-        """Message ob'yektini dict ga o'tkazadi"""
-        data = {
-            "id": message.id,
-            "date": message.date.isoformat() if message.date else None,
-            "chat_id": message.chat.id if message.chat else None,
-            "from_user": None,
-            "sender_chat": None,
-            "text": message.text,
-            "caption": message.caption,
-            "media_type": message.media.name if message.media else None,
-            "media_url": media_url,  # S3 URL yoki lokal fayl yo'li
-            "local_file": media_url,  # Qayta ishlash uchun eski nom (backward compatibility)
-            "views": message.views,
-            "forwards": message.forwards,
-            "edit_date": message.edit_date.isoformat() if message.edit_date else None,
-            "reply_to_message_id": message.reply_to_message_id,
-            "forward_from_chat": None,
-            "forward_date": (
-                message.forward_date.isoformat() if message.forward_date else None
-            ),
-            "media_group_id": message.media_group_id,
-        }
-
-        # Foydalanuvchi ma'lumotlari
-        if message.from_user:
-            data["from_user"] = {
-                "id": message.from_user.id,
-                "username": message.from_user.username,
-                "first_name": message.from_user.first_name,
-                "last_name": message.from_user.last_name,
+    def _claim_digest(self, digest: FileDigest, object_name: str) -> FileDigest:
+        """Kontent shu object nomi bilan yuklanishini e'lon qiladi (bir xil fayllar natijani kutadi)"""
+        self._digest_uploads[digest.sha256] = (object_name, asyncio.get_running_loop().create_future())
+        return digest
+
+    def _release_digest(self, digest: Optional[FileDigest], object_name: str, success: bool = True):
+        """Yuklash natijasini kutayotgan takroriy fayllarga e'lon qiladi"""
+        if digest is None:
+            return
+        pending = self._digest_uploads.get(digest.sha256)
+        if pending and pending[0] == object_name:
+            del self._digest_uploads[digest.sha256]
+            if not pending[1].done():
+                pending[1].set_result(success)
+
+    def _catalog_media(self, digest: Optional[FileDigest], object_name: str):
+        """Saqlash joyida bor obyektni kontent katalogiga yozadi (faqat muvaffaqiyatli yuklashdan keyin)"""
+        if digest:
+            self.checkpoint_data.setdefault("media_catalog", {})[digest.sha256] = {
+                "object": object_name, **digest.to_dict(),
             }
 
-        # Sender chat ma'lumotlari
-        if message.sender_chat:
-            data["sender_chat"] = {
-                "id": message.sender_chat.id,
-                "title": message.sender_chat.title,
-                "username": message.sender_chat.username,
-            }
-
-        # Forward ma'lumotlari
-        if message.forward_from_chat:
-            data["forward_from_chat"] = {
-                "id": message.forward_from_chat.id,
-                "title": message.forward_from_chat.title,
-            }
+    async def _find_duplicate(self, digest: FileDigest, object_name: str) -> Optional[str]:
+        """Shu kontent (SHA-256 va hajm) avval boshqa nom bilan yuklanganmi - o'sha object nomi
+
+        Kontent hozir boshqa nom bilan yuklanayotgan bo'lsa natija kutiladi: yuklash
+        muvaffaqiyatsiz bo'lsa katalogda yozuv bo'lmaydi va fayl odatdagidek yuklanadi.
+        """
+        while (pending := self._digest_uploads.get(digest.sha256)) and pending[0] != object_name:
+            await pending[1]
+        entry = self.checkpoint_data.get("media_catalog", {}).get(digest.sha256)
+        if entry and entry["object"] != object_name and entry["size"] == digest.size:
+            return entry["object"]
+        return None
 
-        # Media ma'lumotlari
-        if message.media:
-            if message.media == MessageMediaType.PHOTO and message.photo:
-                data["photo"] = {
-                    "file_id": message.photo.file_id,
-                    "width": message.photo.width,
-                    "height": message.photo.height,
-                    "file_size": message.photo.file_size,
-                }
-            elif message.media == MessageMediaType.VIDEO and message.video:
-                data["video"] = {
-                    "file_id": message.video.file_id,
-                    "width": message.video.width,
-                    "height": message.video.height,
-                    "duration": message.video.duration,
-                    "file_name": message.video.file_name,
-                    "mime_type": message.video.mime_type,
-                    "file_size": message.video.file_size,
-                }
-            elif message.media == MessageMediaType.AUDIO and message.audio:
-                data["audio"] = {
-                    "file_id": message.audio.file_id,
-                    "duration": message.audio.duration,
-                    "performer": message.audio.performer,
-                    "title": message.audio.title,
-                    "file_name": message.audio.file_name,
-                    "mime_type": message.audio.mime_type,
-                    "file_size": message.audio.file_size,
-                }
-            elif message.media == MessageMediaType.DOCUMENT and message.document:
-                data["document"] = {
-                    "file_id": message.document.file_id,
-                    "file_name": message.document.file_name,
-                    "mime_type": message.document.mime_type,
-                    "file_size": message.document.file_size,
-                }
-            elif message.media == MessageMediaType.VOICE and message.voice:
-                data["voice"] = {
-                    "file_id": message.voice.file_id,
-                    "duration": message.voice.duration,
-                    "mime_type": message.voice.mime_type,
-                    "file_size": message.voice.file_size,
-                }
-            elif message.media == MessageMediaType.VIDEO_NOTE and message.video_note:
-                data["video_note"] = {
-                    "file_id": message.video_note.file_id,
-                    "length": message.video_note.length,
-                    "duration": message.video_note.duration,
-                    "file_size": message.video_note.file_size,
-                }
-            elif message.media == MessageMediaType.STICKER and message.sticker:
-                data["sticker"] = {
-                    "file_id": message.sticker.file_id,
-                    "width": message.sticker.width,
-                    "height": message.sticker.height,
-                    "emoji": message.sticker.emoji,
-                    "set_name": message.sticker.set_name,
-                }
-            elif message.media == MessageMediaType.ANIMATION and message.animation:
-                data["animation"] = {
-                    "file_id": message.animation.file_id,
-                    "width": message.animation.width,
-                    "height": message.animation.height,
-                    "duration": message.animation.duration,
-                    "file_name": message.animation.file_name,
-                    "file_size": message.animation.file_size,
-                }
-            elif message.media == MessageMediaType.POLL and message.poll:
-                data["poll"] = {
-                    "id": message.poll.id,
-                    "question": message.poll.question,
-                    "options": [
-                        {"text": opt.text, "voter_count": opt.voter_count}
-                        for opt in message.poll.options
-                    ],
-                    "total_voter_count": message.poll.total_voter_count,
-                    "is_closed": message.poll.is_closed,
-                }
-            elif message.media == MessageMediaType.LOCATION and message.location:
-                data["location"] = {
-                    "latitude": message.location.latitude,
-                    "longitude": message.location.longitude,
-                }
-            elif message.media == MessageMediaType.CONTACT and message.contact:
-                data["contact"] = {
-                    "phone_number": message.contact.phone_number,
-                    "first_name": message.contact.first_name,
-                    "last_name": message.contact.last_name,
-                }
-            elif message.media == MessageMediaType.WEB_PAGE and message.web_page:
-                data["web_page"] = {
-                    "url": message.web_page.url,
-                    "title": message.web_page.title,
-                    "description": message.web_page.description,
-                    "site_name": message.web_page.site_name,
-                }
+    def _reuse_duplicate(self, file_path: str, existing: str, media_unique_id: Optional[str],
+                         digest: FileDigest) -> str:
+        """Takroriy fayl (masalan, qayta yuklangan forward) o'rniga avvalgi object ishlatiladi"""
+        Path(file_path).unlink(missing_ok=True)
+        if media_unique_id:
+            self._mark_media_processed(media_unique_id, self.storage.url_for(f"{self.chat_folder_name}/{existing}"))
+        self.stats.duplicate_files += 1
+        self.metrics.inc("dedup_bytes_total", digest.size)
+        print(f"   ♻️ Bir xil fayl allaqachon bor, qayta yuklanmaydi: {existing}")
+        return existing
+
+    async def _upload_media(self, file_path: str, object_name: str, media_unique_id: Optional[str],
+                            file_size: Optional[int], digest: Optional[FileDigest] = None):
+        """Media faylni upload thread poolida S3 ga yuklaydi (slot oldindan olingan bo'lishi kerak)
+
+        digest berilsa CRC32 checksum sifatida yuboriladi - server faylni yuklab olingan baytlar bilan solishtiradi.
+        """
+        file_name = Path(file_path).name
+        try:
+            with self.metrics.in_flight("uploads"):
+                success, s3_url = await self.storage.put(
+                    f"{self.chat_folder_name}/{object_name}", str(file_path), metrics=self.metrics, checksum=digest
+                )
+        except Exception as e:
+            success, s3_url = False, None
+            print(f"   ❌ S3 ga yuklashda xato: {e}")
+        finally:
+            self._upload_slots.release()
+
+        if success and s3_url:
+            # Katalog yozuvi processed_media bilan bitta checkpoint saqlashida yoziladi -
+            # davom ettirilganda muvaffaqiyatsiz yuklashlar bilan dedup qilinmaydi
+            self._catalog_media(digest, object_name)
+            # Media ni qayta ishlangan deb belgilash
+            if media_unique_id:
+                # Checkpoint da S3 URL ni saqlash (keyinroq foydalanish uchun)
+                self._mark_media_processed(media_unique_id, s3_url)
+
+            # Lokal faylni saqlab qolish (zip yuklab olish uchun)
+            # Fayl S3 ga yuklangan, lekin lokal nusxasi ham kerak
+            print(f"   💾 Lokal fayl saqlanib qoldi (zip uchun): {file_name}")
+
+            self.stats.downloaded_files += 1
+            if file_size:
+                self.stats.download_size_bytes += file_size
+        else:
+            print(f"   ⚠️ S3 ga yuklash muvaffaqiyatsiz: {file_name}")
+            print(f"   💾 Lokal fayl saqlanib qoldi: {file_path}")
+        self._release_digest(digest, object_name, success=bool(success and s3_url))
+
+    async def _make_renditions(self, file_path: str, media_object: str, thumb=None):
+        """Rasmning WebP/AVIF nusxalarini yaratadi va fonda yuklaydi (kodlash sloti oldindan olingan)
+
+        file_path - kodlanadigan rasm (GIF uchun - uning posteri); thumb berilsa nusxalar
+        shu Telegram thumbnail idan olinadi. Nusxalar nomi va checkpoint kaliti har doim
+        asl media bo'yicha - davom ettirilganda (va takroriy xabarlarda) ham viewer srcset oladi.
+        """
+        folder, _, media_file = media_object.rpartition("/")
+        stem = Path(media_file).stem
+        source = file_path
+        renditions = []
+        try:
+            if thumb is not None:
+                source = str(Path(file_path).with_name(f"{stem}.thumb.jpg"))
+                try:
+                    if not await self._download_thumbnail(thumb, source):
+                        return
+                except Exception as e:
+                    print(f"   ⚠️ Statik ko'rinish uchun thumbnail olinmadi ({media_file}): {e}")
+                    return
+            with self.metrics.timer("transcode_seconds"):
+                results = await self.transcoder.renditions(source, stem)
+        except Exception as e:
+            print(f"   ⚠️ Rasm nusxalari yaratilmadi ({media_file}): {e}")
+            return
+        finally:
+            self.transcoder.slots.release()
+            if thumb is not None:
+                Path(source).unlink(missing_ok=True)
+        for file_name, width, fmt in results:
+            rendition_path = Path(source).with_name(file_name)
+            object_name = f"{folder}/{file_name}"
+            renditions.append([object_name, width, fmt])
+            self.metrics.inc("rendition_bytes_total", rendition_path.stat().st_size)
+
+            await self._upload_derived(rendition_path, object_name)
+
+        if renditions:
+            self.checkpoint_data.setdefault("renditions", {})[media_object] = renditions
+
+    async def _download_thumbnail(self, thumb, target: str) -> bool:
+        """Telegram thumbnail/cover ni target ga yuklab olish (FloodWait qayta urinishlari bilan)"""
+        for attempt in range(MAX_FLOOD_WAIT_RETRIES + 1):
+            try:
+                return bool(await self.app.download_media(thumb.file_id, file_name=target))
+            except FloodWait as e:
+                if attempt == MAX_FLOOD_WAIT_RETRIES:
+                    raise
+                await self._wait_flood(e)
+        return False
+
+    async def _make_poster(self, message: Message, media: MediaDescriptor, file_path: str, media_object: str):
+        """Video poster: Telegram thumbnail (cover) yoki ffmpeg bilan olingan kadr
+
+        GIF (animation) posteridan rasm nusxalari ham yaratiladi - viewer dagi statik ko'rinish.
+        """
+        target = poster_path(file_path)
+        thumb = best_thumbnail(getattr(message, media.name, None))
+        created = False
+        try:
+            if thumb is not None:
+                created = await self._download_thumbnail(thumb, str(target))
+            if not created:
+                created = await extract_frame(file_path, target)
+        except Exception as e:
+            print(f"   ⚠️ Video posterini olib bo'lmadi ({Path(file_path).name}): {e}")
+            return
+
+        if created:
+            object_name = f"{media_object.rsplit('/', 1)[0]}/{target.name}"
+            self.checkpoint_data.setdefault("posters", {})[media_object] = object_name
+            await self._upload_derived(target, object_name)
+            if self.transcoder and self.transcoder.needs_preview(media.name, file_path):
+                await self.transcoder.slots.acquire()
+                await self._make_renditions(str(target), media_object)
+
+    async def _upload_derived(self, file_path: Path, object_name: str):
+        """Rasm nusxasi yoki posterni fonda yuklaydi va ZIP ga qo'shadi"""
+        await self._upload_slots.acquire()
+        task = asyncio.create_task(self._upload_derived_file(file_path, object_name))
+        self._pending_uploads.add(task)
+        task.add_done_callback(self._pending_uploads.discard)
+        if self.bundle:
+            self.bundle.add(file_path, object_name)
+
+    async def _upload_derived_file(self, file_path: Path, object_name: str):
+        """Bitta qo'shimcha faylni yuklaydi (slot oldindan olingan bo'lishi kerak)"""
+        try:
+            success, _ = await self.storage.put(
+                f"{self.chat_folder_name}/{object_name}", str(file_path), metrics=self.metrics
+            )
+            if not success:
+                print(f"   ⚠️ {file_path.name} yuklash muvaffaqiyatsiz")
+        except Exception as e:
+            print(f"   ❌ {file_path.name} yuklashda xato: {e}")
+        finally:
+            self._upload_slots.release()
+
+    def _attach_derived_media(self):
+        """Rasm nusxalari va video posterlarini (checkpoint dan) xabarlarga biriktirish
+
+        Barcha fondagi kodlash/yuklashlar tugagandan keyin chaqiriladi.
+        """
+        renditions = self.checkpoint_data.get("renditions") or {}
+        posters = self.checkpoint_data.get("posters") or {}
+        if not renditions and not posters:
+            return
+        for record in self.messages:
+            if record.media_url:
+                media_object = self._convert_s3_url_to_relative_path(record.media_url)
+                record.renditions = renditions.get(media_object)
+                record.poster = posters.get(media_object)
+
+    async def _wait_uploads(self):
+        """Fondagi barcha media yuklashlari tugashini kutish"""
+        if self._pending_uploads:
+            print(f"   ⏳ {len(self._pending_uploads)} ta media S3 ga yuklanishi kutilmoqda...")
+        # Rasm nusxalarini kodlash tugagach yangi yuklashlar qo'shiladi
+        while self._pending_uploads:
+            await asyncio.gather(*list(self._pending_uploads))
+
+    async def _message_media(self, message: Message) -> Optional[str]:
+        """Xabar media sini yuklab olish (yuklanadigan media bo'lmasa None)"""
+        if message.media and DOWNLOAD_MEDIA:
+            media = MEDIA_BY_ENUM.get(message.media)
+            if media and media.downloadable and getattr(message, media.name, None):
+                return await self._download_media(message, media)
+        return None
 
-        return data
+    async def _process_batch(self, messages: list[Message]):
+        """Xabarlar guruhini (oddiy xabar yoki butun albom) qayta ishlash
+
+        Albom fayllari bitta so'rovlar to'lqinida parallel yuklanadi: 10 ta rasmli
+        albom 10 marta emas, bir marta kechikish kutadi.
+        """
+        counted = self.stats.total_messages
+        for message in messages:
+            self._update_stats(message)
+        # Har 50 xabarda checkpoint: albom 50 ga karrali chegarani kesib o'tsa ham saqlanadi
+        checkpoint_due = counted // 50 != self.stats.total_messages // 50
+        if len(messages) > 1:
+            self.stats.albums += 1
+
+        # Media yuklab olish
+        media_urls = await asyncio.gather(*(self._message_media(message) for message in messages))
+
+        for message, media_url in zip(messages, media_urls):
+            # Xabarni qo'shish
+            started = time.perf_counter()
+            msg_data = self._serialize_message(message, media_url)
+            self.metrics.observe("serialize_seconds", time.perf_counter() - started)
+            self.messages.append(msg_data)
+
+            # Progress
+            self.progress.message_done()
+
+        # Checkpoint ni yangilash (albom to'liq qayta ishlangandan keyin)
+        self.checkpoint_data["last_message_id"] = messages[-1].id
+        if checkpoint_due:
+            self._save_checkpoint()
+        self.progress.maybe_report()
+
+    def _serialize_message(self, message: Message, media_url: str = None) -> MessageRecord:
+        """Message ob'yektini ixcham MessageRecord ga o'tkazadi (dict faqat saqlashda yaratiladi)"""
+        return self.records.build(message, media_url)
 
     def _update_stats(self, message: Message):
         """Statistikani yangilash"""
@@ -431,52 +817,36 @@ class TelegramExporter:
         if message.text and not message.media:
             self.stats.text_messages += 1
         elif message.media:
-            media_type = message.media
-            if media_type == MessageMediaType.PHOTO:
-                self.stats.photos += 1
-            elif media_type == MessageMediaType.VIDEO:
-                self.stats.videos += 1
-            elif media_type == MessageMediaType.AUDIO:
-                self.stats.audios += 1
-            elif media_type == MessageMediaType.DOCUMENT:
-                self.stats.documents += 1
-            elif media_type == MessageMediaType.VOICE:
-                self.stats.voices += 1
-            elif media_type == MessageMediaType.VIDEO_NOTE:
-                self.stats.video_notes += 1
-            elif media_type == MessageMediaType.STICKER:
-                self.stats.stickers += 1
-            elif media_type == MessageMediaType.ANIMATION:
-                self.stats.animations += 1
-            elif media_type == MessageMediaType.POLL:
-                self.stats.polls += 1
-            elif media_type == MessageMediaType.CONTACT:
-                self.stats.contacts += 1
-            elif media_type == MessageMediaType.LOCATION:
-                self.stats.locations += 1
-            elif media_type == MessageMediaType.WEB_PAGE:
-                self.stats.web_pages += 1
+            media = MEDIA_BY_ENUM.get(message.media)
+            if media:
+                setattr(self.stats, media.stats_field, getattr(self.stats, media.stats_field) + 1)
 
     async def export(self):
         """Asosiy export funksiyasi"""
+        try:
+            await self._export()
+        finally:
+            await self.storage.close()
+            self._stop_metrics()
+            if self.transcoder:
+                self.transcoder.close()
+
+    async def _export(self):
+        """Export bosqichlari: chat ma'lumoti, xabarlar, media, saqlash va yuklash"""
         print("=" * 60)
         print("  🚀 TELEGRAM CHAT EXPORTER")
         print("=" * 60)
         print(f"\n📥 Chat tarixini yuklab olish boshlanmoqda: {self.chat_id}")
 
+        # Saqlash joyini tayyorlash (S3 bucket tekshiruvi) Telegram ga ulanish bilan parallel
+        started = time.perf_counter()
+        storage_warm_up = asyncio.create_task(self._warm_up_storage())
+
         async with self.app:
             # Chat ma'lumotlarini olish
             try:
                 chat = await self.app.get_chat(self.chat_id)
-                self.chat_info = {
-                    "id": chat.id,
-                    "title": chat.title or chat.first_name,
-                    "username": chat.username,
-                    "type": chat.type.name if chat.type else None,
-                    "members_count": chat.members_count,
-                    "description": chat.description,
-                    "linked_chat_id": chat.linked_chat.id if chat.linked_chat else None,
-                }
+                self.chat_info = chat_info(chat)
                 print(
                     f"✅ Chat topildi: {self.chat_info['title'] or self.chat_info['username']}"
                 )
@@ -492,13 +862,29 @@ class TelegramExporter:
 
                 # Papkani yaratish
                 self._setup_output_dir()
+                self._start_metrics()
+                self._start_bundle()
 
             except Exception as e:
                 print(f"❌ Chat topilmadi: {e}")
+                # Fondagi bucket tekshiruvi kutilmagan task bo'lib qolmasin
+                storage_warm_up.cancel()
+                await asyncio.gather(storage_warm_up, return_exceptions=True)
                 return
 
+            await storage_warm_up
+            self.metrics.set("startup_seconds", round(time.perf_counter() - started, 4))
+
+            # Saqlash joyida allaqachon bor media (checkpoint siz davom ettirish uchun)
+            await self._reconcile_storage()
+
             # Xabarlarni yuklash
             print("\n📨 Xabarlar yuklanmoqda...")
+
+            # Progress va ETA uchun jami xabarlar soni
+            self.progress.total_messages = await self._get_total_messages()
+            if self.progress.total_messages:
+                print(f"   📊 Chatda {self.progress.total_messages:,} ta xabar bor")
             
             # Checkpoint dan davom ettirish
             last_message_id = self.checkpoint_data.get("last_message_id")
@@ -507,53 +893,35 @@ class TelegramExporter:
             if resume_from_checkpoint:
                 print(f"   🔄 Checkpoint dan davom ettirilmoqda (message ID: {last_message_id})...")
 
-            async for message in self.app.get_chat_history(self.chat_id):
+            album: list[Message] = []
+
+            async for message in self._iter_history():
                 # Checkpoint dan davom ettirish
                 if resume_from_checkpoint:
                     if message.id == last_message_id:
                         resume_from_checkpoint = False
                         print(f"   ✅ Checkpoint dan davom ettirildi")
                     else:
+                        # Avval eksport qilingan - jami sondan chiqariladi, tezlik (ETA) ga qo'shilmaydi
+                        self.progress.message_skipped()
                         continue
-                
-                self._update_stats(message)
-
-                # Media yuklab olish
-                media_url = None
-                if message.media and DOWNLOAD_MEDIA:
-                    media_type = None
-                    if message.photo:
-                        media_type = "photo"
-                    elif message.video:
-                        media_type = "video"
-                    elif message.audio:
-                        media_type = "audio"
-                    elif message.document:
-                        media_type = "document"
-                    elif message.voice:
-                        media_type = "voice"
-                    elif message.video_note:
-                        media_type = "video_note"
-                    elif message.sticker:
-                        media_type = "sticker"
-                    elif message.animation:
-                        media_type = "animation"
-
-                    if media_type:
-                        media_url = await self._download_media(message, media_type)
-
-                # Xabarni qo'shish
-                msg_data = self._serialize_message(message, media_url)
-                self.messages.append(msg_data)
-
-                # Checkpoint ni yangilash
-                self.checkpoint_data["last_message_id"] = message.id
-                if self.stats.total_messages % 50 == 0:
-                    self._save_checkpoint()
-
-                # Progress
-                if self.stats.total_messages % 100 == 0:
-                    print(f"   ✓ {self.stats.total_messages} ta xabar yuklandi...")
+
+                # Albom a'zolari tarixda ketma-ket keladi - albom tugaguncha yig'iladi
+                if album and message.media_group_id != album[0].media_group_id:
+                    await self._process_batch(album)
+                    album = []
+                if message.media_group_id:
+                    album.append(message)
+                    continue
+
+                await self._process_batch([message])
+
+            if album:
+                await self._process_batch(album)
+
+            await self._wait_uploads()
+
+        self.progress.maybe_report(force=True)
 
         # Xabarlarni teskari tartibga o'tkazish (eski -> yangi)
         self.messages.reverse()
@@ -562,9 +930,12 @@ class TelegramExporter:
         print(
             f"📦 {self.stats.downloaded_files} ta fayl yuklandi ({format_file_size(self.stats.download_size_bytes)})"
         )
+        if self.stats.remote_files:
+            print(f"☁️ {self.stats.remote_files} ta fayl saqlash joyida allaqachon bor edi")
 
         # Yakuniy checkpoint ni saqlash
         self._save_checkpoint()
+        self._attach_derived_media()
 
         # Ma'lumotlarni saqlash
         self._save_data()
@@ -572,38 +943,66 @@ class TelegramExporter:
         # Web interfeys yaratish
         self._generate_web_viewer()
 
-        # Barcha export fayllarini S3 ga yuklash
-        self._upload_export_to_s3()
+        # ZIP arxivni yakunlash export fayllarini yuklash bilan parallel
+        bundle_task = None
+        if self.bundle:
+            self.bundle.add(self.output_dir / "chat_data.json", "chat_data.json")
+            self.bundle.add(self.output_dir / "index.html", "index.html")
+            self.bundle.add(self.output_dir / "sw.js", "sw.js")
+            for path in viewer_data_paths(self.output_dir):
+                self.bundle.add(path, path.relative_to(self.output_dir).as_posix())
+            bundle_task = asyncio.create_task(self.bundle.close())
+
+        # Barcha export fayllarini saqlash joyiga yuklash
+        await self._upload_export()
+
+        if bundle_task:
+            location = await bundle_task
+            if location:
+                print(f"\n🗜️ ZIP arxiv: {location} ({format_file_size(self.bundle.size)}, {self.bundle.files} ta fayl)")
+            else:
+                print(f"\n⚠️ ZIP arxiv yaratilmadi")
 
         print(f"\n🎉 Export muvaffaqiyatli yakunlandi!")
         print(f"📂 Papka: {self.output_dir}")
         print(f"🌐 Web viewer: {self.output_dir / 'index.html'}")
 
     def _save_data(self):
-        """Ma'lumotlarni JSON ga saqlash"""
-        export_data = {
+        """Ma'lumotlarni JSON ga saqlash
+
+        Xabarlar bittalab dict ga o'tkazilib to'g'ridan-to'g'ri faylga kodlanadi -
+        butun export uchun bitta katta dict/qator xotirada yaratilmaydi.
+        """
+        header = {
             "export_date": datetime.now().isoformat(),
             "chat_info": self.chat_info,
             "statistics": asdict(self.stats),
             "total_messages": len(self.messages),
-            "messages": self.messages,
         }
 
-        # JSON faylga saqlash
+        # JSON faylga saqlash (JSON_PRETTY=1 bo'lsa indent=2 bilan)
         json_path = self.output_dir / "chat_data.json"
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(export_data, f, ensure_ascii=False, indent=2)
+        with open(json_path, "wb") as f:
+            jsonio.write_document(
+                f, header, "messages", (record.to_dict() for record in self.messages), pretty=JSON_PRETTY,
+                trailer={
+                    "albums": album_index(self.messages),
+                    # Media fayllar xeshlari: arxivni Telegram dan qayta yuklamasdan tekshirish uchun
+                    "media_catalog": list(self.checkpoint_data.get("media_catalog", {}).values()),
+                },
+            )
 
         print(f"💾 Ma'lumotlar saqlandi: {json_path}")
         print(f"📊 Fayl hajmi: {format_file_size(json_path.stat().st_size)}")
 
-    def _upload_export_to_s3(self):
-        """Barcha export fayllarini S3 ga yuklash"""
-        print(f"\n📤 Export fayllarini S3 ga yuklash boshlanmoqda...")
+    async def _upload_export(self):
+        """Barcha export fayllarini saqlash joyiga (S3 yoki lokal) yuklash"""
+        print(f"\n📤 Export fayllarini yuklash boshlanmoqda ({self.storage.name})...")
         
         files_to_upload = [
             ("chat_data.json", "chat_data.json"),
             ("index.html", "index.html"),
+            ("sw.js", "sw.js"),
             ("checkpoint.json", "checkpoint.json"),
         ]
         
@@ -615,21 +1014,19 @@ class TelegramExporter:
                 try:
                     # object_name ni to'g'ri formatda yaratish
                     object_name = f"{self.chat_folder_name}/{s3_filename}"
-                    success, s3_url = upload_to_b2(
-                        str(file_path),
-                        object_name=object_name,
-                        chat_folder=None  # object_name da allaqachon chat_folder bor
-                    )
+                    success, s3_url = await self.storage.put(object_name, str(file_path), metrics=self.metrics)
                     
                     if success and s3_url:
                         uploaded_urls[local_filename] = s3_url
-                        print(f"   ✅ {local_filename} S3 ga yuklandi")
+                        print(f"   ✅ {local_filename} yuklandi")
                     else:
-                        print(f"   ⚠️ {local_filename} S3 ga yuklashda xato")
+                        print(f"   ⚠️ {local_filename} yuklashda xato")
                 except Exception as e:
                     print(f"   ❌ {local_filename} yuklashda xato: {e}")
             else:
                 print(f"   ⚠️ {local_filename} topilmadi")
+
+        await self._upload_viewer_data()
         
         # S3 URL larni saqlash
         if uploaded_urls:
@@ -646,13 +1043,9 @@ class TelegramExporter:
             # s3_info.json ni ham S3 ga yuklash
             try:
                 s3_info_object_name = f"{self.chat_folder_name}/s3_info.json"
-                success, s3_info_url = upload_to_b2(
-                    str(s3_info_path),
-                    object_name=s3_info_object_name,
-                    chat_folder=None
-                )
+                success, s3_info_url = await self.storage.put(s3_info_object_name, str(s3_info_path))
                 if success:
-                    print(f"   ✅ s3_info.json S3 ga yuklandi")
+                    print(f"   ✅ s3_info.json yuklandi")
             except Exception as e:
                 print(f"   ⚠️ s3_info.json yuklashda xato: {e}")
             
@@ -662,6 +1055,30 @@ class TelegramExporter:
                 print(f"\n💡 Bu URL ni istalgan joydan ochib chat tarixini ko'rishingiz mumkin!")
                 print(f"💡 Barcha media fayllar S3 da saqlanadi va HTML ichida ko'rinadi!")
 
+    async def _upload_viewer_data(self):
+        """Viewer ma'lumot bo'laklarini (data/*.js) parallel yuklash"""
+        paths = viewer_data_paths(self.output_dir)
+        if not paths:
+            return
+        slots = asyncio.Semaphore(self.storage.max_concurrency)
+
+        async def put(path: Path) -> bool:
+            object_name = f"{self.chat_folder_name}/{path.relative_to(self.output_dir).as_posix()}"
+            async with slots:
+                try:
+                    success, _ = await self.storage.put(object_name, str(path), metrics=self.metrics)
+                    return success
+                except Exception as e:
+                    print(f"   ❌ {path.name} yuklashda xato: {e}")
+                    return False
+
+        results = await asyncio.gather(*(put(path) for path in paths))
+        uploaded = sum(results)
+        if uploaded == len(paths):
+            print(f"   ✅ {uploaded} ta ma'lumot bo'lagi yuklandi")
+        else:
+            print(f"   ⚠️ Ma'lumot bo'laklari: {uploaded}/{len(paths)} ta yuklandi")
+
     def _convert_s3_url_to_relative_path(self, url: str) -> str:
         """S3 URL ni nisbiy yo'lga o'zgartirish (zip yuklab olish uchun)"""
         if not url:
@@ -696,25 +1113,26 @@ class TelegramExporter:
         """Web viewer HTML yaratish"""
         # Export ma'lumotlarini tayyorlash
         # Media URL larni nisbiy yo'llarga o'zgartirish
-        messages_with_relative_paths = []
-        for msg in self.messages:
-            msg_copy = msg.copy()
-            if msg_copy.get('media_url'):
-                msg_copy['media_url'] = self._convert_s3_url_to_relative_path(msg_copy['media_url'])
-            if msg_copy.get('local_file'):
-                msg_copy['local_file'] = self._convert_s3_url_to_relative_path(msg_copy.get('local_file', ''))
-            messages_with_relative_paths.append(msg_copy)
-        
-        export_data = {
+        header = {
             "export_date": datetime.now().isoformat(),
             "chat_info": self.chat_info,
             "statistics": asdict(self.stats),
             "total_messages": len(self.messages),
-            "messages": messages_with_relative_paths,
         }
 
-        # JSON ni string ga o'tkazish (HTML ichiga embed qilish uchun)
-        json_data = json.dumps(export_data, ensure_ascii=False)
+        def relative_message(record: MessageRecord) -> dict:
+            msg = record.to_dict()
+            if msg['media_url']:
+                msg['media_url'] = msg['local_file'] = self._convert_s3_url_to_relative_path(msg['media_url'])
+            return msg
+
+        # Xabarlar data/ dagi bo'laklarga yoziladi, HTML ichiga faqat indeks joylanadi
+        index = write_viewer_data(self.messages, self.output_dir, relative_message)
+        viewer_index = {**header, **index}
+
+        # Export versiyasi: o'zgarsa service worker eski index/data keshlarini o'chiradi
+        viewer_index["version"] = hashlib.sha256(jsonio.dumps(viewer_index)).hexdigest()[:16]
+        json_data = jsonio.script_safe(jsonio.dumps(viewer_index).decode("utf-8"))
 
         html_content = self._get_html_template(json_data)
 
@@ -722,7 +1140,155 @@ class TelegramExporter:
         with open(html_path, "w", encoding="utf-8") as f:
             f.write(html_content)
 
-        print(f"🌐 Web viewer yaratildi: {html_path}")
+        with open(self.output_dir / "sw.js", "w", encoding="utf-8") as f:
+            f.write(self._get_service_worker_template())
+
+        print(f"🌐 Web viewer yaratildi: {html_path} ({len(index['chunks'])} ta ma'lumot bo'lagi)")
+
+    def _get_service_worker_template(self) -> str:
+        """Viewer service worker i (sw.js): qayta ochishda index, data va rasmlar keshdan
+
+        - index.html: keshdan darhol, fonda yangilanadi (stale-while-revalidate)
+        - data/*.js: export versiyasi bo'yicha kesh (versiya sw.js?v=... orqali keladi)
+        - rasmlar: versiyadan mustaqil, VIEWER_MEDIA_CACHE_MB bilan cheklangan LRU
+        Video/audio (Range so'rovlari) va boshqa exportlar keshlanmaydi.
+        """
+        return (
+            """// Telegram Chat Exporter - viewer service worker
+const VERSION = new URL(self.location.href).searchParams.get('v') || 'dev';
+const SCOPE = self.registration.scope;
+const PREFIX = `tg-viewer:${SCOPE}:`;
+const SHELL_CACHE = `${PREFIX}shell:${VERSION}`;
+const DATA_CACHE = `${PREFIX}data:${VERSION}`;
+const MEDIA_CACHE = `${PREFIX}media`;
+const MEDIA_CACHE_BYTES = """
+            + str(VIEWER_MEDIA_CACHE_MB * 1024 * 1024)
+            + """;
+const LRU_KEY = new URL('__media_lru__', SCOPE).href;
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(
+        caches.open(SHELL_CACHE)
+            .then(cache => cache.add(new URL('index.html', SCOPE).href))
+            .catch(() => {})
+            .then(() => self.skipWaiting())
+    );
+});
+
+// Boshqa versiyalarning index/data keshlari o'chiriladi (media keshi qoladi)
+self.addEventListener('activate', (event) => {
+    event.waitUntil(
+        caches.keys()
+            .then(names => Promise.all(names
+                .filter(name => name.startsWith(PREFIX) && ![SHELL_CACHE, DATA_CACHE, MEDIA_CACHE].includes(name))
+                .map(name => caches.delete(name))))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    if (request.method !== 'GET' || request.headers.has('range') || !request.url.startsWith(SCOPE)) return;
+
+    const path = new URL(request.url).pathname.slice(new URL(SCOPE).pathname.length);
+    if (request.mode === 'navigate' || path === '' || path === 'index.html') {
+        event.respondWith(staleWhileRevalidate(event, request));
+    } else if (path.startsWith('data/')) {
+        event.respondWith(cacheFirst(DATA_CACHE, request));
+    } else if (request.destination === 'image') {
+        event.respondWith(mediaCacheFirst(request));
+    }
+});
+
+async function staleWhileRevalidate(event, request) {
+    const cache = await caches.open(SHELL_CACHE);
+    const cached = await cache.match(request, { ignoreSearch: true });
+    const network = fetch(request).then((response) => {
+        if (response.ok) cache.put(request, response.clone());
+        return response;
+    });
+    if (cached) {
+        event.waitUntil(network.catch(() => {}));
+        return cached;
+    }
+    return network;
+}
+
+async function cacheFirst(cacheName, request) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.ok) cache.put(request, response.clone());
+    return response;
+}
+
+// Rasmlar: URL -> hajm, Map tartibi - oxirgi ishlatilgan oxirida
+let lru = null;
+let lruLoading = null;
+let lruBytes = 0;
+let lruSaveTimer = null;
+
+function loadLru(cache) {
+    if (!lruLoading) {
+        lruLoading = (async () => {
+            const entries = new Map();
+            const saved = await cache.match(LRU_KEY);
+            if (saved) {
+                for (const [url, size] of await saved.json()) {
+                    entries.set(url, size);
+                    lruBytes += size;
+                }
+            }
+            lru = entries;
+        })();
+    }
+    return lruLoading;
+}
+
+function saveLru(cache) {
+    clearTimeout(lruSaveTimer);
+    lruSaveTimer = setTimeout(() => {
+        cache.put(LRU_KEY, new Response(JSON.stringify([...lru]), { headers: { 'Content-Type': 'application/json' } }));
+    }, 1000);
+}
+
+async function mediaCacheFirst(request) {
+    const cache = await caches.open(MEDIA_CACHE);
+    await loadLru(cache);
+
+    const cached = await cache.match(request);
+    if (cached && lru.has(request.url)) {
+        const size = lru.get(request.url);
+        lru.delete(request.url);
+        lru.set(request.url, size);
+        saveLru(cache);
+        return cached;
+    }
+
+    const response = await fetch(request);
+    if (!response.ok || response.type !== 'basic') return response;
+
+    const blob = await response.clone().blob();
+    if (blob.size > MEDIA_CACHE_BYTES / 4) return response;
+
+    await cache.put(request, new Response(blob, { headers: response.headers }));
+    if (lru.has(request.url)) lruBytes -= lru.get(request.url);
+    lru.set(request.url, blob.size);
+    lruBytes += blob.size;
+
+    // Chegaradan oshsa eng uzoq ishlatilmaganlar o'chiriladi
+    for (const [url, size] of lru) {
+        if (lruBytes <= MEDIA_CACHE_BYTES) break;
+        lru.delete(url);
+        lruBytes -= size;
+        await cache.delete(url);
+    }
+    saveLru(cache);
+    return response;
+}
+"""
+        )
 
     def _get_html_template(self, json_data: str) -> str:
         """HTML template qaytaradi"""
@@ -944,6 +1510,92 @@ class TelegramExporter:
             margin-top: 0.25rem;
         }
 
+        .search-status {
+            margin-bottom: 1rem;
+            font-size: 0.85rem;
+            color: var(--text-secondary);
+            text-align: center;
+        }
+
+        /* Senders */
+        .senders {
+            margin-bottom: 1.5rem;
+        }
+
+        .sender-search {
+            width: 100%;
+            margin-bottom: 0.5rem;
+        }
+
+        .sender-list {
+            max-height: 280px;
+            overflow-y: auto;
+        }
+
+        .sender-name {
+            min-width: 0;
+            overflow: hidden;
+            text-overflow: ellipsis;
+            white-space: nowrap;
+            text-align: left;
+        }
+
+        .sender-username {
+            font-size: 0.75rem;
+            opacity: 0.7;
+        }
+
+        .sender-active {
+            align-items: center;
+            gap: 0.5rem;
+            padding: 0.5rem 1rem;
+            margin-bottom: 0.5rem;
+            border-radius: 10px;
+            background: var(--accent-gradient);
+            color: white;
+            font-size: 0.85rem;
+        }
+
+        .sender-clear {
+            margin-left: auto;
+            border: none;
+            background: transparent;
+            color: white;
+            cursor: pointer;
+        }
+
+        /* Timeline */
+        .timeline {
+            margin-bottom: 1.5rem;
+        }
+
+        .timeline-date {
+            width: 100%;
+            margin-bottom: 0.5rem;
+        }
+
+        .timeline-months {
+            max-height: 240px;
+            overflow-y: auto;
+        }
+
+        .timeline-month {
+            display: flex;
+            width: 100%;
+            padding: 0.4rem 1rem;
+            border: none;
+            border-radius: 8px;
+            background: transparent;
+            color: var(--text-secondary);
+            font-size: 0.85rem;
+            cursor: pointer;
+        }
+
+        .timeline-month:hover {
+            background: var(--bg-tertiary);
+            color: var(--text-primary);
+        }
+
         /* Filter Buttons */
         .filters {
             margin-bottom: 1.5rem;
@@ -1062,6 +1714,11 @@ class TelegramExporter:
             background: var(--bg-tertiary);
         }
 
+        .message-media picture,
+        .sticker-container picture {
+            display: contents;
+        }
+
         .message-media img {
             max-width: 100%;
             max-height: 400px;
@@ -1079,6 +1736,37 @@ class TelegramExporter:
             width: 100%;
         }
 
+        .album-grid {
+            display: grid;
+            grid-template-columns: repeat(2, 1fr);
+            gap: 2px;
+            margin: 0.75rem 0;
+            border-radius: 12px;
+            overflow: hidden;
+        }
+
+        .album-grid-1 {
+            grid-template-columns: 1fr;
+        }
+
+        .album-grid-3 > :first-child {
+            grid-column: span 2;
+        }
+
+        .album-grid .message-media {
+            margin: 0;
+            border-radius: 0;
+            aspect-ratio: 1;
+        }
+
+        .album-grid .message-media img,
+        .album-grid .message-media video {
+            width: 100%;
+            height: 100%;
+            max-height: none;
+            object-fit: cover;
+        }
+
         .media-placeholder {
             padding: 1.5rem;
             text-align: center;
@@ -1117,8 +1805,45 @@ class TelegramExporter:
         }
 
         /* Reply & Forward */
+        .jump-input {
+            width: 110px;
+            padding: 0.75rem 1rem;
+            border-radius: 12px;
+            border: 1px solid var(--border-color);
+            background: var(--bg-secondary);
+            color: var(--text-primary);
+            font-size: 0.9rem;
+        }
+
+        .message-highlight {
+            box-shadow: 0 0 0 2px var(--accent-primary);
+        }
+
+        a.message-reply {
+            display: block;
+            text-decoration: none;
+            white-space: nowrap;
+            overflow: hidden;
+            text-overflow: ellipsis;
+        }
+
+        .reply-sender {
+            color: var(--accent-primary);
+            font-weight: 600;
+        }
+
+        .message-replies {
+            margin: 0.75rem 0 0;
+        }
+
+        .message-replies a {
+            color: var(--accent-primary);
+            text-decoration: none;
+        }
+
         .message-reply,
-        .message-forward {
+        .message-forward,
+        .message-replies {
             background: rgba(99, 102, 241, 0.1);
             border-left: 3px solid var(--accent-primary);
             padding: 0.5rem 0.75rem;
@@ -1218,6 +1943,72 @@ class TelegramExporter:
             max-height: 200px;
         }
 
+        .video-poster {
+            position: relative;
+            cursor: pointer;
+            min-height: 120px;
+            background: var(--bg-tertiary);
+        }
+
+        .video-poster img {
+            display: block;
+            width: 100%;
+        }
+
+        .video-poster-empty {
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            height: 180px;
+            font-size: 2.5rem;
+        }
+
+        .video-play {
+            position: absolute;
+            top: 50%;
+            left: 50%;
+            transform: translate(-50%, -50%);
+            width: 56px;
+            height: 56px;
+            border-radius: 50%;
+            background: rgba(0, 0, 0, 0.6);
+            color: #fff;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            font-size: 1.5rem;
+        }
+
+        .video-duration {
+            position: absolute;
+            left: 0.5rem;
+            bottom: 0.5rem;
+            padding: 0.1rem 0.4rem;
+            border-radius: 6px;
+            background: rgba(0, 0, 0, 0.6);
+            color: #fff;
+            font-size: 0.75rem;
+        }
+
+        .video-poster-round,
+        .video-round {
+            width: 200px;
+            height: 200px;
+            min-height: 0;
+            border-radius: 50%;
+            overflow: hidden;
+            object-fit: cover;
+        }
+
+        .album-grid .video-poster {
+            height: 100%;
+        }
+
+        .video-poster-round img {
+            height: 100%;
+            object-fit: cover;
+        }
+
         .sticker-emoji {
             margin-top: 0.5rem;
             font-size: 0.85rem;
@@ -1362,6 +2153,7 @@ class TelegramExporter:
                 </svg>
                 <input type="text" class="search-input" id="searchInput" placeholder="Xabarlarni qidirish...">
             </div>
+            <input type="number" class="jump-input" id="jumpInput" placeholder="Xabar ID" min="1">
         </div>
     </header>
 
@@ -1426,6 +2218,19 @@ class TelegramExporter:
                 </button>
             </div>
 
+            <div class="senders">
+                <h3 class="stats-title">Yuboruvchilar <span class="filter-count" id="senderTotal"></span></h3>
+                <input type="text" class="jump-input sender-search" id="senderSearch" placeholder="Ism yoki username...">
+                <div class="sender-active" id="senderActive" style="display: none;"></div>
+                <div class="sender-list" id="senderList"></div>
+            </div>
+
+            <div class="timeline">
+                <h3 class="stats-title">Xronologiya</h3>
+                <input type="date" class="jump-input timeline-date" id="jumpDate">
+                <div class="timeline-months" id="timelineMonths"></div>
+            </div>
+
             <div class="export-info">
                 <h3 class="stats-title">Export ma'lumotlari</h3>
                 <p style="font-size: 0.85rem; color: var(--text-secondary);">
@@ -1439,6 +2244,10 @@ class TelegramExporter:
             <div class="loading" id="loading">
                 <div class="loading-spinner"></div>
             </div>
+            <div class="load-more" id="showFromStart" style="display: none;">
+                <button class="load-more-btn" id="showFromStartBtn">⬆️ Boshidan ko'rsatish</button>
+            </div>
+            <div class="search-status" id="searchStatus" style="display: none;"></div>
             <div class="messages-list" id="messagesList"></div>
             <div class="load-more" id="loadMore" style="display: none;">
                 <button class="load-more-btn" id="loadMoreBtn">Ko'proq yuklash</button>
@@ -1453,12 +2262,151 @@ class TelegramExporter:
             + """;
 
         // Global variables
-        let allMessages = chatData.messages;
-        let displayedMessages = 0;
+        const chunkIndex = chatData.chunks;  // [birinchi_id, oxirgi_id, xabarlar_soni], ID lar o'suvchi
+        const chunkCache = new Map();  // bo'lak raqami -> Promise
+        const loadedChunks = new Map();
         const MESSAGES_PER_PAGE = 50;
+        let feed = { chunk: 0, pos: 0 };  // keyingi ko'rsatiladigan xabar
+        let feedToken = 0;  // filtr/sakrash o'zgarsa eski yuklashlar bekor bo'ladi
+        let loadingMore = false;
+        let currentDate = '';  // oxirgi sana ajratgichining kuni (YYYY-MM-DD)
+        const dayBuckets = chatData.days || [];  // [YYYY-MM-DD, birinchi_id, bo'lak, soni], sana bo'yicha o'suvchi
+        const dayLabels = new Map();
         let currentFilter = 'all';
         let searchQuery = '';
 
+        // data/*.js faylini <script> orqali yuklash (file:// da ham ishlaydi);
+        // fayl ichidagi viewerChunk/viewerSenders/... chaqiruvi onload dan oldin bajariladi
+        function loadScript(url) {
+            return new Promise((resolve, reject) => {
+                const script = document.createElement('script');
+                script.src = url;
+                script.onload = () => {
+                    script.remove();
+                    resolve();
+                };
+                script.onerror = () => {
+                    script.remove();
+                    reject(new Error(`${url} yuklanmadi`));
+                };
+                document.head.appendChild(script);
+            });
+        }
+
+        // Bo'lak fayli (data/messages_NNNNN.js) yuklanganda chaqiriladi
+        function viewerChunk(index, data) {
+            data.positions = new Map(data.messages.map((msg, i) => [msg.id, i]));
+            loadedChunks.set(index, data);
+        }
+
+        function chunkUrl(index) {
+            return `data/messages_${String(index).padStart(5, '0')}.js`;
+        }
+
+        // Bo'lakni bir marta yuklash
+        function loadChunk(index) {
+            if (!chunkCache.has(index)) {
+                const promise = loadScript(chunkUrl(index)).then(() => {
+                    const data = loadedChunks.get(index);
+                    loadedChunks.delete(index);
+                    return data;
+                });
+                promise.catch(() => chunkCache.delete(index));
+                chunkCache.set(index, promise);
+            }
+            return chunkCache.get(index);
+        }
+
+        // Yuboruvchilar jadvali (data/senders.js) va xabar ID lari (data/sender_ids_NNN.js) - kerak bo'lganda
+        let senderTable = [];  // [id, nom, username, xabarlar_soni, birinchi_sana, oxirgi_sana], ko'p yozganlar birinchi
+        let senderTablePromise = null;
+        const senderShards = new Map();
+        const loadedSenderShards = new Map();
+        let senderFilter = null;  // { id, name, ids }
+
+        function viewerSenders(table) {
+            senderTable = table;
+        }
+
+        function viewerSenderIds(shard, ids) {
+            loadedSenderShards.set(shard, ids);
+        }
+
+        function loadSenders() {
+            if (!senderTablePromise) {
+                senderTablePromise = loadScript('data/senders.js').then(() => senderTable);
+                senderTablePromise.catch(() => { senderTablePromise = null; });
+            }
+            return senderTablePromise;
+        }
+
+        async function loadSenderIds(senderId) {
+            const shards = chatData.sender_shards || 1;
+            const shard = ((senderId % shards) + shards) % shards;  // Python dagi key % shards
+            if (!senderShards.has(shard)) {
+                const promise = loadScript(`data/sender_ids_${String(shard).padStart(3, '0')}.js`).then(() => {
+                    const ids = loadedSenderShards.get(shard);
+                    loadedSenderShards.delete(shard);
+                    return ids;
+                });
+                promise.catch(() => senderShards.delete(shard));
+                senderShards.set(shard, promise);
+            }
+            return (await senderShards.get(shard))[senderId] || [];
+        }
+
+        // Yuboruvchilar ro'yxati (qidiruv bo'yicha, eng ko'pi 50 ta)
+        function renderSenderList(query) {
+            const q = query.toLowerCase();
+            const rows = [];
+            for (const sender of senderTable) {
+                if (!q || sender[1].toLowerCase().includes(q) || (sender[2] || '').toLowerCase().includes(q)) {
+                    rows.push(sender);
+                    if (rows.length >= 50) break;
+                }
+            }
+            document.getElementById('senderList').innerHTML = rows.map(([id, name, username, count, first, last]) => `
+                <button class="filter-btn sender-btn" data-sender="${id}" title="${(first || '').slice(0, 10)} — ${(last || '').slice(0, 10)}">
+                    <span class="sender-name">${escapeHtml(name)}${username ? ` <span class="sender-username">@${escapeHtml(username)}</span>` : ''}</span>
+                    <span class="filter-count">${count.toLocaleString()}</span>
+                </button>`).join('');
+        }
+
+        function setSenderFilter(value) {
+            senderFilter = value;
+            const active = document.getElementById('senderActive');
+            if (value) {
+                active.innerHTML = `👤 ${escapeHtml(value.name)} (${value.ids.length.toLocaleString()}) <button class="sender-clear" id="senderClear">✕</button>`;
+                active.style.display = 'flex';
+            } else {
+                active.innerHTML = '';
+                active.style.display = 'none';
+            }
+        }
+
+        async function selectSender(senderId) {
+            const sender = senderTable.find(row => row[0] === senderId);
+            const ids = await loadSenderIds(senderId);
+            setSenderFilter({ id: senderId, name: sender ? sender[1] : String(senderId), ids });
+            resetAndReload();
+        }
+
+        // Xabar ID si joylashgan bo'lak (binar qidiruv), topilmasa -1
+        function findChunk(messageId) {
+            let lo = 0, hi = chunkIndex.length - 1;
+            while (lo <= hi) {
+                const mid = (lo + hi) >> 1;
+                if (messageId < chunkIndex[mid][0]) {
+                    hi = mid - 1;
+                } else if (messageId > chunkIndex[mid][1]) {
+                    lo = mid + 1;
+                } else {
+                    return mid;
+                }
+            }
+            return -1;
+        }
+
         // Load chat data - darhol ishga tushirish
         function loadChatData() {
             try {
@@ -1512,8 +2460,14 @@ class TelegramExporter:
 
             // Hide loading, show messages
             document.getElementById('loading').style.display = 'none';
-            loadMoreMessages();
+            renderTimeline();
+            startSearchWorker();
+            registerServiceWorker();
+            document.getElementById('senderTotal').textContent = (chatData.senders || 0).toLocaleString();
             setupEventListeners();
+            if (!jumpToHash()) {
+                loadMoreMessages();
+            }
         }
 
         // Format chat type
@@ -1528,84 +2482,458 @@ class TelegramExporter:
             return types[type] || type;
         }
 
-        // Get filtered messages
-        function getFilteredMessages() {
-            let filtered = [...allMessages];
+        // Reply ko'rinishidagi media nomi
+        function formatMediaType(type) {
+            const types = {
+                'PHOTO': '🖼️ Rasm',
+                'VIDEO': '🎬 Video',
+                'AUDIO': '🎵 Audio',
+                'DOCUMENT': '📁 Fayl',
+                'VOICE': '🎤 Ovozli xabar',
+                'VIDEO_NOTE': '⭕ Video xabar',
+                'STICKER': '😀 Stiker',
+                'ANIMATION': '🎞️ GIF'
+            };
+            return types[type] || type;
+        }
+
+        // Sana ajratgichi matni - har bir kun uchun bir marta formatlanadi
+        function dayLabel(day) {
+            if (!dayLabels.has(day)) {
+                dayLabels.set(day, new Date(`${day}T00:00:00`).toLocaleDateString('uz-UZ', {
+                    year: 'numeric',
+                    month: 'long',
+                    day: 'numeric'
+                }));
+            }
+            return dayLabels.get(day);
+        }
+
+        // Oylar ro'yxati (xronologiya paneli)
+        function renderTimeline() {
+            const months = chatData.months || [];
+            document.getElementById('timelineMonths').innerHTML = months.map(([month, , , count]) => {
+                const label = new Date(`${month}-01T00:00:00`).toLocaleDateString('uz-UZ', { year: 'numeric', month: 'long' });
+                return `<button class="timeline-month" data-date="${month}-01">${label}<span class="filter-count">${count.toLocaleString()}</span></button>`;
+            }).join('');
+
+            if (dayBuckets.length) {
+                const input = document.getElementById('jumpDate');
+                input.min = dayBuckets[0][0];
+                input.max = dayBuckets[dayBuckets.length - 1][0];
+            }
+        }
+
+        // Filtr va qidiruvga mos keladimi (query - kichik harflarda); Web Worker da ham ishlatiladi
+        function messageMatches(msg, filter, query) {
+            if (filter !== 'all') {
+                if (filter === 'text') {
+                    if (!(msg.text && !msg.media_type)) return false;
+                } else if (!(msg.media_type && msg.media_type.toLowerCase() === filter)) {
+                    return false;
+                }
+            }
 
-            // Apply filter
-            if (currentFilter !== 'all') {
-                filtered = filtered.filter(msg => {
-                    if (currentFilter === 'text') {
-                        return msg.text && !msg.media_type;
+            if (query) {
+                const text = (msg.text || '').toLowerCase();
+                const caption = (msg.caption || '').toLowerCase();
+                return text.includes(query) || caption.includes(query);
+            }
+            return true;
+        }
+
+        function matchesFilter(msg) {
+            return messageMatches(msg, currentFilter, searchQuery.toLowerCase());
+        }
+
+        // Web Worker: bo'laklarni o'zi yuklab filtr va qidiruvni fon threadida bajaradi,
+        // natijalarni bo'laklab yuboradi. Bu funksiya sahifada chaqirilmaydi - matni Worker ga beriladi.
+        function searchWorkerMain() {
+            const CACHE_LIMIT = 64;  // Worker xotirasidagi bo'laklar (LRU)
+            const POST_EVERY = 50;
+            const POST_INTERVAL_MS = 100;
+            const cache = new Map();
+            const relayWaiters = new Map();
+            let base = '';
+            let relay = false;
+            let chunks = [];
+            let activeQuery = 0;
+            let loaded = null;
+
+            self.viewerChunk = (index, data) => {
+                loaded = data;
+            };
+
+            function remember(index, data) {
+                cache.set(index, data);
+                if (cache.size > CACHE_LIMIT) cache.delete(cache.keys().next().value);
+                return data;
+            }
+
+            async function getChunk(index) {
+                if (cache.has(index)) {
+                    const data = cache.get(index);
+                    cache.delete(index);
+                    return remember(index, data);
+                }
+                if (!relay) {
+                    try {
+                        importScripts(new URL(`data/messages_${String(index).padStart(5, '0')}.js`, base).href);
+                        return remember(index, loaded);
+                    } catch (error) {
+                        relay = true;  // file:// da Worker faylni o'qiy olmaydi - bo'lakni sahifa yuboradi
                     }
-                    return msg.media_type && msg.media_type.toLowerCase() === currentFilter.toUpperCase();
+                }
+                const data = await new Promise(resolve => {
+                    relayWaiters.set(index, resolve);
+                    self.postMessage({ type: 'need', index });
                 });
+                return remember(index, data);
             }
 
-            // Apply search
-            if (searchQuery) {
-                const query = searchQuery.toLowerCase();
-                filtered = filtered.filter(msg => {
-                    const text = (msg.text || '').toLowerCase();
-                    const caption = (msg.caption || '').toLowerCase();
-                    return text.includes(query) || caption.includes(query);
-                });
+            function findChunk(messageId) {
+                let lo = 0, hi = chunks.length - 1;
+                while (lo <= hi) {
+                    const mid = (lo + hi) >> 1;
+                    if (messageId < chunks[mid][0]) hi = mid - 1;
+                    else if (messageId > chunks[mid][1]) lo = mid + 1;
+                    else return mid;
+                }
+                return -1;
             }
 
-            return filtered;
+            // Ko'rib chiqiladigan bo'laklar: hammasi yoki faqat yuboruvchi ID lari joylashganlari
+            function plan(ids) {
+                if (!ids) return chunks.map((_, index) => [index, null]);
+                const steps = [];
+                for (const id of ids) {
+                    const index = findChunk(id);
+                    if (index < 0) continue;
+                    const last = steps[steps.length - 1];
+                    if (last && last[0] === index) last[1].push(id);
+                    else steps.push([index, [id]]);
+                }
+                return steps;
+            }
+
+            async function runQuery(q) {
+                let batch = [];
+                let lastPost = Date.now();
+                const steps = plan(q.ids);
+                const post = (done, scanned) => {
+                    self.postMessage({ type: 'results', id: q.id, matches: batch, done, scanned, total: steps.length });
+                    batch = [];
+                    lastPost = Date.now();
+                };
+
+                for (let step = 0; step < steps.length; step++) {
+                    const [index, ids] = steps[step];
+                    const data = await getChunk(index);
+                    // Bekor qilish xabari kelishi uchun navbat bo'shatiladi
+                    await new Promise(resolve => setTimeout(resolve, 0));
+                    if (q.id !== activeQuery) return;
+
+                    let messages = data.messages;
+                    if (ids) {
+                        data.positions = data.positions || new Map(messages.map((msg, i) => [msg.id, i]));
+                        messages = ids.map(id => messages[data.positions.get(id)]).filter(Boolean);
+                    }
+                    for (const msg of messages) {
+                        if (messageMatches(msg, q.filter, q.query)) {
+                            batch.push({ chunk: index, msg, reply: data.replies[msg.id], children: data.children[msg.id] });
+                        }
+                    }
+                    if (batch.length >= POST_EVERY || Date.now() - lastPost >= POST_INTERVAL_MS) {
+                        post(false, step + 1);
+                    }
+                }
+                post(true, steps.length);
+            }
+
+            self.onmessage = (e) => {
+                const msg = e.data;
+                if (msg.type === 'init') {
+                    base = msg.base;
+                    relay = msg.relay;
+                    chunks = msg.chunks;
+                } else if (msg.type === 'query') {
+                    activeQuery = msg.id;
+                    runQuery(msg);
+                } else if (msg.type === 'cancel') {
+                    if (activeQuery === msg.id) activeQuery = 0;
+                } else if (msg.type === 'chunk') {
+                    const resolve = relayWaiters.get(msg.index);
+                    relayWaiters.delete(msg.index);
+                    if (resolve) resolve(msg.data);
+                }
+            };
         }
 
-        // Load more messages
-        function loadMoreMessages() {
-            const filtered = getFilteredMessages();
-            const messagesToLoad = filtered.slice(displayedMessages, displayedMessages + MESSAGES_PER_PAGE);
-            
-            if (messagesToLoad.length === 0 && displayedMessages === 0) {
-                document.getElementById('messagesList').innerHTML = `
+        let searchWorker = null;
+        let queryCounter = 0;
+
+        // Service worker (sw.js): qayta ochishda index, ma'lumot bo'laklari va rasmlar keshdan.
+        // Faqat http(s) da ishlaydi; versiya o'zgarsa eski keshlar o'chiriladi.
+        function registerServiceWorker() {
+            if (!('serviceWorker' in navigator) || !/^https?:$/.test(location.protocol)) return;
+            navigator.serviceWorker.register(`sw.js?v=${encodeURIComponent(chatData.version)}`)
+                .catch(error => console.warn('Service worker ishga tushmadi:', error));
+        }
+
+        // Worker ishga tushmasa filtr va qidiruv asosiy threadda bajariladi
+        function startSearchWorker() {
+            try {
+                const source = `${messageMatches.toString()};(${searchWorkerMain.toString()})();`;
+                searchWorker = new Worker(URL.createObjectURL(new Blob([source], { type: 'text/javascript' })));
+            } catch (error) {
+                console.warn('Web Worker ishga tushmadi, qidiruv asosiy threadda bajariladi:', error);
+                searchWorker = null;
+                return;
+            }
+            searchWorker.onmessage = onWorkerMessage;
+            searchWorker.onerror = (error) => console.error('Qidiruv Worker xatosi:', error);
+            searchWorker.postMessage({
+                type: 'init',
+                base: location.href,
+                relay: location.protocol === 'file:',
+                chunks: chunkIndex
+            });
+        }
+
+        function onWorkerMessage(e) {
+            const msg = e.data;
+            if (msg.type === 'need') {
+                loadChunk(msg.index).then(data => searchWorker.postMessage({
+                    type: 'chunk',
+                    index: msg.index,
+                    data: { messages: data.messages, replies: data.replies, children: data.children }
+                }), console.error);
+                return;
+            }
+
+            const f = feed;
+            if (msg.type !== 'results' || f.query !== msg.id) return;
+            for (const match of msg.matches) {
+                // Bir bo'lakdagi natijalar bitta obyektni ulashadi (albomlar va reply lar uchun)
+                let chunk = f.chunks.get(match.chunk);
+                if (!chunk) {
+                    chunk = { replies: {}, children: {} };
+                    f.chunks.set(match.chunk, chunk);
+                }
+                if (match.reply) chunk.replies[match.msg.id] = match.reply;
+                if (match.children) chunk.children[match.msg.id] = match.children;
+                f.results.push({ msg: match.msg, chunk });
+            }
+            f.done = msg.done;
+            const status = document.getElementById('searchStatus');
+            status.style.display = 'block';
+            status.textContent = msg.done
+                ? `🔍 ${f.results.length.toLocaleString()} ta natija`
+                : `🔍 Qidirilmoqda... ${msg.scanned}/${msg.total} bo'lak, ${f.results.length.toLocaleString()} ta topildi`;
+            if (f.wake) {
+                const wake = f.wake;
+                f.wake = null;
+                wake();
+            }
+        }
+
+        // Keyingi sahifa: bo'laklar kerak bo'lganda yuklanadi, albom a'zolari bitta elementga yig'iladi
+        async function loadMoreMessages() {
+            if (loadingMore) return;
+            loadingMore = true;
+            const token = feedToken;
+            const items = [];
+
+            const f = feed;
+
+            try {
+                while (items.length < MESSAGES_PER_PAGE && !feedDone(f)) {
+                    const batch = await feedBatch(f);
+                    if (token !== feedToken) return;
+
+                    let taken = 0;
+                    for (const { msg, chunk } of batch) {
+                        const last = items[items.length - 1];
+                        if (msg && matchesFilter(msg)) {
+                            if (msg.media_group_id && last && last.chunk === chunk
+                                    && last.messages[0].media_group_id === msg.media_group_id) {
+                                last.messages.push(msg);
+                            } else if (items.length >= MESSAGES_PER_PAGE) {
+                                break;
+                            } else {
+                                items.push({ messages: [msg], chunk });
+                            }
+                        }
+                        taken++;
+                    }
+                    advanceFeed(f, taken);
+                    // Qidiruv natijalari kelishi bilan ko'rsatiladi
+                    if (f.query && items.length) break;
+                }
+            } catch (error) {
+                console.error(error);
+            } finally {
+                if (token === feedToken) loadingMore = false;
+            }
+            if (token !== feedToken) return;
+
+            const list = document.getElementById('messagesList');
+            if (items.length === 0 && !list.children.length) {
+                list.innerHTML = `
                     <div class="empty-state">
                         <div class="empty-state-icon">🔍</div>
                         <p>Xabarlar topilmadi</p>
                     </div>
                 `;
-                document.getElementById('loadMore').style.display = 'none';
-                return;
             }
 
-            let currentDate = '';
             let html = '';
+            items.forEach(item => {
+                const msg = item.messages[0];
+                const day = msg.date ? msg.date.slice(0, 10) : '';
 
-            if (displayedMessages === 0) {
-                document.getElementById('messagesList').innerHTML = '';
+                if (day && day !== currentDate) {
+                    currentDate = day;
+                    html += `<div class="date-separator"><span>${dayLabel(day)}</span></div>`;
+                }
+
+                html += renderMessage(msg, item.messages.length > 1 ? item.messages : null, item.chunk);
+            });
+            list.insertAdjacentHTML('beforeend', html);
+
+            // Show/hide load more button
+            const hasMore = !feedDone(f);
+            document.getElementById('loadMore').style.display = hasMore ? 'block' : 'none';
+            if (f.query && hasMore && items.length < MESSAGES_PER_PAGE) {
+                setTimeout(loadMoreMessages, 0);
             }
+        }
 
-            messagesToLoad.forEach(msg => {
-                const msgDate = new Date(msg.date).toLocaleDateString('uz-UZ', {
-                    year: 'numeric',
-                    month: 'long',
-                    day: 'numeric'
-                });
+        // Ko'rsatish manbai: bo'laklar ketma-ketligi ({chunk, pos}) yoki yuboruvchi xabarlari ID lari ({ids, pos})
+        function feedDone(f) {
+            if (f.query) return f.done && f.pos >= f.results.length;
+            return f.ids ? f.pos >= f.ids.length : f.chunk >= chunkIndex.length;
+        }
 
-                if (msgDate !== currentDate) {
-                    currentDate = msgDate;
-                    html += `<div class="date-separator"><span>${msgDate}</span></div>`;
+        async function feedBatch(f) {
+            if (f.query) {
+                // Worker natijalari: yangi natija yoki qidiruv tugashini kutish
+                while (f.pos >= f.results.length && !f.done) {
+                    await new Promise(resolve => { f.wake = resolve; });
                 }
+                return f.results.slice(f.pos);
+            }
+            if (f.ids) {
+                // Faqat shu ID lar joylashgan bo'laklar yuklanadi
+                const ids = f.ids.slice(f.pos, f.pos + MESSAGES_PER_PAGE);
+                const chunks = await Promise.all(ids.map(id => loadChunk(findChunk(id))));
+                return ids.map((id, i) => ({ msg: chunks[i].messages[chunks[i].positions.get(id)], chunk: chunks[i] }));
+            }
+            const chunk = await loadChunk(f.chunk);
+            return chunk.messages.slice(f.pos).map(msg => ({ msg, chunk }));
+        }
 
-                html += renderMessage(msg);
-            });
+        function advanceFeed(f, taken) {
+            f.pos += taken;
+            if (!f.ids && !f.query && f.pos >= chunkIndex[f.chunk][2]) {
+                f.chunk++;
+                f.pos = 0;
+            }
+        }
 
-            document.getElementById('messagesList').insertAdjacentHTML('beforeend', html);
-            displayedMessages += messagesToLoad.length;
+        // Ko'rsatishni boshqa joydan (yoki boshidan) qayta boshlash
+        function resetFeed(start) {
+            if (feed.query) {
+                // Eski qidiruv bekor qilinadi, uni kutayotgan loadMoreMessages() ham tugaydi
+                searchWorker.postMessage({ type: 'cancel', id: feed.query });
+                feed.done = true;
+                if (feed.wake) feed.wake();
+            }
+            document.getElementById('searchStatus').style.display = 'none';
+
+            if (!start && searchWorker && (currentFilter !== 'all' || searchQuery)) {
+                // Filtr/qidiruv Worker da: natijalar kelishi bilan ko'rsatiladi
+                start = { query: ++queryCounter, results: [], pos: 0, done: false, wake: null, chunks: new Map() };
+                searchWorker.postMessage({
+                    type: 'query',
+                    id: start.query,
+                    filter: currentFilter,
+                    query: searchQuery.toLowerCase(),
+                    ids: senderFilter ? senderFilter.ids : null
+                });
+            }
+            start = start || (senderFilter ? { ids: senderFilter.ids, pos: 0 } : { chunk: 0, pos: 0 });
+            feedToken++;
+            loadingMore = false;
+            feed = start.query ? start : { ...start };
+            currentDate = '';
+            document.getElementById('messagesList').innerHTML = '';
+            document.getElementById('showFromStart').style.display = start.chunk || start.pos ? 'block' : 'none';
+        }
 
-            // Show/hide load more button
-            if (displayedMessages < filtered.length) {
-                document.getElementById('loadMore').style.display = 'block';
-            } else {
-                document.getElementById('loadMore').style.display = 'none';
+        // Xabarga sakrash: faqat shu xabar joylashgan bo'lak yuklanadi
+        async function jumpToMessage(messageId, chunkHint) {
+            const index = chunkHint ?? findChunk(messageId);
+            const chunk = index >= 0 ? await loadChunk(index) : null;
+            const pos = chunk ? chunk.positions.get(messageId) : undefined;
+            if (pos === undefined) {
+                alert(`#${messageId} xabar exportda topilmadi`);
+                return;
+            }
+
+            // Filtr va qidiruv tozalanadi - aks holda xabar yashirin qolishi mumkin
+            currentFilter = 'all';
+            searchQuery = '';
+            setSenderFilter(null);
+            document.getElementById('searchInput').value = '';
+            document.querySelectorAll('.filter-btn').forEach(b => b.classList.toggle('active', b.dataset.filter === 'all'));
+
+            // Albom a'zosi bo'lsa albom boshidan ko'rsatiladi
+            const messages = chunk.messages;
+            let start = pos;
+            const groupId = messages[pos].media_group_id;
+            while (groupId && start > 0 && messages[start - 1].media_group_id === groupId) start--;
+
+            resetFeed({ chunk: index, pos: start });
+            await loadMoreMessages();
+
+            const el = document.querySelector(`.message[data-ids~="${messageId}"]`);
+            if (el) {
+                el.scrollIntoView({ block: 'center' });
+                el.classList.add('message-highlight');
+                setTimeout(() => el.classList.remove('message-highlight'), 2000);
             }
         }
 
+        // Sanaga sakrash: shu kundagi (bo'lmasa keyingi) birinchi xabar
+        function jumpToDate(day) {
+            if (!dayBuckets.length) return;
+            let lo = 0, hi = dayBuckets.length;
+            while (lo < hi) {
+                const mid = (lo + hi) >> 1;
+                if (dayBuckets[mid][0] < day) lo = mid + 1; else hi = mid;
+            }
+            const [, firstId, chunk] = dayBuckets[Math.min(lo, dayBuckets.length - 1)];
+            jumpToMessage(firstId, chunk);
+        }
+
+        // #msg-123 yoki #date-2024-01-20 ko'rinishidagi havola
+        function jumpToHash() {
+            const match = location.hash.match(/^#msg-(\\d+)$/);
+            if (match) {
+                jumpToMessage(Number(match[1]));
+                return true;
+            }
+            const dateMatch = location.hash.match(/^#date-(\\d{4}-\\d{2}-\\d{2})$/);
+            if (dateMatch) {
+                jumpToDate(dateMatch[1]);
+                return true;
+            }
+            return false;
+        }
+
         // Render message
-        function renderMessage(msg) {
+        function renderMessage(msg, album, chunk) {
             const sender = msg.from_user 
                 ? `${msg.from_user.first_name || ''} ${msg.from_user.last_name || ''}`.trim() || msg.from_user.username
                 : msg.sender_chat?.title || 'Anonymous';
@@ -1621,17 +2949,33 @@ class TelegramExporter:
             let textContent = msg.text || '';
             let captionContent = msg.caption || '';
 
-            // Render media
-            if (msg.media_type) {
+            // Render media (albom - bitta to'r, a'zolar yuborilgan tartibda)
+            if (album) {
+                const members = [...album].sort((a, b) => a.id - b.id);
+                mediaHtml = `<div class="album-grid album-grid-${Math.min(members.length, 4)}">${members.map(m => renderMedia(m, ALBUM_IMAGE_SIZES)).join('')}</div>`;
+                captionContent = members.map(m => m.caption).find(Boolean) || '';
+            } else if (msg.media_type) {
                 mediaHtml = renderMedia(msg);
             }
 
-            // Reply info
+            // Reply info (ota xabarning qisqa ko'rinishi eksportda tayyorlangan)
             let replyHtml = '';
-            if (msg.reply_to_message_id) {
+            const reply = chunk && chunk.replies[msg.id];
+            if (reply) {
+                const replyText = reply.text || (reply.media_type ? formatMediaType(reply.media_type) : '');
+                replyHtml = `<a class="message-reply" href="#msg-${reply.id}">↩️ <span class="reply-sender">${escapeHtml(reply.sender)}</span> ${escapeHtml(replyText)}</a>`;
+            } else if (msg.reply_to_message_id) {
                 replyHtml = `<div class="message-reply">↩️ Reply to message #${msg.reply_to_message_id}</div>`;
             }
 
+            // Shu xabarga javoblar
+            let childrenHtml = '';
+            const children = chunk && chunk.children[msg.id];
+            if (children) {
+                const links = children.slice(0, 5).map(id => `<a href="#msg-${id}">#${id}</a>`).join(' ');
+                childrenHtml = `<div class="message-replies">💬 ${children.length} ta javob: ${links}${children.length > 5 ? ' …' : ''}</div>`;
+            }
+
             // Forward info
             let forwardHtml = '';
             if (msg.forward_from_chat) {
@@ -1652,7 +2996,7 @@ class TelegramExporter:
             }
 
             return `
-                <div class="message" data-id="${msg.id}">
+                <div class="message" data-id="${msg.id}" data-ids="${(album || [msg]).map(m => m.id).join(' ')}">
                     <div class="message-header">
                         <div class="message-avatar">${avatar}</div>
                         <span class="message-sender">${escapeHtml(sender)}</span>
@@ -1664,25 +3008,82 @@ class TelegramExporter:
                     ${mediaHtml}
                     ${captionContent ? `<div class="message-caption">${escapeHtml(captionContent)}</div>` : ''}
                     ${statsHtml}
+                    ${childrenHtml}
                 </div>
             `;
         }
 
         // Render media
-        function renderMedia(msg) {
+        // Rasm ko'rinadigan kenglik (srcset dan mos nusxani tanlash uchun)
+        const IMAGE_SIZES = '(max-width: 768px) 95vw, 765px';
+        const ALBUM_IMAGE_SIZES = '(max-width: 768px) 48vw, 380px';
+        const STICKER_SIZES = '200px';
+        const GIF_SIZES = '300px';
+
+        // Eksportda yaratilgan WebP/AVIF nusxalar bo'lsa <picture> + srcset, aks holda asl rasm
+        function renderImage(msg, src, alt, sizes) {
+            const img = `<img src="${src}" alt="${alt}" loading="lazy">`;
+            if (!msg.renditions || !msg.renditions.length) return img;
+
+            const byFormat = {};
+            for (const [url, width, format] of msg.renditions) {
+                (byFormat[format] = byFormat[format] || []).push(`${url} ${width}w`);
+            }
+            const sources = ['avif', 'webp']
+                .filter(format => byFormat[format])
+                .map(format => `<source type="image/${format}" srcset="${byFormat[format].join(', ')}" sizes="${sizes}">`)
+                .join('');
+            return `<picture>${sources}${img}</picture>`;
+        }
+
+        // .tgs/.webm stikerni <img> ko'rsatmaydi - o'rniga thumbnail dan olingan statik nusxa
+        function staticSource(msg, src) {
+            if (!/\\.(tgs|webm|mp4)$/i.test(src) || !msg.renditions) return src;
+            const webp = msg.renditions.filter(([, , format]) => format === 'webp');
+            if (!webp.length) return src;
+            return webp.reduce((best, item) => item[1] > best[1] ? item : best)[0];
+        }
+
+        // Video o'rniga poster: brauzer video faylga faqat bosilganda murojaat qiladi
+        // (GIF posterida uning WebP/AVIF nusxalari - srcset)
+        function renderVideoPoster(msg, src, kind, duration) {
+            const preview = msg.poster
+                ? renderImage(msg, msg.poster, 'Video', GIF_SIZES)
+                : `<div class="video-poster-empty">${kind === 'gif' ? '🎞️' : '🎬'}</div>`;
+            const label = kind === 'gif' ? 'GIF' : formatDuration(duration);
+            return `<div class="video-poster video-poster-${kind}" data-src="${src}" data-kind="${kind}">${preview}<span class="video-play">▶</span>${label ? `<span class="video-duration">${label}</span>` : ''}</div>`;
+        }
+
+        function playVideo(poster) {
+            const video = document.createElement('video');
+            video.src = poster.dataset.src;
+            video.preload = 'auto';
+            video.playsInline = true;
+            if (poster.dataset.kind === 'gif') {
+                video.loop = true;
+                video.muted = true;
+            } else {
+                video.controls = true;
+            }
+            if (poster.dataset.kind === 'round') video.className = 'video-round';
+            poster.replaceWith(video);
+            video.play().catch(() => {});
+        }
+
+        function renderMedia(msg, sizes = IMAGE_SIZES) {
             const type = msg.media_type;
             const mediaUrl = msg.media_url || msg.local_file;  // S3 URL yoki lokal fayl
 
             switch (type) {
                 case 'PHOTO':
                     if (mediaUrl) {
-                        return `<div class="message-media"><img src="${mediaUrl}" alt="Photo" loading="lazy"></div>`;
+                        return `<div class="message-media">${renderImage(msg, mediaUrl, 'Photo', sizes)}</div>`;
                     }
                     return `<div class="message-media"><div class="media-placeholder"><div class="media-placeholder-icon">🖼️</div><div>Rasm (yuklanmagan)</div></div></div>`;
 
                 case 'VIDEO':
                     if (mediaUrl) {
-                        return `<div class="message-media"><video controls><source src="${mediaUrl}" type="video/mp4"></video></div>`;
+                        return `<div class="message-media">${renderVideoPoster(msg, mediaUrl, 'video', msg.video?.duration)}</div>`;
                     }
                     const videoInfo = msg.video;
                     return `<div class="message-media"><div class="media-placeholder"><div class="media-placeholder-icon">🎬</div><div>Video${videoInfo ? ` (${formatDuration(videoInfo.duration)}, ${formatSize(videoInfo.file_size)})` : ''}</div></div></div>`;
@@ -1709,19 +3110,19 @@ class TelegramExporter:
 
                 case 'VIDEO_NOTE':
                     if (mediaUrl) {
-                        return `<div class="message-media" style="max-width: 300px;"><video controls style="border-radius: 50%; width: 200px; height: 200px; object-fit: cover;"><source src="${mediaUrl}" type="video/mp4"></video></div>`;
+                        return `<div class="message-media" style="max-width: 300px;">${renderVideoPoster(msg, mediaUrl, 'round', msg.video_note?.duration)}</div>`;
                     }
                     return `<div class="message-media"><div class="media-placeholder"><div class="media-placeholder-icon">⭕</div><div>Video message</div></div></div>`;
 
                 case 'STICKER':
                     if (mediaUrl) {
-                        return `<div class="sticker-container"><img src="${mediaUrl}" alt="Sticker"><div class="sticker-emoji">${msg.sticker?.emoji || ''} ${msg.sticker?.set_name || ''}</div></div>`;
+                        return `<div class="sticker-container">${renderImage(msg, staticSource(msg, mediaUrl), 'Sticker', STICKER_SIZES)}<div class="sticker-emoji">${msg.sticker?.emoji || ''} ${msg.sticker?.set_name || ''}</div></div>`;
                     }
                     return `<div class="message-media"><div class="media-placeholder">😀 ${msg.sticker?.emoji || 'Sticker'}</div></div>`;
 
                 case 'ANIMATION':
                     if (mediaUrl) {
-                        return `<div class="message-media"><img src="${mediaUrl}" alt="GIF" style="max-width: 300px;"></div>`;
+                        return `<div class="message-media" style="max-width: 300px;">${renderVideoPoster(msg, mediaUrl, 'gif', msg.animation?.duration)}</div>`;
                     }
                     return `<div class="message-media"><div class="media-placeholder"><div class="media-placeholder-icon">🎞️</div><div>GIF</div></div></div>`;
 
@@ -1785,8 +3186,7 @@ class TelegramExporter:
 
         // Reset and reload
         function resetAndReload() {
-            displayedMessages = 0;
-            document.getElementById('messagesList').innerHTML = '';
+            resetFeed();
             loadMoreMessages();
         }
 
@@ -1815,6 +3215,57 @@ class TelegramExporter:
             // Load more
             document.getElementById('loadMoreBtn').addEventListener('click', loadMoreMessages);
 
+            // Xabar ID si bo'yicha sakrash
+            document.getElementById('jumpInput').addEventListener('keydown', (e) => {
+                const messageId = parseInt(e.target.value, 10);
+                if (e.key === 'Enter' && messageId) {
+                    location.hash = `msg-${messageId}`;
+                }
+            });
+            window.addEventListener('hashchange', jumpToHash);
+
+            // Yuboruvchilar: jadval birinchi marta qidiruv maydoniga kirilganda yuklanadi
+            const senderSearch = document.getElementById('senderSearch');
+            senderSearch.addEventListener('focus', () => {
+                loadSenders().then(() => renderSenderList(senderSearch.value.trim()), console.error);
+            });
+            let senderSearchTimeout;
+            senderSearch.addEventListener('input', () => {
+                clearTimeout(senderSearchTimeout);
+                senderSearchTimeout = setTimeout(() => {
+                    loadSenders().then(() => renderSenderList(senderSearch.value.trim()), console.error);
+                }, 200);
+            });
+            document.getElementById('senderList').addEventListener('click', (e) => {
+                const btn = e.target.closest('.sender-btn');
+                if (btn) selectSender(Number(btn.dataset.sender));
+            });
+            document.getElementById('senderActive').addEventListener('click', (e) => {
+                if (e.target.id === 'senderClear') {
+                    setSenderFilter(null);
+                    resetAndReload();
+                }
+            });
+
+            // Xronologiya
+            document.getElementById('jumpDate').addEventListener('change', (e) => {
+                if (e.target.value) location.hash = `date-${e.target.value}`;
+            });
+            document.getElementById('timelineMonths').addEventListener('click', (e) => {
+                const btn = e.target.closest('.timeline-month');
+                if (btn) location.hash = `date-${btn.dataset.date}`;
+            });
+            document.getElementById('showFromStartBtn').addEventListener('click', () => {
+                history.replaceState(null, '', location.pathname + location.search);
+                resetAndReload();
+            });
+
+            // Video posteri bosilganda pleer yaratiladi
+            document.getElementById('messagesList').addEventListener('click', (e) => {
+                const poster = e.target.closest('.video-poster');
+                if (poster) playVideo(poster);
+            });
+
             // Infinite scroll
             window.addEventListener('scroll', () => {
                 const { scrollTop, scrollHeight, clientHeight } = document.documentElement;
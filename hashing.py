@@ -0,0 +1,115 @@
+"""
+Yuklab olish paytida fayl xeshlari (SHA-256 va CRC32)
+
+Baytlar Telegram dan kelishi bilan xeshlanadi - fayl diskdan ikkinchi marta
+o'qilmaydi. SHA-256 - kontent bo'yicha dedup va arxivni tekshirish uchun, CRC32 -
+S3 ga yuklashda x-amz-checksum-crc32 sarlavhasi (server faylni Telegram dan
+kelgan baytlar bilan solishtiradi).
+
+Parallel segmentli yuklashda bo'laklar tartibsiz keladi: navbatdagi bo'lak
+kelganda darhol xeshlanadi, oldinga o'tib ketganlari esa tartib yetib kelganda
+fayldan (odatda hali page cache da) o'qiladi.
+"""
+
+import asyncio
+import base64
+import hashlib
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+# file_digest() o'qish bo'lagi
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class FileDigest:
+    """Fayl hajmi va xeshlari"""
+
+    size: int
+    sha256: str  # hex
+    crc32: int
+
+    @property
+    def crc32_b64(self) -> str:
+        """S3 ChecksumCRC32 formati: big-endian 4 bayt, base64"""
+        return base64.b64encode(self.crc32.to_bytes(4, "big")).decode("ascii")
+
+    def to_dict(self) -> dict:
+        return {"size": self.size, "sha256": self.sha256, "crc32": self.crc32_b64}
+
+
+class StreamHasher:
+    """Ketma-ket keladigan baytlar uchun SHA-256 + CRC32"""
+
+    def __init__(self):
+        self._sha256 = hashlib.sha256()
+        self._crc32 = 0
+        self.size = 0
+
+    def update(self, data: bytes):
+        self._sha256.update(data)
+        self._crc32 = zlib.crc32(data, self._crc32)
+        self.size += len(data)
+
+    def digest(self) -> FileDigest:
+        return FileDigest(self.size, self._sha256.hexdigest(), self._crc32)
+
+
+class ChunkHasher(StreamHasher):
+    """Bo'laklar (indeks, baytlar) tartibsiz kelganda ham fayl tartibida xeshlash
+
+    Tartibdan oldin kelgan bo'laklar xotirada saqlanmaydi - ular faylga yozilgan,
+    navbat yetganda catch_up() ularni threadda o'sha joydan o'qiydi.
+    """
+
+    def __init__(self, path: Path, chunk_size: int):
+        super().__init__()
+        self.path = path
+        self.chunk_size = chunk_size
+        self.next_chunk = 0
+        self._written: set[int] = set()
+        self._catching_up = False
+
+    def add(self, index: int, data: bytes) -> bool:
+        """Yozilgan bo'lakni qo'shadi; True - fayldan o'qiladigan bo'laklar navbati keldi"""
+        if index == self.next_chunk and not self._catching_up:
+            self.update(data)
+            self.next_chunk += 1
+        elif index >= self.next_chunk:
+            self._written.add(index)
+        return not self._catching_up and self.next_chunk in self._written
+
+    def add_written(self, indexes):
+        """Avvalroq yozilgan bo'laklar (oldingi ishga tushirishda tugagan segmentlar) - threadda chaqiriladi"""
+        self._written.update(i for i in indexes if i >= self.next_chunk)
+        self._read_written()
+
+    async def catch_up(self):
+        """Navbati kelgan bo'laklarni threadda fayldan o'qib xeshlaydi (event loop to'xtamaydi)"""
+        if self._catching_up or self.next_chunk not in self._written:
+            return
+        self._catching_up = True
+        try:
+            await asyncio.to_thread(self._read_written)
+        finally:
+            self._catching_up = False
+
+    def _read_written(self):
+        if self.next_chunk not in self._written:
+            return
+        with open(self.path, "rb") as f:
+            while self.next_chunk in self._written:
+                self._written.discard(self.next_chunk)
+                f.seek(self.next_chunk * self.chunk_size)
+                self.update(f.read(self.chunk_size))
+                self.next_chunk += 1
+
+
+def file_digest(path: str | Path) -> FileDigest:
+    """Tayyor faylning xeshlari (yuklab olish oqimini kuzatib bo'lmaganda)"""
+    hasher = StreamHasher()
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_CHUNK_BYTES):
+            hasher.update(chunk)
+    return hasher.digest()
@@ -0,0 +1,100 @@
+"""
+JSON kodlash - orjson o'rnatilgan bo'lsa undan, aks holda standart json dan foydalanadi
+
+Katta exportlarda xabarlar ro'yxati bitta katta obyekt sifatida kodlanmaydi:
+DocumentWriter sarlavha maydonlari va xabarlarni bittalab to'g'ridan-to'g'ri
+faylga yozadi. Standart natija ixcham (bo'shliqsiz), pretty=True bo'lsa
+avvalgidek indent=2 bilan yoziladi.
+"""
+
+import io
+import json
+from typing import Any, BinaryIO, Iterable, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson else "json"
+
+_INDENT = b"  "
+
+
+def dumps(obj: Any, pretty: bool = False) -> bytes:
+    """Obyektni UTF-8 JSON baytlariga o'tkazadi"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        text = json.dumps(obj, ensure_ascii=False, indent=2)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    return text.encode("utf-8")
+
+
+def _nested(obj: Any, pretty: bool, depth: int) -> bytes:
+    data = dumps(obj, pretty)
+    if pretty:
+        data = data.replace(b"\n", b"\n" + _INDENT * depth)
+    return data
+
+
+class DocumentWriter:
+    """{**header, key: [items...], **trailer} obyektini bo'laklab binar faylga yozadi
+
+    Elementlar add() orqali bittalab kodlanadi, shuning uchun butun ro'yxat
+    xotirada saqlanmaydi. trailer - elementlar soni kabi oxirida ma'lum
+    bo'ladigan maydonlar uchun.
+    """
+
+    def __init__(self, f: BinaryIO, pretty: bool = False):
+        self.f = f
+        self.pretty = pretty
+        self.count = 0
+        if pretty:
+            self._field_sep, self._item_sep, self._colon = b"\n" + _INDENT, b"\n" + _INDENT * 2, b": "
+        else:
+            self._field_sep, self._item_sep, self._colon = b"", b"", b":"
+
+    def _field(self, name: str, value: Any) -> bytes:
+        return self._field_sep + dumps(name) + self._colon + _nested(value, self.pretty, 1)
+
+    def begin(self, header: dict, key: str):
+        self.f.write(b"{")
+        for name, value in header.items():
+            self.f.write(self._field(name, value) + b",")
+        self.f.write(self._field_sep + dumps(key) + self._colon + b"[")
+
+    def add(self, item: Any):
+        prefix = b"," + self._item_sep if self.count else self._item_sep
+        self.f.write(prefix + _nested(item, self.pretty, 2))
+        self.count += 1
+
+    def end(self, trailer: Optional[dict] = None):
+        self.f.write(self._field_sep + b"]" if self.count and self.pretty else b"]")
+        for name, value in (trailer or {}).items():
+            self.f.write(b"," + self._field(name, value))
+        self.f.write(b"\n}" if self.pretty else b"}")
+
+
+def write_document(f: BinaryIO, header: dict, key: str, items: Iterable[Any], pretty: bool = False,
+                   trailer: Optional[dict] = None):
+    """{**header, key: [items...], **trailer} obyektini faylga yozadi (items generator bo'lishi mumkin)"""
+    writer = DocumentWriter(f, pretty)
+    writer.begin(header, key)
+    for item in items:
+        writer.add(item)
+    writer.end(trailer)
+
+
+def encode_document(header: dict, key: str, items: Iterable[Any], pretty: bool = False,
+                    trailer: Optional[dict] = None) -> bytes:
+    """write_document() natijasini bytes sifatida qaytaradi"""
+    buffer = io.BytesIO()
+    write_document(buffer, header, key, items, pretty, trailer)
+    return buffer.getvalue()
+
+
+def script_safe(data: str) -> str:
+    """JSON ni <script> ichiga joylash uchun '</' ni ekranlaydi (</script> xabar matnida bo'lsa ham)"""
+    return data.replace("</", "<\\/")
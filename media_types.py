@@ -0,0 +1,130 @@
+"""
+Media turlari jadvali - serializatsiya, statistika va yuklab olish uchun yagona manba
+
+Har bir media turi uchun bitta MediaDescriptor: message atributi, lokal papka,
+ExportStats maydoni va JSON ga yoziladigan maydonlar. Qiymatlarni oluvchi funksiya
+har bir tur uchun modul yuklanganda bir marta yaratiladi, shuning uchun xabarlarni
+qayta ishlashda if/elif zanjirlari kerak emas.
+"""
+
+from dataclasses import dataclass, field
+from operator import attrgetter
+from typing import Any, Callable, Optional
+
+from pyrogram.enums import MessageMediaType
+
+
+def _poll_options(options) -> list[dict]:
+    return [{"text": opt.text, "voter_count": opt.voter_count} for opt in options or []]
+
+
+def _field_names(fields: tuple) -> tuple[str, ...]:
+    return tuple(f if isinstance(f, str) else f[0] for f in fields)
+
+
+def _make_extractor(fields: tuple) -> Callable[[Any], tuple]:
+    """Maydonlar ro'yxatidan media obyekti qiymatlarini tuple qilib oluvchi funksiya yaratadi
+
+    Maydon nomi (str) yoki (nom, konvertor) juftligi bo'lishi mumkin.
+    """
+    names = _field_names(fields)
+    converters = tuple((i, f[1]) for i, f in enumerate(fields) if not isinstance(f, str))
+    getter = attrgetter(*names)
+
+    if len(names) == 1:
+        return lambda media: (getter(media),)
+
+    if not converters:
+        return getter
+
+    def extract(media) -> tuple:
+        values = list(getter(media))
+        for index, convert in converters:
+            values[index] = convert(values[index])
+        return tuple(values)
+
+    return extract
+
+
+@dataclass(frozen=True)
+class MediaDescriptor:
+    """Bitta media turi haqidagi barcha ma'lumot"""
+
+    name: str  # message atributi va JSON kaliti (masalan, "photo")
+    enum_name: str  # MessageMediaType a'zosi nomi (masalan, "PHOTO")
+    stats_field: str  # ExportStats maydoni
+    fields: tuple  # JSON ga yoziladigan maydonlar
+    folder: Optional[str] = None  # Yuklab olinadigan bo'lsa - lokal papka nomi
+    field_names: tuple[str, ...] = field(init=False, repr=False, compare=False)
+    extract: Callable[[Any], tuple] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "field_names", _field_names(self.fields))
+        object.__setattr__(self, "extract", _make_extractor(self.fields))
+
+    def serialize(self, media) -> dict:
+        """Media obyektini JSON ga mos dict ga o'tkazadi"""
+        return dict(zip(self.field_names, self.extract(media)))
+
+    def to_dict(self, values: tuple) -> dict:
+        """extract() qaytargan qiymatlardan dict yaratadi"""
+        return dict(zip(self.field_names, values))
+
+    @property
+    def downloadable(self) -> bool:
+        return self.folder is not None
+
+
+MEDIA_DESCRIPTORS: tuple[MediaDescriptor, ...] = (
+    MediaDescriptor(
+        "photo", "PHOTO", "photos", ("file_id", "file_unique_id", "width", "height", "file_size"), folder="photos",
+    ),
+    MediaDescriptor(
+        "video", "VIDEO", "videos",
+        ("file_id", "file_unique_id", "width", "height", "duration", "file_name", "mime_type", "file_size"),
+        folder="videos",
+    ),
+    MediaDescriptor(
+        "audio", "AUDIO", "audios",
+        ("file_id", "file_unique_id", "duration", "performer", "title", "file_name", "mime_type", "file_size"),
+        folder="audio",
+    ),
+    MediaDescriptor(
+        "document", "DOCUMENT", "documents", ("file_id", "file_unique_id", "file_name", "mime_type", "file_size"), folder="files",
+    ),
+    MediaDescriptor(
+        "voice", "VOICE", "voices", ("file_id", "file_unique_id", "duration", "mime_type", "file_size"), folder="voices",
+    ),
+    MediaDescriptor(
+        "video_note", "VIDEO_NOTE", "video_notes", ("file_id", "file_unique_id", "length", "duration", "file_size"),
+        folder="round_videos",
+    ),
+    MediaDescriptor(
+        "sticker", "STICKER", "stickers", ("file_id", "file_unique_id", "width", "height", "emoji", "set_name"), folder="stickers",
+    ),
+    MediaDescriptor(
+        "animation", "ANIMATION", "animations",
+        ("file_id", "file_unique_id", "width", "height", "duration", "file_name", "file_size"),
+        folder="animations",
+    ),
+    MediaDescriptor(
+        "poll", "POLL", "polls",
+        ("id", "question", ("options", _poll_options), "total_voter_count", "is_closed"),
+    ),
+    MediaDescriptor("location", "LOCATION", "locations", ("latitude", "longitude")),
+    MediaDescriptor("contact", "CONTACT", "contacts", ("phone_number", "first_name", "last_name", "user_id")),
+    MediaDescriptor("web_page", "WEB_PAGE", "web_pages", ("url", "title", "description", "site_name")),
+)
+
+# Media turi nomi ("photo") bo'yicha
+MEDIA_TYPES: dict[str, MediaDescriptor] = {d.name: d for d in MEDIA_DESCRIPTORS}
+
+# MessageMediaType a'zosi bo'yicha (pyrogram versiyasida yo'q a'zolar tashlab ketiladi)
+MEDIA_BY_ENUM: dict[MessageMediaType, MediaDescriptor] = {
+    getattr(MessageMediaType, d.enum_name): d
+    for d in MEDIA_DESCRIPTORS
+    if hasattr(MessageMediaType, d.enum_name)
+}
+
+# Yuklab olinadigan media papkalari
+MEDIA_FOLDERS: tuple[str, ...] = tuple(d.folder for d in MEDIA_DESCRIPTORS if d.downloadable)
@@ -0,0 +1,299 @@
+"""
+Export metrikalari - bosqichlar bo'yicha hisoblagichlar, histogrammalar va Prometheus endpoint
+
+ExportMetrics exporter ishlayotgan paytda har bir bosqich (tarix sahifalari,
+yuklab olish, S3 ga yuklash, checkpoint, serializatsiya) vaqtini va hajmini
+yig'adi. MetricsServer ularni Prometheus formatida HTTP orqali beradi,
+MetricsFileWriter esa davriy ravishda JSON faylga yozadi.
+"""
+
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Optional
+
+METRIC_PREFIX = "tg_export_"
+
+# Sekundlar uchun standart histogramma chegaralari
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Metrikalar tavsifi (Prometheus HELP qatorlari uchun)
+METRIC_HELP = {
+    "history_page_seconds": "get_chat_history sahifasini (100 ta xabar) kutish vaqti",
+    "history_pages_total": "Olingan tarix sahifalari soni",
+    "download_seconds": "Bitta media faylni Telegramdan yuklab olish vaqti",
+    "download_bytes_total": "Telegramdan yuklab olingan baytlar",
+    "download_resumed_bytes_total": "Oldingi .part fayllardan davom ettirilib qayta yuklanmagan baytlar",
+    "download_chunk_retries_total": "Bo'laklab yuklashda uzilishdan keyin qayta ulanishlar soni",
+    "upload_seconds": "Bitta faylni S3 ga yuklash vaqti (retry lar bilan)",
+    "upload_bytes_total": "S3 ga yuklangan baytlar",
+    "upload_retries_total": "S3 ga yuklashda qayta urinishlar soni",
+    "upload_failures_total": "Muvaffaqiyatsiz S3 yuklashlar soni",
+    "flood_waits_total": "Telegram FloodWait xatolari soni",
+    "flood_wait_seconds_total": "FloodWait sababli kutilgan sekundlar",
+    "checkpoint_seconds": "checkpoint.json ni saqlash vaqti",
+    "serialize_seconds": "Bitta xabarni serializatsiya qilish vaqti",
+    "queue_depth": "Navbatdagi yoki bajarilayotgan ishlar soni",
+    "startup_seconds": "Ishga tushishdan birinchi tarix so'rovigacha (ulanish, chat ma'lumoti, S3 tekshiruvi)",
+    "storage_warm_up_seconds": "Saqlash joyini tayyorlash (S3 client va bucket tekshiruvi) vaqti",
+    "bundle_bytes": "ZIP arxiv hajmi (baytlar)",
+    "bundle_seconds": "ZIP arxivni yig'ish vaqti (export bilan parallel)",
+    "reconcile_seconds": "Chat papkasini saqlash joyidan ro'yxatlash (ListObjectsV2 sahifalari) vaqti",
+    "remote_objects": "Export boshida saqlash joyida topilgan chat obyektlari soni",
+    "reconciled_bytes_total": "Saqlash joyida allaqachon bo'lgani uchun qayta yuklab olinmagan baytlar",
+}
+
+
+class Histogram:
+    """Oddiy kumulyativ histogramma (Prometheus semantikasi)"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # oxirgisi: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Taxminiy kvantil (tegishli bucket ning yuqori chegarasi)"""
+        if not self.count:
+            return None
+        target = q * self.count
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            if running >= target:
+                return bound
+        return float("inf")
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: tuple, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class ExportMetrics:
+    """Export davomidagi hisoblagichlar, gauge va histogrammalar to'plami"""
+
+    def __init__(self, stats=None):
+        self.stats = stats  # ExportStats (ixtiyoriy)
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._counters: dict[tuple, float] = {}
+        self._gauges: dict[tuple, float] = {}
+        self._histograms: dict[tuple, Histogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[(name, _labels_key(labels))] = value
+
+    def add(self, name: str, value: float, **labels):
+        """Gauge qiymatini o'zgartirish (masalan, navbat chuqurligi +1/-1)"""
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Blok bajarilish vaqtini histogrammaga yozadi"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    @contextmanager
+    def in_flight(self, queue: str):
+        """Blok bajarilayotgan paytda queue_depth{queue=...} ni oshirib turadi"""
+        self.add("queue_depth", 1, queue=queue)
+        try:
+            yield
+        finally:
+            self.add("queue_depth", -1, queue=queue)
+
+    def _rate(self, bytes_name: str, seconds_name: str) -> Optional[float]:
+        """Jami baytlar / jami vaqt bo'yicha o'rtacha tezlik (MB/s)"""
+        total_bytes = sum(v for (n, _), v in self._counters.items() if n == bytes_name)
+        total_seconds = sum(h.sum for (n, _), h in self._histograms.items() if n == seconds_name)
+        if not total_seconds:
+            return None
+        return round(total_bytes / total_seconds / (1024 * 1024), 3)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Barcha metrikalarni JSON ga mos dict ko'rinishida qaytaradi"""
+        with self._lock:
+            histograms = {}
+            for (name, labels), h in self._histograms.items():
+                histograms[name + _format_labels(labels)] = {
+                    "count": h.count,
+                    "sum": round(h.sum, 6),
+                    "mean": round(h.sum / h.count, 6) if h.count else None,
+                    "p50": h.quantile(0.5),
+                    "p95": h.quantile(0.95),
+                }
+            return {
+                "timestamp": time.time(),
+                "uptime_s": round(time.time() - self.started_at, 3),
+                "stats": asdict(self.stats) if self.stats else {},
+                "counters": {n + _format_labels(l): v for (n, l), v in self._counters.items()},
+                "gauges": {n + _format_labels(l): v for (n, l), v in self._gauges.items()},
+                "histograms": histograms,
+                "download_mb_per_s": self._rate("download_bytes_total", "download_seconds"),
+                "upload_mb_per_s": self._rate("upload_bytes_total", "upload_seconds"),
+            }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text formatidagi chiqish"""
+        lines = []
+
+        def header(name: str, kind: str):
+            full = METRIC_PREFIX + name
+            if name in METRIC_HELP:
+                lines.append(f"# HELP {full} {METRIC_HELP[name]}")
+            lines.append(f"# TYPE {full} {kind}")
+
+        with self._lock:
+            if self.stats:
+                for field, value in asdict(self.stats).items():
+                    header(f"stats_{field}", "gauge")
+                    lines.append(f"{METRIC_PREFIX}stats_{field} {value}")
+
+            for kind, store in (("counter", self._counters), ("gauge", self._gauges)):
+                seen = set()
+                for (name, labels), value in sorted(store.items()):
+                    if name not in seen:
+                        header(name, kind)
+                        seen.add(name)
+                    lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value}")
+
+            seen = set()
+            for (name, labels), h in sorted(self._histograms.items(), key=lambda item: item[0]):
+                if name not in seen:
+                    header(name, "histogram")
+                    seen.add(name)
+                full = METRIC_PREFIX + name
+                running = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    running += count
+                    bucket_labels = _format_labels(labels, 'le="%s"' % bound)
+                    lines.append(f"{full}_bucket{bucket_labels} {running}")
+                inf_labels = _format_labels(labels, 'le="+Inf"')
+                lines.append(f"{full}_bucket{inf_labels} {h.count}")
+                lines.append(f"{full}_sum{_format_labels(labels)} {h.sum}")
+                lines.append(f"{full}_count{_format_labels(labels)} {h.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Metrikalarni /metrics (Prometheus) va /metrics.json orqali beruvchi HTTP server
+
+    Alohida thread da ishlaydi, shuning uchun asyncio loop band bo'lganda ham javob beradi.
+    """
+
+    def __init__(self, metrics: ExportMetrics, port: int, host: str = "127.0.0.1"):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body = json.dumps(metrics.snapshot(), ensure_ascii=False).encode("utf-8")
+                    content_type = "application/json; charset=utf-8"
+                elif self.path.startswith("/metrics"):
+                    body = metrics.render_prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Har bir so'rovni konsolga chiqarmaslik
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        print(f"   📈 Metrikalar: http://{self.host}:{self._server.server_address[1]}/metrics")
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class MetricsFileWriter:
+    """Metrikalarni davriy ravishda JSON faylga yozuvchi fon thread"""
+
+    def __init__(self, metrics: ExportMetrics, path: Path, interval: float = 15.0):
+        self.metrics = metrics
+        self.path = Path(path)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self):
+        """Faylni atomar yozish (o'quvchi hech qachon yarim faylni ko'rmaydi)"""
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.metrics.snapshot(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"   ⚠️ Metrikalarni yozishda xato: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-file", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.write()  # Yakuniy holat
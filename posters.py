@@ -0,0 +1,57 @@
+"""
+Video, dumaloq video va GIF (mp4) uchun poster rasmlar
+
+Viewer har bir video uchun <video> yaratsa, brauzer ro'yxatda ko'ringan har bir
+video sarlavhasi/bo'lagini so'raydi - video ko'p kanalda bu yuzlab Range so'rovlari.
+Export har bir video uchun kichik poster (<video>.poster.jpg) yozadi, viewer esa
+faqat posterni ko'rsatadi va video pleerni bosilgandagina yaratadi.
+
+Poster manbai: Telegram dagi cover/thumbnail (alohida kichik fayl, videoni qayta
+o'qimaydi). Thumbnail bo'lmasa va ffmpeg o'rnatilgan bo'lsa - videodan kadr olinadi.
+"""
+
+import asyncio
+import os
+import shutil
+from pathlib import Path
+
+from transcode import largest_thumbnail
+
+VIDEO_POSTERS = os.getenv("VIDEO_POSTERS", "1") == "1"
+
+# Poster yaratiladigan media turlari
+POSTER_MEDIA = frozenset({"video", "video_note", "animation"})
+
+# ffmpeg bilan olinadigan kadr: vaqti (sekund) va kengligi (px)
+FRAME_OFFSET_SECONDS = 1
+FRAME_WIDTH = 640
+
+FFMPEG = shutil.which("ffmpeg")
+
+
+def poster_path(video_path: str) -> Path:
+    path = Path(video_path)
+    return path.with_name(f"{path.stem}.poster.jpg")
+
+
+def best_thumbnail(media_obj):
+    """Telegram dagi eng katta poster manbai: video cover (rasm) yoki thumbnail"""
+    cover = getattr(media_obj, "cover", None)
+    if cover is not None and getattr(cover, "file_id", None):
+        return cover
+    return largest_thumbnail(media_obj)
+
+
+async def extract_frame(video_path: str, target: Path) -> bool:
+    """ffmpeg bilan videodan bitta kadr (qisqa videoda - birinchi kadr)"""
+    if FFMPEG is None:
+        return False
+    for offset in (FRAME_OFFSET_SECONDS, 0):
+        process = await asyncio.create_subprocess_exec(
+            FFMPEG, "-y", "-v", "error", "-ss", str(offset), "-i", video_path,
+            "-frames:v", "1", "-vf", f"scale='min({FRAME_WIDTH},iw)':-2", str(target),
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+        )
+        if await process.wait() == 0 and target.exists() and target.stat().st_size:
+            return True
+    return False
@@ -0,0 +1,143 @@
+"""
+Export progressi - xabarlar soni va media baytlari bo'yicha foiz va ETA
+"""
+
+import time
+from typing import Optional
+
+import humanize
+
+# Progress qatorini chiqarish oralig'i (sekund)
+PROGRESS_REPORT_SECONDS = 10.0
+
+# Tezlikni silliqlash koeffitsienti (EWMA): katta qiymat - yangi o'lchovlarga ko'proq vazn
+RATE_SMOOTHING = 0.3
+
+
+class ExportProgress:
+    """Umumiy xabarlar soni va kutilayotgan/yuklangan media baytlari bo'yicha progress
+
+    ETA oxirgi oraliqlardagi tezlikning eksponensial o'rtachasi bo'yicha hisoblanadi:
+    xabarlar tezligi va media baytlari tezligidan qaysi biri ko'proq vaqt ko'rsatsa,
+    o'sha olinadi (media yuklash odatda asosiy vaqtni oladi).
+    """
+
+    def __init__(self, total_messages: Optional[int] = None, metrics=None,
+                 report_interval: float = PROGRESS_REPORT_SECONDS, smoothing: float = RATE_SMOOTHING):
+        self.total_messages = total_messages
+        self.metrics = metrics
+        self.report_interval = report_interval
+        self.smoothing = smoothing
+
+        self.done_messages = 0
+        self.expected_bytes = 0  # Ko'rilgan xabarlardagi media hajmlari yig'indisi
+        self.completed_bytes = 0  # Haqiqatda yuklab olingan baytlar
+
+        self.started_at = time.monotonic()
+        self._last_sample = (self.started_at, 0, 0)
+        self._last_report = self.started_at
+        self.message_rate: Optional[float] = None  # xabar/s (silliqlangan)
+        self.byte_rate: Optional[float] = None  # bayt/s (silliqlangan)
+
+    def message_done(self, count: int = 1):
+        self.done_messages += count
+        # Taxminiy jami son xato bo'lsa (masalan, API 0 qaytarsa) foiz 100 dan oshmasin
+        if self.total_messages is not None and self.done_messages > self.total_messages:
+            self.total_messages = self.done_messages
+
+    def message_skipped(self, count: int = 1):
+        """Checkpoint dan davom ettirishda o'tkazilgan xabarlar: qolgan ish kamayadi, tezlik o'zgarmaydi"""
+        if self.total_messages is not None:
+            self.total_messages = max(self.done_messages, self.total_messages - count)
+
+    def media_expected(self, size: Optional[int]):
+        if size:
+            self.expected_bytes += size
+
+    def media_failed(self, size: Optional[int]):
+        """Yuklab olinmagan media hajmi kutilgan baytlardan qaytarib olinadi"""
+        if size:
+            self.expected_bytes = max(0, self.expected_bytes - size)
+
+    def media_completed(self, size: Optional[int]):
+        if size:
+            self.completed_bytes += size
+
+    @property
+    def percent(self) -> Optional[float]:
+        if not self.total_messages:
+            return None
+        return min(100.0, self.done_messages / self.total_messages * 100)
+
+    def _smooth(self, previous: Optional[float], sample: float) -> float:
+        if previous is None:
+            return sample
+        return self.smoothing * sample + (1 - self.smoothing) * previous
+
+    def _update_rates(self, now: float):
+        last_time, last_messages, last_bytes = self._last_sample
+        elapsed = now - last_time
+        if elapsed <= 0:
+            return
+        self.message_rate = self._smooth(self.message_rate, (self.done_messages - last_messages) / elapsed)
+        self.byte_rate = self._smooth(self.byte_rate, (self.completed_bytes - last_bytes) / elapsed)
+        self._last_sample = (now, self.done_messages, self.completed_bytes)
+
+    def eta_seconds(self) -> Optional[float]:
+        """Qolgan vaqt taxmini (sekund); ma'lumot yetarli bo'lmasa None"""
+        if not self.total_messages or not self.message_rate:
+            return None
+
+        remaining_messages = max(0, self.total_messages - self.done_messages)
+        eta = remaining_messages / self.message_rate
+
+        # Ko'rilgan xabarlardagi media zichligi bo'yicha qolgan baytlarni taxmin qilish
+        if self.byte_rate and self.done_messages:
+            bytes_per_message = self.expected_bytes / self.done_messages
+            remaining_bytes = (self.expected_bytes - self.completed_bytes) + bytes_per_message * remaining_messages
+            eta = max(eta, remaining_bytes / self.byte_rate)
+        return eta
+
+    def maybe_report(self, force: bool = False) -> Optional[str]:
+        """Oraliq o'tgan bo'lsa progress qatorini chiqaradi va qaytaradi"""
+        now = time.monotonic()
+        if not force and now - self._last_report < self.report_interval:
+            return None
+        self._update_rates(now)
+        self._last_report = now
+
+        line = self.format_line()
+        print(line)
+
+        if self.metrics:
+            eta = self.eta_seconds()
+            self.metrics.set("progress_messages_done", self.done_messages)
+            self.metrics.set("progress_messages_total", self.total_messages or 0)
+            self.metrics.set("progress_media_expected_bytes", self.expected_bytes)
+            self.metrics.set("progress_media_completed_bytes", self.completed_bytes)
+            if self.percent is not None:
+                self.metrics.set("progress_percent", round(self.percent, 3))
+            if eta is not None:
+                self.metrics.set("progress_eta_seconds", round(eta, 1))
+        return line
+
+    def format_line(self) -> str:
+        if self.total_messages:
+            line = f"   ✓ {self.done_messages:,}/{self.total_messages:,} ta xabar ({self.percent:.1f}%)"
+        else:
+            line = f"   ✓ {self.done_messages:,} ta xabar"
+
+        if self.expected_bytes:
+            line += (
+                f" | 📦 {humanize.naturalsize(self.completed_bytes)}"
+                f"/{humanize.naturalsize(self.expected_bytes)}"
+            )
+        if self.message_rate:
+            line += f" | ⚡ {self.message_rate:.1f} xabar/s"
+            if self.byte_rate:
+                line += f", {humanize.naturalsize(self.byte_rate)}/s"
+
+        eta = self.eta_seconds()
+        if eta is not None:
+            line += f" | ⏳ ETA {humanize.precisedelta(int(eta), minimum_unit='seconds', format='%0.0f')}"
+        return line
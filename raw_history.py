@@ -0,0 +1,233 @@
+"""
+Xom MTProto orqali chat tarixini olish - metadata export uchun tezkor yo'l
+
+get_chat_history har bir xabar uchun to'liq pyrogram Message obyektini quradi
+(entity lar, reply/pinned xabarlar uchun qo'shimcha so'rovlar, har xabarga alohida
+Chat/User obyektlari). Bu yerda messages.GetHistory to'g'ridan-to'g'ri chaqiriladi
+va MessageRecord xom TL obyektlardan to'ldiriladi: foydalanuvchi va chatlar har bir
+sahifa uchun bir marta parse qilinadi, media obyektlari esa faqat media bor
+xabarlarda pyrogram ning o'z parserlari bilan yaratiladi (file_id lar bir xil
+bo'lishi uchun). Natija records.MessageRecord.to_dict() bilan get_chat_history
+yo'li bilan bir xil formatda chiqadi.
+"""
+
+import asyncio
+from typing import AsyncIterator, Optional
+
+from pyrogram import Client, enums, raw, types, utils
+from pyrogram.errors import FloodWait
+
+from media_types import MEDIA_BY_ENUM
+from records import MessageRecord, RecordBuilder
+
+# messages.GetHistory bir so'rovda qaytaradigan maksimal xabarlar soni
+RAW_HISTORY_LIMIT = 100
+
+# FloodWait shu qiymatdan kichik bo'lsa pyrogram o'zi kutadi (get_chat_history dagidek)
+RAW_SLEEP_THRESHOLD = 60
+
+
+class _Batch:
+    """Bitta GetHistory javobining users/chats jadvallari va parse qilingan obyektlar keshi"""
+
+    def __init__(self, client: Client, users: dict, chats: dict):
+        self.client = client
+        self.users = users
+        self.chats = chats
+        self._parsed_users: dict[int, Optional[types.User]] = {}
+        self._parsed_chats: dict[tuple, types.Chat] = {}
+
+    def user(self, user_id: Optional[int]) -> Optional[types.User]:
+        if user_id not in self._parsed_users:
+            self._parsed_users[user_id] = types.User._parse(self.client, self.users.get(user_id))
+        return self._parsed_users[user_id]
+
+    def message_chat(self, message, is_chat: bool) -> types.Chat:
+        from_id = utils.get_raw_peer_id(message.from_id)
+        peer_id = utils.get_raw_peer_id(message.peer_id)
+        key = ((peer_id or from_id) if is_chat else (from_id or peer_id), type(message.peer_id))
+        chat = self._parsed_chats.get(key)
+        if chat is None:
+            chat = self._parsed_chats[key] = types.Chat._parse(
+                self.client, message, self.users, self.chats, is_chat=is_chat
+            )
+        return chat
+
+    def channel_chat(self, raw_id: int) -> Optional[types.Chat]:
+        key = (raw_id, None)
+        if key not in self._parsed_chats:
+            self._parsed_chats[key] = types.Chat._parse_channel_chat(self.client, self.chats.get(raw_id))
+        return self._parsed_chats[key]
+
+
+async def _parse_media(client: Client, message, users: dict):
+    """Xom media dan (media_type, media obyekti, media_bor) ni qaytaradi
+
+    Tur tanlash qoidalari pyrogram Message._parse bilan bir xil.
+    """
+    media = message.media
+    if isinstance(media, raw.types.MessageMediaPhoto):
+        return enums.MessageMediaType.PHOTO, types.Photo._parse(client, media.photo, media.ttl_seconds), True
+    if isinstance(media, raw.types.MessageMediaGeo):
+        return enums.MessageMediaType.LOCATION, types.Location._parse(client, media.geo), True
+    if isinstance(media, raw.types.MessageMediaContact):
+        return enums.MessageMediaType.CONTACT, types.Contact._parse(client, media), True
+    if isinstance(media, raw.types.MessageMediaPoll):
+        return enums.MessageMediaType.POLL, await types.Poll._parse(client, media, users), True
+    if isinstance(media, raw.types.MessageMediaDocument):
+        doc = media.document
+        if not isinstance(doc, raw.types.Document):
+            return None, None, True
+
+        attributes = {type(i): i for i in doc.attributes}
+        file_name = getattr(attributes.get(raw.types.DocumentAttributeFilename), "file_name", None)
+
+        if raw.types.DocumentAttributeAnimated in attributes:
+            video_attributes = attributes.get(raw.types.DocumentAttributeVideo)
+            return enums.MessageMediaType.ANIMATION, types.Animation._parse(client, doc, video_attributes, file_name), True
+        if raw.types.DocumentAttributeSticker in attributes:
+            return enums.MessageMediaType.STICKER, await types.Sticker._parse(client, doc, attributes), True
+        if raw.types.DocumentAttributeVideo in attributes:
+            video_attributes = attributes[raw.types.DocumentAttributeVideo]
+            if video_attributes.round_message:
+                return enums.MessageMediaType.VIDEO_NOTE, types.VideoNote._parse(client, doc, video_attributes), True
+            video = types.Video._parse(
+                client, doc, video_attributes, file_name, media.ttl_seconds, media.video_cover, media.video_timestamp
+            )
+            return enums.MessageMediaType.VIDEO, video, True
+        if raw.types.DocumentAttributeAudio in attributes:
+            audio_attributes = attributes[raw.types.DocumentAttributeAudio]
+            if audio_attributes.voice:
+                return enums.MessageMediaType.VOICE, types.Voice._parse(client, doc, audio_attributes), True
+            return enums.MessageMediaType.AUDIO, types.Audio._parse(client, doc, audio_attributes, file_name), True
+        return enums.MessageMediaType.DOCUMENT, types.Document._parse(client, doc, file_name), True
+    if isinstance(media, raw.types.MessageMediaWebPage):
+        if isinstance(media.webpage, (raw.types.WebPage, raw.types.WebPageEmpty)):
+            # Havola ko'rinishi: xabar matni text bo'lib qoladi, caption emas
+            return enums.MessageMediaType.WEB_PAGE_PREVIEW, None, False
+        return None, None, False
+
+    # Qolgan turlar (venue, dice, game, story, ...) uchun faqat tur nomi yoziladi
+    for raw_type, enum_name in _OTHER_MEDIA:
+        if isinstance(media, raw_type):
+            return getattr(enums.MessageMediaType, enum_name, None), None, True
+    if isinstance(media, raw.types.MessageMediaInvoice):
+        return None, None, True  # pyrogram ham invoice uchun media_type ni bo'sh qoldiradi
+    return None, None, False
+
+
+_OTHER_MEDIA = tuple(
+    (getattr(raw.types, raw_name), enum_name)
+    for raw_name, enum_name in (
+        ("MessageMediaVenue", "VENUE"),
+        ("MessageMediaGame", "GAME"),
+        ("MessageMediaGiveaway", "GIVEAWAY"),
+        ("MessageMediaGiveawayResults", "GIVEAWAY_RESULT"),
+        ("MessageMediaStory", "STORY"),
+        ("MessageMediaDice", "DICE"),
+        ("MessageMediaPaidMedia", "PAID_MEDIA"),
+        ("MessageMediaToDo", "TODO"),
+    )
+    if hasattr(raw.types, raw_name)
+)
+
+
+async def build_record(builder: RecordBuilder, batch: _Batch, message) -> MessageRecord:
+    """Xom Message/MessageService dan MessageRecord yaratadi"""
+    chat = batch.message_chat(message, is_chat=True)
+    from_user = batch.user(utils.get_raw_peer_id(message.from_id) or utils.get_raw_peer_id(message.peer_id))
+
+    record = MessageRecord()
+    record.id = message.id
+    record.date = utils.timestamp_to_datetime(message.date)
+    record.chat_id = chat.id
+    record.from_user = builder.user(from_user)
+    record.sender_chat = None
+    if not from_user and chat.type is not enums.ChatType.CHANNEL:
+        record.sender_chat = builder.chat(batch.message_chat(message, is_chat=False))
+    record.media_url = None
+
+    if isinstance(message, raw.types.MessageService):
+        record.text = record.caption = record.media_type = None
+        record.views = record.forwards = record.edit_date = None
+        record.reply_to_message_id = record.forward_from_chat = record.forward_date = None
+        record.media_group_id = None
+        return record
+
+    media_type, media_obj, has_media = (None, None, False)
+    if message.media:
+        media_type, media_obj, has_media = await _parse_media(batch.client, message, batch.users)
+
+    text = message.message or None
+    record.text = None if has_media else text
+    record.caption = text if has_media else None
+    record.media_type = media_type.name if media_type else None
+    record.views = message.views
+    record.forwards = message.forwards
+    record.edit_date = utils.timestamp_to_datetime(message.edit_date)
+    record.media_group_id = message.grouped_id
+
+    reply_to = message.reply_to
+    record.reply_to_message_id = None
+    if isinstance(reply_to, raw.types.MessageReplyHeader):
+        if not reply_to.forum_topic or reply_to.reply_to_top_id:
+            record.reply_to_message_id = reply_to.reply_to_msg_id
+
+    fwd = message.fwd_from
+    record.forward_from_chat = None
+    record.forward_date = utils.timestamp_to_datetime(fwd.date) if fwd else None
+    if fwd and fwd.from_id and not isinstance(fwd.from_id, raw.types.PeerUser):
+        record.forward_from_chat = builder.chat(
+            batch.channel_chat(utils.get_raw_peer_id(fwd.from_id)), with_username=False
+        )
+
+    if media_obj is not None:
+        descriptor = MEDIA_BY_ENUM.get(media_type)
+        if descriptor:
+            record.media = descriptor
+            record.media_values = builder.media_values(descriptor, media_obj)
+    return record
+
+
+class RawHistory:
+    """messages.GetHistory sahifalari bo'yicha MessageRecord lar oqimi (yangi -> eski)"""
+
+    def __init__(self, client: Client, chat_id: str | int, builder: RecordBuilder = None,
+                 limit: int = RAW_HISTORY_LIMIT):
+        self.client = client
+        self.chat_id = chat_id
+        self.builder = builder or RecordBuilder()
+        self.limit = limit
+        self.pages = 0
+
+    async def _get_page(self, peer, offset_id: int):
+        while True:
+            try:
+                return await self.client.invoke(
+                    raw.functions.messages.GetHistory(
+                        peer=peer, offset_id=offset_id, offset_date=0, add_offset=0,
+                        limit=self.limit, max_id=0, min_id=0, hash=0,
+                    ),
+                    sleep_threshold=RAW_SLEEP_THRESHOLD,
+                )
+            except FloodWait as e:
+                print(f"   ⏳ [{self.chat_id}] FloodWait: {e.value} sekund kutilmoqda...")
+                await asyncio.sleep(e.value or 1)
+
+    async def __aiter__(self) -> AsyncIterator[MessageRecord]:
+        peer = await self.client.resolve_peer(self.chat_id)
+        offset_id = 0
+
+        while True:
+            page = await self._get_page(peer, offset_id)
+            messages = getattr(page, "messages", None)
+            if not messages:
+                return
+            self.pages += 1
+
+            batch = _Batch(self.client, {u.id: u for u in page.users}, {c.id: c for c in page.chats})
+            for message in messages:
+                if not isinstance(message, raw.types.MessageEmpty):
+                    yield await build_record(self.builder, batch, message)
+
+            offset_id = messages[-1].id
@@ -0,0 +1,230 @@
+"""
+Ixcham xabar yozuvlari - katta exportlarni kam xotira bilan saqlash uchun
+
+Har bir xabar dict o'rniga __slots__ li MessageRecord sifatida saqlanadi:
+media maydonlari tuple da, foydalanuvchi va chat ma'lumotlari esa bir marta
+yaratilib barcha xabarlar orasida ulashiladi. Takrorlanuvchi qisqa qatorlar
+(media turi, MIME, username) sys.intern orqali bitta nusxada saqlanadi.
+dict ko'rinishiga faqat chiqish paytida (to_dict) o'tkaziladi.
+"""
+
+import sys
+from datetime import datetime
+from typing import Any, Optional
+
+from media_types import MEDIA_BY_ENUM, MediaDescriptor
+
+# intern qilinadigan media maydonlari (ko'p xabarlarda bir xil qiymatga ega)
+_INTERNED_MEDIA_FIELDS = {"mime_type", "emoji", "set_name", "performer"}
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def chat_info(chat) -> dict[str, Any]:
+    """get_chat() natijasidan export sarlavhasidagi chat_info ni yaratadi"""
+    return {
+        "id": chat.id,
+        "title": chat.title or chat.first_name,
+        "username": chat.username,
+        "type": chat.type.name if chat.type else None,
+        "members_count": chat.members_count,
+        "description": chat.description,
+        "linked_chat_id": chat.linked_chat.id if chat.linked_chat else None,
+    }
+
+
+def _forward_info(message) -> tuple:
+    """(forward_from_chat, forward_date)
+
+    Yangi pyrogram versiyalarida forward_from_chat/forward_date eskirgan property lar
+    bo'lib, har chaqiruvda log.warning yozadi - forward_origin bor bo'lsa to'g'ridan-to'g'ri
+    undan o'qiladi.
+    """
+    if "forward_origin" in getattr(message, "__dict__", {}):
+        origin = message.forward_origin
+        if origin is None:
+            return None, None
+        return getattr(origin, "chat", getattr(origin, "sender_chat", None)), origin.date
+    return message.forward_from_chat, message.forward_date
+
+
+class UserRecord:
+    """Xabar yuboruvchi foydalanuvchi (barcha xabarlar uchun bitta nusxa)"""
+
+    __slots__ = ("id", "username", "first_name", "last_name")
+
+    def __init__(self, id: int, username: Optional[str], first_name: Optional[str], last_name: Optional[str]):
+        self.id = id
+        self.username = username
+        self.first_name = first_name
+        self.last_name = last_name
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "username": self.username,
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+        }
+
+
+class ChatRecord:
+    """Sender chat yoki forward manbasi (barcha xabarlar uchun bitta nusxa)"""
+
+    __slots__ = ("id", "title", "username")
+
+    def __init__(self, id: int, title: Optional[str], username: Optional[str] = None):
+        self.id = id
+        self.title = title
+        self.username = username
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"id": self.id, "title": self.title, "username": self.username}
+
+    def to_forward_dict(self) -> dict[str, Any]:
+        return {"id": self.id, "title": self.title}
+
+
+class MessageRecord:
+    """Bitta xabarning ixcham ko'rinishi"""
+
+    __slots__ = (
+        "id", "date", "chat_id", "from_user", "sender_chat", "text", "caption",
+        "media_type", "media", "media_values", "media_url", "views", "forwards",
+        "edit_date", "reply_to_message_id", "forward_from_chat", "forward_date",
+        "media_group_id", "renditions", "poster",
+    )
+
+    def __init__(self):
+        self.media: Optional[MediaDescriptor] = None
+        self.media_values: Optional[tuple] = None
+        self.renditions: Optional[list] = None  # [[yo'l, kenglik, format], ...] (transcode.py)
+        self.poster: Optional[str] = None  # Video poster rasmi yo'li (posters.py)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Eski _serialize_message() bilan bir xil tartibdagi dict"""
+        data = {
+            "id": self.id,
+            "date": _isoformat(self.date),
+            "chat_id": self.chat_id,
+            "from_user": self.from_user.to_dict() if self.from_user else None,
+            "sender_chat": self.sender_chat.to_dict() if self.sender_chat else None,
+            "text": self.text,
+            "caption": self.caption,
+            "media_type": self.media_type,
+            "media_url": self.media_url,  # S3 URL yoki lokal fayl yo'li
+            "local_file": self.media_url,  # Qayta ishlash uchun eski nom (backward compatibility)
+            "views": self.views,
+            "forwards": self.forwards,
+            "edit_date": _isoformat(self.edit_date),
+            "reply_to_message_id": self.reply_to_message_id,
+            "forward_from_chat": self.forward_from_chat.to_forward_dict() if self.forward_from_chat else None,
+            "forward_date": _isoformat(self.forward_date),
+            "media_group_id": self.media_group_id,
+        }
+        if self.media is not None:
+            data[self.media.name] = self.media.to_dict(self.media_values)
+        if self.renditions:
+            data["renditions"] = self.renditions
+        if self.poster:
+            data["poster"] = self.poster
+        return data
+
+
+def album_index(records) -> list[dict[str, Any]]:
+    """Albomlar ro'yxati: tarixda ketma-ket kelgan bir xil media_group_id li xabarlar
+
+    Viewer albomni shu ro'yxat bo'yicha bitta to'r (grid) qilib chizadi.
+    """
+    albums = []
+    current = None
+    for record in records:
+        group_id = record.media_group_id
+        if group_id is None:
+            current = None
+        elif current is not None and current["media_group_id"] == group_id:
+            current["message_ids"].append(record.id)
+        else:
+            current = {"media_group_id": group_id, "message_ids": [record.id]}
+            albums.append(current)
+    return [album for album in albums if len(album["message_ids"]) > 1]
+
+
+class RecordBuilder:
+    """Pyrogram Message obyektlaridan MessageRecord yaratuvchi (user/chat keshi bilan)"""
+
+    def __init__(self):
+        self._users: dict[tuple, UserRecord] = {}
+        self._chats: dict[tuple, ChatRecord] = {}
+        self._interned_indexes: dict[MediaDescriptor, tuple[int, ...]] = {}
+
+    def user(self, user) -> Optional[UserRecord]:
+        if not user:
+            return None
+        key = (user.id, user.username, user.first_name, user.last_name)
+        record = self._users.get(key)
+        if record is None:
+            record = self._users[key] = UserRecord(
+                user.id, _intern(user.username), _intern(user.first_name), _intern(user.last_name)
+            )
+        return record
+
+    def chat(self, chat, with_username: bool = True) -> Optional[ChatRecord]:
+        if not chat:
+            return None
+        username = chat.username if with_username else None
+        key = (chat.id, chat.title, username)
+        record = self._chats.get(key)
+        if record is None:
+            record = self._chats[key] = ChatRecord(chat.id, _intern(chat.title), _intern(username))
+        return record
+
+    def media_values(self, media: MediaDescriptor, media_obj) -> tuple:
+        """Media obyekti qiymatlari (takrorlanuvchi qatorlar intern qilingan)"""
+        values = media.extract(media_obj)
+        indexes = self._interned_indexes.get(media)
+        if indexes is None:
+            indexes = self._interned_indexes[media] = tuple(
+                i for i, name in enumerate(media.field_names) if name in _INTERNED_MEDIA_FIELDS
+            )
+        if indexes:
+            values = list(values)
+            for i in indexes:
+                values[i] = _intern(values[i])
+            values = tuple(values)
+        return values
+
+    def build(self, message, media_url: Optional[str] = None) -> MessageRecord:
+        """Message obyektidan MessageRecord yaratadi"""
+        record = MessageRecord()
+        record.id = message.id
+        record.date = message.date
+        record.chat_id = message.chat.id if message.chat else None
+        record.from_user = self.user(message.from_user)
+        record.sender_chat = self.chat(message.sender_chat)
+        # pyrogram Str (entity lar bilan __dict__) emas - oddiy str saqlanadi
+        record.text = str(message.text) if message.text is not None else None
+        record.caption = str(message.caption) if message.caption is not None else None
+        record.media_type = _intern(message.media.name) if message.media else None
+        record.media_url = media_url
+        record.views = message.views
+        record.forwards = message.forwards
+        record.edit_date = message.edit_date
+        record.reply_to_message_id = message.reply_to_message_id
+        forward_chat, record.forward_date = _forward_info(message)
+        record.forward_from_chat = self.chat(forward_chat, with_username=False)
+        record.media_group_id = message.media_group_id
+
+        if message.media:
+            media = MEDIA_BY_ENUM.get(message.media)
+            media_obj = getattr(message, media.name, None) if media else None
+            if media_obj:
+                record.media = media
+                record.media_values = self.media_values(media, media_obj)
+        return record
@@ -0,0 +1,354 @@
+"""
+Chat tarixini yozib olish va offline qayta ijro etish (record/replay)
+
+Yozib olish rejimi haqiqiy chatning get_chat_history natijalarini (sahifa
+kechikishlari, media hajmlari, albomlar, izoh uzunliklari) ixcham gzip
+fixture fayliga saqlaydi. ReplayClient shu fayldan exporterni Telegramga
+ulanmasdan, yozib olingan vaqtlar bilan ishga tushiradi.
+
+Ishlatish:
+    python replay.py record @durov --limit 20000 --output fixtures/durov.jsonl.gz
+    python benchmark.py --fixture fixtures/durov.jsonl.gz --replay-speed 4
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import asyncio
+import argparse
+import zlib
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Iterator, Optional
+
+from pyrogram.enums import MessageMediaType
+
+from benchmark import BenchConfig, FakeClient, FakeMessage, MEDIA_EXTENSIONS, _Fake
+
+FIXTURE_FORMAT = "tg-history-fixture"
+FIXTURE_VERSION = 1
+
+# Pyrogram get_chat_history bir so'rovda 100 tagacha xabar oladi
+HISTORY_PAGE_SIZE = 100
+
+# Yuklab olinadigan media turlari
+DOWNLOADABLE_KINDS = {
+    "photo", "video", "audio", "document", "voice", "video_note", "sticker", "animation",
+}
+
+
+def _epoch(value: Optional[datetime]) -> Optional[int]:
+    return int(value.timestamp()) if value else None
+
+
+class HistoryRecorder:
+    """get_chat_history natijalarini ixcham fixture fayliga yozib oladi"""
+
+    def __init__(self, client, chat_id: str | int, output_path: Path,
+                 keep_text: bool = False, measure_downloads: bool = False):
+        self.client = client
+        self.chat_id = chat_id
+        self.output_path = Path(output_path)
+        self.keep_text = keep_text
+        self.measure_downloads = measure_downloads
+        self.total_messages = 0
+
+    def _encode_text(self, entry: dict, key: str, value: Optional[str]):
+        """Matnni saqlaydi yoki (standart) faqat uzunligini yozadi"""
+        if not value:
+            return
+        if self.keep_text:
+            entry[key] = str(value)
+        else:
+            entry[key + "l"] = len(value)
+
+    def _encode_message(self, message) -> dict[str, Any]:
+        """Message ni qisqa kalitli dict ga o'tkazadi (None qiymatlar tashlab yuboriladi)"""
+        entry = {"id": message.id, "d": _epoch(message.date)}
+        self._encode_text(entry, "t", message.text)
+        self._encode_text(entry, "c", message.caption)
+
+        optional = {
+            "g": message.media_group_id,
+            "r": message.reply_to_message_id,
+            "v": message.views,
+            "f": message.forwards,
+            "e": _epoch(message.edit_date),
+            "u": message.from_user.id if message.from_user else None,
+            "sc": 1 if message.sender_chat else None,
+        }
+        entry.update({k: v for k, v in optional.items() if v is not None})
+
+        if not message.media:
+            return entry
+
+        kind = message.media.name.lower()
+        entry["k"] = kind
+        media = getattr(message, kind, None)
+        if kind in DOWNLOADABLE_KINDS and media:
+            file_name = getattr(media, "file_name", None)
+            details = {
+                "uid": media.file_unique_id,
+                "s": getattr(media, "file_size", None),
+                "m": getattr(media, "mime_type", None),
+                "x": os.path.splitext(file_name)[1] if file_name else None,
+                "w": getattr(media, "width", None),
+                "h": getattr(media, "height", None),
+                "ln": getattr(media, "length", None),  # video_note: diametri (px)
+                "du": getattr(media, "duration", None),
+            }
+            entry.update({k: v for k, v in details.items() if v is not None})
+        elif kind == "poll" and media:
+            entry["po"] = len(media.options or [])
+        return entry
+
+    async def _measure_download(self, message) -> Optional[float]:
+        """Media ni diskka yozmasdan yuklab olib, sarflangan vaqtni qaytaradi"""
+        started = time.perf_counter()
+        try:
+            async for _ in self.client.stream_media(message):
+                pass
+        except Exception as e:
+            print(f"   ⚠️ Yuklab olish vaqtini o'lchashda xato (message {message.id}): {e}")
+            return None
+        return round(time.perf_counter() - started, 4)
+
+    async def record(self, limit: int = 0):
+        """Chat tarixini fixture fayliga yozib oladi"""
+        chat = await self.client.get_chat(self.chat_id)
+        header = {
+            "format": FIXTURE_FORMAT,
+            "version": FIXTURE_VERSION,
+            "recorded_at": datetime.now().isoformat(),
+            "page_size": HISTORY_PAGE_SIZE,
+            "keep_text": self.keep_text,
+            "chat": {
+                "id": chat.id,
+                "title": chat.title or chat.first_name,
+                "username": chat.username,
+                "type": chat.type.name if chat.type else None,
+                "members_count": chat.members_count,
+            },
+        }
+
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(self.output_path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps(header, ensure_ascii=False) + "\n")
+
+            page, page_wait = [], 0.0
+            history = self.client.get_chat_history(self.chat_id, limit=limit)
+            while True:
+                started = time.perf_counter()
+                try:
+                    message = await history.__anext__()
+                except StopAsyncIteration:
+                    break
+                page_wait += time.perf_counter() - started
+
+                entry = self._encode_message(message)
+                if self.measure_downloads and entry.get("k") in DOWNLOADABLE_KINDS:
+                    entry["dt"] = await self._measure_download(message)
+                page.append(entry)
+                self.total_messages += 1
+
+                if len(page) >= HISTORY_PAGE_SIZE:
+                    self._write_page(f, page, page_wait)
+                    page, page_wait = [], 0.0
+                    print(f"   ✓ {self.total_messages} ta xabar yozib olindi...")
+
+            if page:
+                self._write_page(f, page, page_wait)
+
+        print(f"✅ Fixture saqlandi: {self.output_path} ({self.total_messages} ta xabar)")
+
+    @staticmethod
+    def _write_page(f, messages: list[dict], latency: float):
+        f.write(json.dumps({"l": round(latency, 4), "m": messages}, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def read_fixture(path: str | Path) -> tuple[dict, Iterator[dict]]:
+    """Fixture faylidan header va sahifalar iteratorini qaytaradi"""
+
+    def pages() -> Iterator[dict]:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            next(f)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+    if header.get("format") != FIXTURE_FORMAT:
+        raise ValueError(f"Noma'lum fixture formati: {path}")
+    return header, pages()
+
+
+class ReplayClient(FakeClient):
+    """Yozib olingan fixture dan xabarlarni real vaqtlar bilan qaytaruvchi client"""
+
+    def __init__(self, config: BenchConfig, fixture_path: str | Path, speed: float = 1.0):
+        super().__init__(config)
+        self.fixture_path = Path(fixture_path)
+        self.speed = speed if speed > 0 else 1.0
+        self.header, pages = read_fixture(self.fixture_path)
+        self.total_messages = sum(len(page["m"]) for page in pages)
+        self._users: dict[int, _Fake] = {}
+
+        info = self.header.get("chat", {})
+        self.chat.id = info.get("id", self.chat.id)
+        self.chat.title = info.get("title") or self.chat.title
+        self.chat.username = info.get("username")
+        self.chat.members_count = info.get("members_count")
+
+    async def get_chat_history_count(self, chat_id) -> int:
+        return self.total_messages
+
+    async def get_chat_history(self, chat_id, limit: int = 0, offset_id: int = 0):
+        """Fixture dagi sahifalarni yozib olingan kechikishlar bilan qaytaradi"""
+        _, pages = read_fixture(self.fixture_path)
+        yielded = 0
+
+        for page in pages:
+            started = time.perf_counter()
+            self.pages += 1
+            if page.get("l"):
+                await asyncio.sleep(page["l"] / self.speed)
+
+            messages = [
+                self._decode_message(entry)
+                for entry in page["m"]
+                if not offset_id or entry["id"] < offset_id
+            ]
+            self.fetch_samples.append(time.perf_counter() - started)
+
+            for message in messages:
+                if limit and yielded >= limit:
+                    return
+                yielded += 1
+                yield message
+
+    def _user(self, user_id: int) -> _Fake:
+        if user_id not in self._users:
+            self._users[user_id] = _Fake(
+                id=user_id, username=f"user{user_id}", first_name="User", last_name=str(user_id)
+            )
+        return self._users[user_id]
+
+    @staticmethod
+    def _text(entry: dict, key: str) -> Optional[str]:
+        if key in entry:
+            return entry[key]
+        length = entry.get(key + "l")
+        return ("x" * length) if length else None
+
+    def _decode_message(self, entry: dict) -> FakeMessage:
+        """Fixture yozuvidan FakeMessage yaratadi"""
+        message = FakeMessage(
+            _client=self,
+            id=entry["id"],
+            date=datetime.fromtimestamp(entry["d"]) if entry.get("d") else None,
+            edit_date=datetime.fromtimestamp(entry["e"]) if entry.get("e") else None,
+            chat=self.chat,
+            text=self._text(entry, "t"),
+            caption=self._text(entry, "c"),
+            media_group_id=entry.get("g"),
+            reply_to_message_id=entry.get("r"),
+            views=entry.get("v"),
+            forwards=entry.get("f"),
+            from_user=self._user(entry["u"]) if "u" in entry else None,
+            sender_chat=self.chat if entry.get("sc") else None,
+        )
+
+        kind = entry.get("k")
+        if not kind:
+            return message
+
+        try:
+            message.media = MessageMediaType[kind.upper()]
+        except KeyError:
+            return message
+
+        if kind in DOWNLOADABLE_KINDS:
+            default_ext, default_mime = MEDIA_EXTENSIONS.get(kind, (".bin", "application/octet-stream"))
+            ext = entry.get("x") or default_ext
+            unique_id = entry.get("uid") or f"r{kind}{entry['id']}"
+            media = _Fake(
+                file_id=f"{kind}_{entry['id']}",
+                file_unique_id=unique_id,
+                file_size=entry.get("s") or 1,
+                file_name=f"{kind}_{entry['id']}{ext}" if entry.get("x") else None,
+                mime_type=entry.get("m") or default_mime,
+                width=entry.get("w"),
+                height=entry.get("h"),
+                length=entry.get("ln"),
+                duration=entry.get("du"),
+                _ext=ext,
+                _dt=entry.get("dt"),
+                # Kontent ID si (benchmark._media_chunk): bir xil fayl - bir xil baytlar
+                _content=zlib.crc32(unique_id.encode()),
+            )
+        elif kind == "poll":
+            options = [_Fake(text=f"Variant {i + 1}", voter_count=0) for i in range(entry.get("po", 2))]
+            media = _Fake(id=str(entry["id"]), question="So'rovnoma", options=options,
+                          total_voter_count=0, is_closed=True)
+        elif kind == "location":
+            media = _Fake(latitude=41.311081, longitude=69.240562)
+        elif kind == "contact":
+            media = _Fake(phone_number="+998000000000", first_name="Kontakt", last_name=None, user_id=None)
+        else:
+            media = _Fake(url="https://example.com", title="Sahifa", description=None, site_name=None)
+
+        setattr(message, kind, media)
+        return message
+
+    def _transfer_delay(self, message: FakeMessage, media: _Fake) -> float:
+        """Yozib olingan yuklab olish vaqti (bo'lmasa - sozlangan tezlik)"""
+        if media._dt:
+            return media._dt / self.speed
+        return super()._transfer_delay(message, media)
+
+
+async def _record(args: argparse.Namespace):
+    from telegram_client import create_client
+
+    chat_id = args.chat
+    if chat_id.lstrip("-").isdigit():
+        chat_id = int(chat_id)
+
+    safe_name = str(args.chat).replace("@", "").replace("/", "_")
+    output = Path(args.output or f"fixtures/{safe_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl.gz")
+
+    print(f"🎙️ Chat tarixi yozib olinmoqda: {args.chat}")
+    async with create_client() as client:
+        recorder = HistoryRecorder(
+            client, chat_id, output,
+            keep_text=args.keep_text,
+            measure_downloads=args.measure_downloads,
+        )
+        await recorder.record(limit=args.limit)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Chat tarixini yozib olish (replay uchun)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    record = sub.add_parser("record", help="Chat tarixini fixture fayliga yozib olish")
+    record.add_argument("chat", help="Chat username yoki ID")
+    record.add_argument("--output", help="Fixture fayli (standart: fixtures/<chat>_<vaqt>.jsonl.gz)")
+    record.add_argument("--limit", type=int, default=0, help="Maksimal xabarlar soni (0 - hammasi)")
+    record.add_argument("--keep-text", action="store_true", help="Matnlarni saqlash (standart: faqat uzunligi)")
+    record.add_argument(
+        "--measure-downloads", action="store_true",
+        help="Media ni yuklab olib (diskka yozmasdan) haqiqiy yuklash vaqtini yozib olish",
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "record":
+        asyncio.run(_record(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,523 @@
+"""
+Export fayllarini saqlash joylari - S3 (Backblaze B2), lokal disk va asyncio S3
+
+Exporter fayllarni to'g'ridan-to'g'ri backblaze.upload_to_b2() orqali emas,
+Storage interfeysi orqali saqlaydi:
+
+    put(key, file_path)      - faylni saqlash, (muvaffaqiyat, url) qaytaradi
+    put_stream(key, chunks)  - bayt bo'laklari oqimini saqlash (hajmi oldindan noma'lum)
+    get(key)                 - kichik obyekt (masalan, checkpoint.json) baytlari, yo'q bo'lsa None
+    exists(key)              - obyekt bormi
+    list(prefix)             - prefix bilan boshlanadigan kalitlar (async iterator)
+    list_sizes(prefix)       - o'sha kalitlar hajmi bilan: (kalit, bayt)
+    url_for(key)             - obyekt uchun ochiq URL
+
+Backend har bir ishga tushirish uchun STORAGE_BACKEND (.env) yoki
+TelegramExporter(storage=...) orqali tanlanadi:
+
+    s3        - boto3 (backblaze.py), standart
+    s3-async  - aiobotocore (pip install aiobotocore), event loop bloklanmaydi
+    local     - STORAGE_LOCAL_DIR papkasi (internetsiz export, test)
+"""
+
+import abc
+import asyncio
+import functools
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator, Iterable, Optional
+
+from dotenv import load_dotenv
+
+import backblaze
+from backblaze import SMALL_UPLOAD_CONCURRENCY, is_small_object
+from hashing import FileDigest
+
+load_dotenv()
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3")
+STORAGE_LOCAL_DIR = os.getenv("STORAGE_LOCAL_DIR", "storage")
+
+# put_stream bo'laklari shu hajmga yetganda multipart qism sifatida yuboriladi (S3 minimumi 5 MB)
+STREAM_PART_BYTES = 16 * 1024 * 1024
+
+# Fayllarni o'qish bo'lagi (s3-async da katta fayllar uchun)
+READ_CHUNK_BYTES = 1024 * 1024
+
+UPLOAD_RETRIES = 3
+
+
+def _is_not_found(error: Exception) -> bool:
+    """head_object xatosi 'obyekt yo'q' ni bildiradimi"""
+    if isinstance(error, FileNotFoundError):
+        return True
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code in ("404", "NoSuchKey", "NotFound")
+
+
+async def _aiter(chunks: AsyncIterable[bytes] | Iterable[bytes]) -> AsyncIterator[bytes]:
+    """Oddiy va async iterable larni bir xil ko'rinishga keltiradi"""
+    if hasattr(chunks, "__aiter__"):
+        async for chunk in chunks:
+            yield chunk
+    else:
+        for chunk in chunks:
+            yield chunk
+
+
+async def _read_file(file_path: str) -> AsyncIterator[bytes]:
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, READ_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+class Storage(abc.ABC):
+    """Saqlash joyi interfeysi - backend lar abstrakt metodlarning hammasini amalga oshiradi"""
+
+    name = "storage"
+    # Exporter bir vaqtda nechta kichik faylni fonda yuklashi mumkin
+    max_concurrency = SMALL_UPLOAD_CONCURRENCY
+
+    async def warm_up(self) -> bool:
+        """Ulanish/bucket tekshiruvi - startupda Telegram ulanishi bilan parallel chaqiriladi"""
+        return True
+
+    @abc.abstractmethod
+    async def put(self, key: str, file_path: str, metrics=None,
+                  checksum: Optional[FileDigest] = None) -> tuple[bool, Optional[str]]:
+        """Faylni yuklaydi; checksum - yuklab olishda hisoblangan xeshlar (server tekshiradi)"""
+
+    @abc.abstractmethod
+    async def put_stream(self, key: str, chunks: AsyncIterable[bytes] | Iterable[bytes],
+                         metrics=None) -> tuple[bool, Optional[str]]:
+        """Bayt bo'laklari oqimini yuklaydi (hajmi oldindan noma'lum)"""
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """Obyektni to'liq o'qiydi (faqat kichik fayllar uchun); yo'q bo'lsa None"""
+
+    @abc.abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Obyekt bormi"""
+
+    @abc.abstractmethod
+    def list(self, prefix: str = "") -> AsyncIterator[str]:
+        """prefix bilan boshlanadigan kalitlar"""
+
+    @abc.abstractmethod
+    def list_sizes(self, prefix: str = "") -> AsyncIterator[tuple[str, int]]:
+        """Kalitlar va hajmlari - S3 da bitta ListObjectsV2 o'tishi (har bir obyektga HEAD so'rovisiz)"""
+
+    @abc.abstractmethod
+    def url_for(self, key: str) -> str:
+        """Obyekt uchun ochiq URL"""
+
+    async def close(self):
+        pass
+
+
+class LocalStorage(Storage):
+    """Lokal papka - fayllar hard link (bo'lmasa nusxa) orqali joylanadi"""
+
+    name = "local"
+
+    def __init__(self, root: str | Path = STORAGE_LOCAL_DIR, base_url: Optional[str] = None):
+        self.root = Path(root).resolve()
+        self.base_url = (base_url or self.root.as_uri()).rstrip("/")
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root):
+            raise ValueError(f"Kalit saqlash papkasidan tashqariga chiqadi: {key}")
+        return path
+
+    async def warm_up(self) -> bool:
+        self.root.mkdir(parents=True, exist_ok=True)
+        return True
+
+    def _place(self, target: Path, file_path: str) -> int:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if target.exists():
+            if target.samefile(file_path):
+                return target.stat().st_size
+            target.unlink()
+        try:
+            os.link(file_path, target)
+        except OSError:
+            # Boshqa disk yoki hard link qo'llab-quvvatlanmaydi
+            shutil.copyfile(file_path, target)
+        return target.stat().st_size
+
+    async def put(self, key: str, file_path: str, metrics=None,
+                  checksum: Optional[FileDigest] = None) -> tuple[bool, Optional[str]]:
+        started = time.perf_counter()
+        try:
+            size = await asyncio.to_thread(self._place, self._path(key), file_path)
+        except (OSError, ValueError) as e:
+            print(f"   ❌ Lokal saqlashda xato ({key}): {e}")
+            if metrics:
+                metrics.inc("upload_failures_total")
+            return False, None
+
+        if metrics:
+            metrics.observe("upload_seconds", time.perf_counter() - started)
+            metrics.inc("upload_bytes_total", size)
+        return True, self.url_for(key)
+
+    async def put_stream(self, key: str, chunks, metrics=None) -> tuple[bool, Optional[str]]:
+        started = time.perf_counter()
+        size = 0
+        part = None
+        try:
+            target = self._path(key)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            part = target.with_name(target.name + ".part")
+            with open(part, "wb") as f:
+                async for chunk in _aiter(chunks):
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(part, target)
+        except (OSError, ValueError) as e:
+            if part is not None:
+                part.unlink(missing_ok=True)
+            print(f"   ❌ Lokal saqlashda xato ({key}): {e}")
+            if metrics:
+                metrics.inc("upload_failures_total")
+            return False, None
+
+        if metrics:
+            metrics.observe("upload_seconds", time.perf_counter() - started)
+            metrics.inc("upload_bytes_total", size)
+        return True, self.url_for(key)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await asyncio.to_thread(self._path(key).read_bytes)
+        except FileNotFoundError:
+            return None
+
+    async def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    async def list(self, prefix: str = "") -> AsyncIterator[str]:
+        async for key, _ in self.list_sizes(prefix):
+            yield key
+
+    async def list_sizes(self, prefix: str = "") -> AsyncIterator[tuple[str, int]]:
+        for path in sorted(self.root.rglob("*")):
+            if path.is_file() and not path.name.endswith(".part"):
+                key = path.relative_to(self.root).as_posix()
+                if key.startswith(prefix):
+                    yield key, path.stat().st_size
+
+    def url_for(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+
+class _S3Storage(Storage):
+    """S3 API ustidagi umumiy amallar; _call() backend ga qarab thread yoki coroutine orqali chaqiradi"""
+
+    bucket_name: str
+
+    @abc.abstractmethod
+    async def _call(self, method: str, **kwargs):
+        """boto3/aiobotocore klient metodini chaqirish"""
+
+    async def exists(self, key: str) -> bool:
+        try:
+            await self._call("head_object", Bucket=self.bucket_name, Key=key)
+        except Exception as e:
+            if _is_not_found(e):
+                return False
+            raise
+        return True
+
+    async def list(self, prefix: str = "") -> AsyncIterator[str]:
+        async for key, _ in self.list_sizes(prefix):
+            yield key
+
+    async def list_sizes(self, prefix: str = "") -> AsyncIterator[tuple[str, int]]:
+        kwargs = {"Bucket": self.bucket_name, "Prefix": prefix}
+        while True:
+            page = await self._call("list_objects_v2", **kwargs)
+            for item in page.get("Contents", ()):
+                yield item["Key"], item["Size"]
+            if not page.get("IsTruncated"):
+                return
+            kwargs["ContinuationToken"] = page["NextContinuationToken"]
+
+    async def _upload_stream(self, key: str, chunks, checksum: Optional[FileDigest] = None) -> int:
+        """Oqimni yuklash: kichik bo'lsa bitta put_object, aks holda multipart (STREAM_PART_BYTES qismlar)"""
+        buffer = bytearray()
+        upload_id = None
+        parts = []
+        size = 0
+
+        async def flush_part():
+            nonlocal upload_id
+            if upload_id is None:
+                response = await self._call(
+                    "create_multipart_upload", Bucket=self.bucket_name, Key=key, ContentType=backblaze.content_type(key),
+                    **backblaze.checksum_args(checksum, multipart=True),
+                )
+                upload_id = response["UploadId"]
+            number = len(parts) + 1
+            response = await self._call(
+                "upload_part", Bucket=self.bucket_name, Key=key, UploadId=upload_id,
+                PartNumber=number, Body=bytes(buffer),
+            )
+            parts.append({"PartNumber": number, "ETag": response["ETag"]})
+            buffer.clear()
+
+        try:
+            async for chunk in _aiter(chunks):
+                buffer += chunk
+                size += len(chunk)
+                if len(buffer) >= STREAM_PART_BYTES:
+                    await flush_part()
+
+            if upload_id is None:
+                await self._call(
+                    "put_object", Bucket=self.bucket_name, Key=key, Body=bytes(buffer),
+                    ContentType=backblaze.content_type(key), **backblaze.checksum_args(checksum),
+                )
+                return size
+
+            if buffer:
+                await flush_part()
+            await self._call(
+                "complete_multipart_upload", Bucket=self.bucket_name, Key=key, UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+            return size
+        except BaseException:
+            if upload_id is not None:
+                try:
+                    await self._call("abort_multipart_upload", Bucket=self.bucket_name, Key=key, UploadId=upload_id)
+                except Exception:
+                    pass
+            raise
+
+    async def put_stream(self, key: str, chunks, metrics=None) -> tuple[bool, Optional[str]]:
+        started = time.perf_counter()
+        try:
+            size = await self._upload_stream(key, chunks)
+        except Exception as e:
+            print(f"   ❌ S3 ga oqim bilan yuklashda xato ({key}): {e}")
+            if metrics:
+                metrics.inc("upload_failures_total")
+            return False, None
+
+        if metrics:
+            metrics.observe("upload_seconds", time.perf_counter() - started)
+            metrics.inc("upload_bytes_total", size)
+        return True, self.url_for(key)
+
+
+class S3Storage(_S3Storage):
+    """boto3 (Backblaze B2) - backblaze.py dagi client, retry va multipart sozlamalari
+
+    boto3 sinxron, shuning uchun so'rovlar alohida thread poolda bajariladi.
+    """
+
+    name = "s3"
+
+    def __init__(self, max_concurrency: int = SMALL_UPLOAD_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="s3-upload")
+
+    @property
+    def bucket_name(self) -> str:
+        return backblaze._get_s3_client()[1]
+
+    async def _run(self, func, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def _call(self, method: str, **kwargs):
+        def call():
+            s3, _, _ = backblaze._get_s3_client()
+            return getattr(s3, method)(**kwargs)
+
+        return await self._run(call)
+
+    async def warm_up(self) -> bool:
+        return await asyncio.to_thread(backblaze.warm_up)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        def call():
+            s3, bucket_name, _ = backblaze._get_s3_client()
+            try:
+                return s3.get_object(Bucket=bucket_name, Key=key)["Body"].read()
+            except Exception as e:
+                if _is_not_found(e):
+                    return None
+                raise
+
+        return await self._run(call)
+
+    async def put(self, key: str, file_path: str, metrics=None,
+                  checksum: Optional[FileDigest] = None) -> tuple[bool, Optional[str]]:
+        return await self._run(
+            backblaze.upload_to_b2, str(file_path), object_name=key, metrics=metrics, checksum=checksum
+        )
+
+    def url_for(self, key: str) -> str:
+        _, _, base_url = backblaze._get_s3_client()
+        return f"{base_url}/{key}"
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class AsyncS3Storage(_S3Storage):
+    """aiobotocore asosidagi S3 client - so'rovlar event loop da, threadlarsiz
+
+    Sozlamalar S3Storage bilan bir xil (.env dagi B2_* o'zgaruvchilar).
+    """
+
+    name = "s3-async"
+
+    def __init__(self, max_concurrency: int = SMALL_UPLOAD_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._client = None
+        self._client_context = None
+        self._client_lock = asyncio.Lock()
+        self._bucket_name = None
+        self.base_url = None
+
+    @property
+    def bucket_name(self) -> str:
+        if self._bucket_name is None:
+            self._bucket_name = backblaze._s3_settings()[3]
+        return self._bucket_name
+
+    async def _get_client(self):
+        if self._client is not None:
+            return self._client
+
+        async with self._client_lock:
+            if self._client is None:
+                endpoint_url, access_key, secret_key, bucket_name = backblaze._s3_settings()
+                try:
+                    from aiobotocore.config import AioConfig
+                    from aiobotocore.session import get_session
+                except ImportError:
+                    raise ValueError("s3-async uchun aiobotocore kerak: pip install aiobotocore") from None
+
+                self._client_context = get_session().create_client(
+                    "s3",
+                    endpoint_url=endpoint_url,
+                    aws_access_key_id=access_key,
+                    aws_secret_access_key=secret_key,
+                    config=AioConfig(max_pool_connections=backblaze.S3_MAX_POOL_CONNECTIONS, tcp_keepalive=True),
+                )
+                self._client = await self._client_context.__aenter__()
+                self._bucket_name = bucket_name
+                self.base_url = backblaze._public_base_url(endpoint_url, bucket_name)
+        return self._client
+
+    async def _call(self, method: str, **kwargs):
+        client = await self._get_client()
+        return await getattr(client, method)(**kwargs)
+
+    async def warm_up(self) -> bool:
+        try:
+            client = await self._get_client()
+            await client.head_bucket(Bucket=self.bucket_name)
+        except ValueError as e:
+            print(f"   ❌ {e}")
+            return False
+        except Exception as e:
+            print(f"   ⚠️ Bucket tekshiruvida xato: {e}")
+            return False
+        print(f"   ✅ S3 client muvaffaqiyatli yaratildi (Bucket: {self.bucket_name})")
+        return True
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            response = await self._call("get_object", Bucket=self.bucket_name, Key=key)
+        except Exception as e:
+            if _is_not_found(e):
+                return None
+            raise
+        async with response["Body"] as body:
+            return await body.read()
+
+    async def put(self, key: str, file_path: str, metrics=None,
+                  checksum: Optional[FileDigest] = None) -> tuple[bool, Optional[str]]:
+        started = time.perf_counter()
+        for attempt in range(UPLOAD_RETRIES):
+            if attempt > 0 and metrics:
+                metrics.inc("upload_retries_total")
+            try:
+                if is_small_object(file_path):
+                    data = await asyncio.to_thread(Path(file_path).read_bytes)
+                    await self._call(
+                        "put_object", Bucket=self.bucket_name, Key=key, Body=data,
+                        ContentType=backblaze.content_type(key), **backblaze.checksum_args(checksum),
+                    )
+                    size = len(data)
+                else:
+                    size = await self._upload_stream(key, _read_file(file_path), checksum)
+            except FileNotFoundError:
+                print(f"   ❌ Xato: Fayl topilmadi: {file_path}")
+                if metrics:
+                    metrics.inc("upload_failures_total")
+                return False, None
+            except ValueError as e:
+                print(f"   ❌ {e}")
+                if metrics:
+                    metrics.inc("upload_failures_total")
+                return False, None
+            except Exception as e:
+                if attempt == UPLOAD_RETRIES - 1:
+                    print(f"   ❌ S3 ga yuklashda xato ({UPLOAD_RETRIES} marta urinildi): {e}")
+                    if metrics:
+                        metrics.inc("upload_failures_total")
+                    return False, None
+                print(f"   ⚠️ Xato (urinish {attempt + 1}/{UPLOAD_RETRIES}): {e}")
+                await asyncio.sleep(2 ** attempt)
+                continue
+
+            if metrics:
+                metrics.observe("upload_seconds", time.perf_counter() - started)
+                metrics.inc("upload_bytes_total", size)
+            return True, self.url_for(key)
+        return False, None
+
+    def url_for(self, key: str) -> str:
+        if self.base_url is None:
+            endpoint_url, _, _, bucket_name = backblaze._s3_settings()
+            self.base_url = backblaze._public_base_url(endpoint_url, bucket_name)
+        return f"{self.base_url}/{key}"
+
+    async def close(self):
+        if self._client_context is not None:
+            await self._client_context.__aexit__(None, None, None)
+            self._client = self._client_context = None
+
+
+STORAGE_BACKENDS = {
+    "s3": S3Storage,
+    "s3-async": AsyncS3Storage,
+    "local": LocalStorage,
+}
+
+
+def create_storage(backend: Optional[str] = None) -> Storage:
+    """Nomi bo'yicha saqlash joyini yaratadi (standart: STORAGE_BACKEND)"""
+    backend = (backend or STORAGE_BACKEND).strip().lower()
+    try:
+        return STORAGE_BACKENDS[backend]()
+    except KeyError:
+        raise ValueError(
+            f"Noma'lum STORAGE_BACKEND: {backend!r} (mumkin: {', '.join(STORAGE_BACKENDS)})"
+        ) from None
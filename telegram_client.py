@@ -0,0 +1,36 @@
+"""
+Telegram client yaratish - API kalitlari import paytida emas, client kerak bo'lganda o'qiladi
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SESSION_NAME = "my_account"
+
+# pyrogram bir vaqtda faqat shuncha get_file/save_file bajaradi (standart 1) - parallel
+# segmentlar va albom fayllari haqiqatan parallel yuklanishi uchun oshiriladi
+MAX_CONCURRENT_TRANSMISSIONS = int(os.getenv("MAX_CONCURRENT_TRANSMISSIONS", "8"))
+
+
+def get_api_credentials() -> tuple[int, str]:
+    """.env dagi API_ID va API_HASH ni qaytaradi"""
+    api_id = os.getenv("API_ID")
+    api_hash = os.getenv("API_HASH")
+    if not api_id or not api_hash:
+        raise ValueError("API_ID va API_HASH .env faylida ko'rsatilmagan")
+    try:
+        return int(api_id), api_hash
+    except ValueError:
+        raise ValueError(f"API_ID raqam bo'lishi kerak: {api_id!r}") from None
+
+
+def create_client(name: str = SESSION_NAME, **kwargs):
+    """Pyrogram Client yaratadi (ulanmaydi - ulanish async with yoki start() da)"""
+    from pyrogram import Client
+
+    api_id, api_hash = get_api_credentials()
+    kwargs.setdefault("max_concurrent_transmissions", MAX_CONCURRENT_TRANSMISSIONS)
+    return Client(name, api_id=api_id, api_hash=api_hash, **kwargs)
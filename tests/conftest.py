@@ -0,0 +1,8 @@
+"""
+Testlar uchun umumiy sozlamalar - loyiha modullari (flat) repo ildizidan import qilinadi
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
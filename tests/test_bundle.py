@@ -0,0 +1,89 @@
+"""
+ExportBundle: oqim bilan yozilgan ZIP zipfile bilan ochiladi, chala fayllar arxivga kirmaydi
+"""
+
+import asyncio
+import zipfile
+
+import pytest
+
+import bundle
+from bundle import ExportBundle
+from storage import LocalStorage
+
+
+@pytest.fixture
+def export_dir(tmp_path):
+    root = tmp_path / "chat"
+    (root / "photos").mkdir(parents=True)
+    (root / "videos").mkdir()
+    (root / "photos" / "photo_1.jpg").write_bytes(b"\xff\xd8jpeg" * 1000)
+    (root / "videos" / "video_1.mp4").write_bytes(bytes(range(256)) * 500)
+    # downloader.py qoldiqlari - yuklab olish hali tugamagan
+    (root / "videos" / "video_2.mp4.part").write_bytes(b"partial")
+    (root / "videos" / "video_2.mp4.part.json").write_text('{"offset": 7}')
+    (root / "chat_data.json").write_text('{"messages": []}' * 100)
+    return root
+
+
+def _check_archive(path, export_dir):
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        names = sorted(zf.namelist())
+        assert names == ["chat/chat_data.json", "chat/photos/photo_1.jpg", "chat/videos/video_1.mp4"]
+        for name in names:
+            assert zf.read(name) == (export_dir / name.split("/", 1)[1]).read_bytes()
+        # Media siqilmaydi, JSON deflate bilan
+        assert zf.getinfo("chat/videos/video_1.mp4").compress_type == zipfile.ZIP_STORED
+        assert zf.getinfo("chat/chat_data.json").compress_type == zipfile.ZIP_DEFLATED
+
+
+async def _build(target: ExportBundle, export_dir):
+    target.start()
+    target.add_tree(export_dir, ("photos", "videos"))
+    # Takroriy qo'shish arxivga ikkinchi yozuv qo'shmaydi
+    target.add(export_dir / "photos" / "photo_1.jpg", "photos/photo_1.jpg")
+    target.add(export_dir / "chat_data.json", "chat_data.json")
+    return await target.close()
+
+
+def test_local_bundle(tmp_path, export_dir):
+    archive = tmp_path / "chat.zip"
+    location = asyncio.run(_build(ExportBundle("chat", local_path=archive), export_dir))
+
+    assert location == str(archive)
+    assert not archive.with_name("chat.zip.part").exists()
+    _check_archive(archive, export_dir)
+
+
+def test_streamed_bundle(tmp_path, export_dir, monkeypatch):
+    # Kichik bo'laklar - oqim bir nechta put_stream bo'lagiga bo'linadi
+    monkeypatch.setattr(bundle, "BUNDLE_CHUNK_BYTES", 1024)
+    storage = LocalStorage(tmp_path / "storage", base_url="http://localhost/files")
+
+    async def scenario():
+        await storage.warm_up()
+        target = ExportBundle("chat", storage=storage, key="chat/chat.zip")
+        location = await _build(target, export_dir)
+        return location, target
+
+    location, target = asyncio.run(scenario())
+    archive = tmp_path / "storage" / "chat" / "chat.zip"
+    assert location == "http://localhost/files/chat/chat.zip"
+    assert target.files == 3 and target.size == archive.stat().st_size
+    _check_archive(archive, export_dir)
+
+
+def test_missing_file_is_skipped(tmp_path, export_dir):
+    archive = tmp_path / "chat.zip"
+
+    async def scenario():
+        target = ExportBundle("chat", local_path=archive)
+        target.start()
+        target.add(export_dir / "photos" / "deleted.jpg", "photos/deleted.jpg")
+        target.add(export_dir / "chat_data.json", "chat_data.json")
+        return await target.close()
+
+    assert asyncio.run(scenario()) == str(archive)
+    with zipfile.ZipFile(archive) as zf:
+        assert zf.namelist() == ["chat/chat_data.json"]
@@ -0,0 +1,129 @@
+"""
+ResumableDownloader: uzilishdan keyin davom ettirilgan yuklash bir xil baytlar va to'g'ri SHA-256 beradi
+"""
+
+import asyncio
+import hashlib
+import os
+import zlib
+from types import SimpleNamespace
+
+import pytest
+
+import downloader
+from downloader import ResumableDownloader
+
+CHUNK = 16
+DATA = os.urandom(CHUNK * 37 + 5)  # oxirgi bo'lak to'liq emas
+
+
+class FakeStreamClient:
+    """stream_media(offset, limit) - DATA ni CHUNK bo'laklarida beradi
+
+    drop_at dagi bo'lak indeksiga yetganda (bir marta) ulanish uziladi: OSError yoki jim to'xtash.
+    """
+
+    def __init__(self, drop_at=(), silent=False, always_fail=False):
+        self.drop_at = set(drop_at)
+        self.silent = silent
+        self.always_fail = always_fail
+        self.requested: list[int] = []
+
+    async def stream_media(self, message, offset=0, limit=0):
+        self.requested.append(offset)
+        end = offset + limit if limit > 0 else -(-len(DATA) // CHUNK)
+        for index in range(offset, end):
+            if index in self.drop_at:
+                if not self.always_fail:
+                    self.drop_at.discard(index)
+                if self.silent:
+                    return
+                raise OSError(f"connection lost at chunk {index}")
+            # Parallel oqimlar navbatma-navbat ishlasin - bo'laklar tartibsiz keladi
+            await asyncio.sleep(0)
+            yield DATA[index * CHUNK:(index + 1) * CHUNK]
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(downloader, "CHUNK_SIZE", CHUNK)
+    monkeypatch.setattr(downloader, "SEGMENT_CHUNKS", 4)
+    monkeypatch.setattr(downloader, "PARALLEL_MIN_BYTES", 1)
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    """Qayta urinishlar orasidagi kutishni o'tkazib yuborish"""
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay, *args):
+        await real_sleep(0)
+
+    monkeypatch.setattr(downloader.asyncio, "sleep", sleep)
+
+
+def _media(file_size=len(DATA)):
+    return SimpleNamespace(file_id="x", file_unique_id="AgAD-test", file_name="video.mp4",
+                           mime_type="video/mp4", file_size=file_size)
+
+
+def _assert_complete(path, digest):
+    assert open(path, "rb").read() == DATA
+    assert digest.size == len(DATA)
+    assert digest.sha256 == hashlib.sha256(DATA).hexdigest()
+    assert digest.crc32 == zlib.crc32(DATA)
+    assert not os.path.exists(path + ".part") and not os.path.exists(path + ".part.json")
+
+
+@pytest.mark.parametrize("silent", [False, True])
+def test_download_reconnects_mid_segment(tmp_path, no_backoff, silent):
+    client = FakeStreamClient(drop_at={6, 21}, silent=silent)
+    path, digest = asyncio.run(ResumableDownloader(client).download(object(), "video", _media(), tmp_path))
+
+    _assert_complete(path, digest)
+    # Uzilgan segment boshidan emas, oxirgi yozilgan bo'lakdan davom etadi
+    assert 6 in client.requested and 21 in client.requested
+
+
+def test_download_resumes_after_restart(tmp_path, no_backoff, monkeypatch):
+    monkeypatch.setattr(downloader, "CONNECTIONS_PER_FILE", 1)
+    monkeypatch.setattr(downloader, "CHUNK_RETRIES", 1)
+    broken = FakeStreamClient(drop_at={18}, always_fail=True)
+    with pytest.raises(OSError):
+        asyncio.run(ResumableDownloader(broken).download(object(), "video", _media(), tmp_path))
+    assert (tmp_path / "video.mp4.part").exists() and (tmp_path / "video.mp4.part.json").exists()
+
+    client = FakeStreamClient()
+    path, digest = asyncio.run(ResumableDownloader(client).download(object(), "video", _media(), tmp_path))
+
+    _assert_complete(path, digest)
+    # 0-3 segmentlar (0-15 bo'laklar) oldingi ishga tushirishda tugagan - qayta so'ralmaydi
+    assert min(client.requested) == 16
+
+
+def test_download_discards_part_of_other_file(tmp_path):
+    (tmp_path / "video.mp4.part").write_bytes(b"\0" * len(DATA))
+    (tmp_path / "video.mp4.part.json").write_text(
+        '{"file_unique_id": "other", "file_size": %d, "chunk_size": %d, "segment_chunks": 4, "done_segments": [0, 1]}'
+        % (len(DATA), CHUNK)
+    )
+    client = FakeStreamClient()
+    path, digest = asyncio.run(ResumableDownloader(client).download(object(), "video", _media(), tmp_path))
+
+    _assert_complete(path, digest)
+    assert 0 in client.requested
+
+
+def test_fetch_reconnects(tmp_path, no_backoff):
+    client = FakeStreamClient(drop_at={3})
+    path, digest = asyncio.run(ResumableDownloader(client).fetch(object(), "video", _media(), tmp_path))
+
+    _assert_complete(path, digest)
+    assert client.requested == [0, 3]
+
+
+def test_short_stream_is_rejected(tmp_path):
+    client = FakeStreamClient()
+    with pytest.raises(OSError):
+        asyncio.run(ResumableDownloader(client).fetch(object(), "video", _media(len(DATA) + 1), tmp_path))
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,58 @@
+"""
+Kontent dedup: katalog faqat saqlash joyiga haqiqatda yuklangan obyektlarga ishora qiladi
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+
+import pytest
+
+import exporter
+from benchmark import BenchConfig, FakeClient
+from storage import LocalStorage
+
+BASE_URL = "http://localhost/files"
+
+
+class FlakyStorage(LocalStorage):
+    """Har to'rtinchi put() muvaffaqiyatsiz - takroriy fayllar yuklanmagan obyektga ishora qilmasligi kerak"""
+
+    def __init__(self, root):
+        super().__init__(root, base_url=BASE_URL)
+        self.puts = 0
+
+    async def put(self, key, file_path, metrics=None, checksum=None):
+        self.puts += 1
+        await asyncio.sleep(0.001)
+        if self.puts % 4 == 1:
+            return False, None
+        return await super().put(key, file_path, metrics, checksum)
+
+
+@pytest.fixture
+def export(tmp_path, monkeypatch):
+    monkeypatch.setattr(exporter, "DOWNLOAD_MEDIA", True)
+    monkeypatch.setattr(exporter, "EXPORT_BUNDLE", "")
+    config = BenchConfig(messages=90, duplicate_every=3, page_latency_ms=0, s3_latency_ms=0)
+    storage = FlakyStorage(tmp_path / "storage")
+    exp = exporter.TelegramExporter(
+        -1001234567890, output_dir=str(tmp_path / "export"), client=FakeClient(config), storage=storage
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(exp.export())
+    return exp, storage
+
+
+def test_catalog_only_lists_stored_objects(export):
+    exp, storage = export
+    checkpoint = json.loads(exp.checkpoint_file.read_text(encoding="utf-8"))
+
+    assert exp.stats.duplicate_files > 0
+    assert storage.puts >= 4  # kamida bitta yuklash muvaffaqiyatsiz bo'lgan
+    for entry in checkpoint.get("media_catalog", {}).values():
+        assert (storage.root / exp.chat_folder_name / entry["object"]).is_file(), entry
+    for url in checkpoint.get("processed_media", {}).values():
+        assert url.startswith(BASE_URL)
+        assert (storage.root / url[len(BASE_URL) + 1:]).is_file(), url
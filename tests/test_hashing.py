@@ -0,0 +1,82 @@
+"""
+ChunkHasher: tartibsiz kelgan bo'laklar ham fayl tartibidagi SHA-256/CRC32 ni beradi
+"""
+
+import asyncio
+import hashlib
+import os
+import random
+import zlib
+
+import pytest
+
+from hashing import ChunkHasher, file_digest
+
+CHUNK = 64
+DATA = os.urandom(CHUNK * 50 + 17)
+CHUNKS = [DATA[i:i + CHUNK] for i in range(0, len(DATA), CHUNK)]
+
+
+@pytest.fixture
+def part(tmp_path):
+    path = tmp_path / "file.part"
+    with open(path, "wb") as f:
+        f.truncate(len(DATA))
+    return path
+
+
+def _write(path, index):
+    with open(path, "r+b") as f:
+        f.seek(index * CHUNK)
+        f.write(CHUNKS[index])
+
+
+def _assert_digest(digest):
+    assert digest.size == len(DATA)
+    assert digest.sha256 == hashlib.sha256(DATA).hexdigest()
+    assert digest.crc32 == zlib.crc32(DATA)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_out_of_order_chunks(part, seed):
+    order = list(range(len(CHUNKS)))
+    random.Random(seed).shuffle(order)
+    hasher = ChunkHasher(part, CHUNK)
+
+    async def scenario():
+        for index in order:
+            # Downloader kabi: avval faylga yoziladi, keyin xeshga qo'shiladi
+            _write(part, index)
+            if hasher.add(index, CHUNKS[index]):
+                await hasher.catch_up()
+        await hasher.catch_up()
+
+    asyncio.run(scenario())
+    _assert_digest(hasher.digest())
+
+
+def test_resumed_chunks_read_from_file(part):
+    # Oldingi ishga tushirishda yozilgan bo'laklar (masalan, 10-19) fayldan o'qiladi
+    written = range(10, 20)
+    for index in written:
+        _write(part, index)
+    hasher = ChunkHasher(part, CHUNK)
+    hasher.add_written(written)
+    assert hasher.next_chunk == 0
+
+    async def scenario():
+        for index in [i for i in range(len(CHUNKS)) if i not in written]:
+            _write(part, index)
+            if hasher.add(index, CHUNKS[index]):
+                await hasher.catch_up()
+
+    asyncio.run(scenario())
+    _assert_digest(hasher.digest())
+
+
+def test_file_digest(tmp_path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(DATA)
+    digest = file_digest(path)
+    _assert_digest(digest)
+    assert digest.to_dict()["crc32"] == digest.crc32_b64
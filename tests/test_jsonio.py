@@ -0,0 +1,68 @@
+"""
+jsonio: orjson va standart json backend lari bir xil JSON chiqaradi
+"""
+
+import json
+
+import pytest
+
+import jsonio
+
+HEADER = {"chat_info": {"id": -100123, "title": "Guruh — Тест \U0001F600"}, "export_date": "2026-01-02T03:04:05"}
+MESSAGES = [
+    {"id": 1, "text": "salom </script> \"qo'shtirnoq\"\n", "media": None, "views": 0},
+    {"id": 2, "text": "", "reactions": [], "entities": {}, "ratio": 0.5, "flags": [True, False]},
+    {"id": 3, "album": [{"type": "PHOTO", "path": "photos/a.jpg"}, {"type": "VIDEO", "path": "videos/b.mp4"}]},
+]
+TRAILER = {"total_messages": len(MESSAGES)}
+
+BACKENDS = ["orjson", "json"]
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(jsonio, "orjson", None)
+    return request.param
+
+
+def _expected(pretty: bool) -> bytes:
+    document = {**HEADER, "messages": MESSAGES, **TRAILER}
+    if pretty:
+        return json.dumps(document, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+@pytest.mark.parametrize("pretty", [False, True])
+def test_dumps_matches_stdlib(backend, pretty):
+    for obj in (HEADER, MESSAGES, [], {}, "matn", 42):
+        if pretty:
+            expected = json.dumps(obj, ensure_ascii=False, indent=2)
+        else:
+            expected = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+        assert jsonio.dumps(obj, pretty) == expected.encode("utf-8")
+
+
+@pytest.mark.parametrize("pretty", [False, True])
+def test_document_writer_matches_whole_object(backend, pretty):
+    data = jsonio.encode_document(HEADER, "messages", iter(MESSAGES), pretty, TRAILER)
+    assert data == _expected(pretty)
+
+
+@pytest.mark.parametrize("pretty", [False, True])
+def test_empty_document(backend, pretty):
+    data = jsonio.encode_document(HEADER, "messages", [], pretty)
+    assert json.loads(data) == {**HEADER, "messages": []}
+
+
+def test_backends_agree(monkeypatch):
+    pytest.importorskip("orjson")
+    fast = jsonio.encode_document(HEADER, "messages", MESSAGES, True, TRAILER)
+    monkeypatch.setattr(jsonio, "orjson", None)
+    assert jsonio.encode_document(HEADER, "messages", MESSAGES, True, TRAILER) == fast
+
+
+def test_script_safe():
+    assert jsonio.script_safe('{"t":"</script>"}') == '{"t":"<\\/script>"}'
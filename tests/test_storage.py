@@ -0,0 +1,148 @@
+"""
+Storage backend lari: lokal papka va boto3 S3 (benchmark dagi LocalS3Client ustida)
+"""
+
+import asyncio
+
+import pytest
+
+import backblaze
+import storage
+from benchmark import LocalS3Client
+from hashing import file_digest
+
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "source" / "photo.jpg"
+    path.parent.mkdir()
+    path.write_bytes(b"\xff\xd8" + bytes(range(256)) * 40)
+    return path
+
+
+@pytest.fixture
+def s3_client(tmp_path, monkeypatch):
+    client = LocalS3Client(tmp_path / "s3")
+    monkeypatch.setattr(backblaze, "_s3_client", client)
+    monkeypatch.setattr(backblaze, "_bucket_name", "test")
+    monkeypatch.setattr(backblaze, "_base_url", "http://localhost/test")
+    monkeypatch.setattr(backblaze, "_bucket_checked", False)
+    return client
+
+
+def test_storage_is_abstract():
+    with pytest.raises(TypeError):
+        storage.Storage()
+
+    class Incomplete(storage.Storage):
+        async def put(self, key, file_path, metrics=None, checksum=None):
+            return True, key
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_local_put_list_and_url(tmp_path, source):
+    target = storage.LocalStorage(tmp_path / "storage", base_url="http://localhost/files")
+
+    async def scenario():
+        await target.warm_up()
+        ok, url = await target.put("chat/photos/photo.jpg", str(source))
+        assert ok and url == "http://localhost/files/chat/photos/photo.jpg"
+        assert await target.exists("chat/photos/photo.jpg")
+        assert not await target.exists("chat/photos/other.jpg")
+
+        ok, _ = await target.put_stream("chat/chat_data.json", [b'{"a":', b"1}"])
+        assert ok
+        # Tugallanmagan oqim fayli ro'yxatga kirmaydi
+        (tmp_path / "storage" / "chat" / "export.zip.part").write_bytes(b"partial")
+        return await _collect(target.list_sizes("chat/"))
+
+    sizes = asyncio.run(scenario())
+    assert sizes == [
+        ("chat/chat_data.json", 7),
+        ("chat/photos/photo.jpg", source.stat().st_size),
+    ]
+    assert (tmp_path / "storage" / "chat" / "photos" / "photo.jpg").read_bytes() == source.read_bytes()
+
+
+def test_local_rejects_keys_outside_root(tmp_path, source):
+    target = storage.LocalStorage(tmp_path / "storage")
+    ok, url = asyncio.run(target.put("../escape.jpg", str(source)))
+    assert (ok, url) == (False, None)
+    assert not (tmp_path / "escape.jpg").exists()
+
+
+def test_s3_put_verifies_checksum(s3_client, source):
+    target = storage.S3Storage()
+
+    async def scenario():
+        assert await target.warm_up()
+        ok, url = await target.put("chat/photos/photo.jpg", str(source), checksum=file_digest(str(source)))
+        exists = await target.exists("chat/photos/photo.jpg")
+        missing = await target.exists("chat/photos/other.jpg")
+        sizes = await _collect(target.list_sizes("chat/"))
+        await target.close()
+        return ok, url, exists, missing, sizes
+
+    ok, url, exists, missing, sizes = asyncio.run(scenario())
+    assert ok and url == "http://localhost/test/chat/photos/photo.jpg"
+    assert exists and not missing
+    assert sizes == [("chat/photos/photo.jpg", source.stat().st_size)]
+    assert s3_client.verified_checksums == 1
+
+
+@pytest.mark.parametrize("part_bytes", [1024 * 1024, 100])
+def test_s3_put_stream_single_and_multipart(s3_client, monkeypatch, part_bytes):
+    monkeypatch.setattr(storage, "STREAM_PART_BYTES", part_bytes)
+    chunks = [bytes([i]) * 64 for i in range(10)]
+    target = storage.S3Storage()
+
+    async def scenario():
+        ok, _ = await target.put_stream("chat/export.zip", chunks)
+        await target.close()
+        return ok
+
+    assert asyncio.run(scenario())
+    assert (s3_client.root / "test" / "chat" / "export.zip").read_bytes() == b"".join(chunks)
+    assert not s3_client._multipart
+
+
+def test_s3_put_stream_aborts_failed_multipart(s3_client, monkeypatch):
+    monkeypatch.setattr(storage, "STREAM_PART_BYTES", 100)
+    target = storage.S3Storage()
+
+    def chunks():
+        yield b"x" * 150
+        raise OSError("disk read failed")
+
+    async def scenario():
+        result = await target.put_stream("chat/export.zip", chunks())
+        await target.close()
+        return result
+
+    assert asyncio.run(scenario()) == (False, None)
+    assert not s3_client._multipart
+    assert not (s3_client.root / "test" / "chat" / "export.zip").exists()
+
+
+def test_get_reads_small_objects(tmp_path, s3_client, source):
+    local = storage.LocalStorage(tmp_path / "storage")
+    remote = storage.S3Storage()
+
+    async def scenario():
+        results = []
+        for target in (local, remote):
+            await target.warm_up()
+            await target.put("chat/checkpoint.json", str(source))
+            results.append((await target.get("chat/checkpoint.json"), await target.get("chat/missing.json")))
+        await remote.close()
+        return results
+
+    for data, missing in asyncio.run(scenario()):
+        assert data == source.read_bytes()
+        assert missing is None
@@ -0,0 +1,142 @@
+"""
+Rasmlarning viewer uchun kichraytirilgan WebP/AVIF nusxalari (renditions)
+
+Viewer rasmlarni asl hajmida yuklaydi: 4 MB li JPEG 400px kenglikdagi kartochkada
+ham to'liq yuklanadi. IMAGE_RENDITIONS=1 bo'lsa har bir rasm va stiker uchun
+IMAGE_RENDITION_WIDTHS kengliklarida WebP (Pillow AVIF ni qo'llasa AVIF ham)
+nusxalar yaratiladi, viewer esa <picture> + srcset orqali ekranga mosini tanlaydi.
+Animatsiyali WebP/GIF dan birinchi kadr - statik ko'rinish olinadi.
+
+Pillow ochmaydigan animatsiyali stikerlar (.tgs/.webm) va GIF (mp4) uchun statik
+ko'rinish Telegram thumbnail idan (GIF da - video posteridan) xuddi shu nomlar bilan yaratiladi.
+
+Kodlash CPU ni ko'p band qiladi, shuning uchun ProcessPoolExecutor da bajariladi -
+event loop (yuklab olish/yuklash) to'xtab qolmaydi. Pillow o'rnatilmagan bo'lsa
+(`pip install pillow`) bosqich o'tkazib yuboriladi, asl fayllar avvalgidek ishlatiladi.
+Pillow faqat nusxalar yoqilganda import qilinadi - `import exporter` uni yuklamaydi.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+IMAGE_RENDITIONS = os.getenv("IMAGE_RENDITIONS", "0") == "1"
+
+# Nusxalar kengliklari (px); asl rasmdan katta kenglik yaratilmaydi
+IMAGE_RENDITION_WIDTHS = tuple(
+    int(width) for width in os.getenv("IMAGE_RENDITION_WIDTHS", "320,640,1280").split(",") if width.strip()
+)
+
+# Kodlash jarayonlari soni (standart: CPU yadrolari soni)
+TRANSCODE_WORKERS = int(os.getenv("TRANSCODE_WORKERS", "0")) or os.cpu_count() or 1
+
+# Shu turdagi media uchun nusxalar yaratiladi
+RENDITION_MEDIA = frozenset({"photo", "sticker"})
+
+# Fayli Pillow da ochilmasa statik ko'rinish thumbnail/posterdan olinadigan media
+PREVIEW_MEDIA = frozenset({"sticker", "animation"})
+
+# Pillow ochadigan kengaytmalar (.tgs/.webm stikerlar - Lottie/video, ular o'tkazib yuboriladi)
+RENDITION_EXTENSIONS = frozenset({".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tiff"})
+
+WEBP_QUALITY = 80
+AVIF_QUALITY = 55
+AVIF_SPEED = 8  # libavif standarti (6) ~10 marta sekinroq, hajm farqi kichik
+
+
+def largest_thumbnail(media_obj):
+    """Media ning eng katta Telegram thumbnail i (statik ko'rinish manbai)"""
+    thumbs = getattr(media_obj, "thumbs", None) or []
+    return max(thumbs, key=lambda thumb: (thumb.width or 0) * (thumb.height or 0), default=None)
+
+
+def rendition_formats() -> tuple[str, ...]:
+    """Yaratiladigan formatlar (AVIF - Pillow libavif bilan yig'ilgan bo'lsa)"""
+    try:
+        from PIL import features
+    except ImportError:
+        return ()
+    if features.check("avif"):
+        return "avif", "webp"
+    return ("webp",)
+
+
+def make_renditions(source: str, widths: tuple[int, ...], formats: tuple[str, ...],
+                    stem: Optional[str] = None) -> list[list]:
+    """Rasm nusxalarini source yoniga yozadi: [[fayl_nomi, kenglik, format], ...]
+
+    stem - nusxalar nomi (standart: source nomi; thumbnail/posterdan olinganda - asl fayl nomi).
+    Alohida jarayonda ishlaydi (ProcessPoolExecutor), shuning uchun modul darajasida.
+    """
+    from PIL import Image
+
+    source_path = Path(source)
+    stem = stem or source_path.stem
+    results = []
+    with Image.open(source_path) as image:
+        # Animatsiyali WebP/GIF - birinchi kadr (statik ko'rinish)
+        image.seek(0)
+        frame = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    original_width = frame.width
+    targets = sorted({min(width, original_width) for width in widths})
+    for width in targets:
+        height = max(1, round(frame.height * width / original_width))
+        resized = frame if width == original_width else frame.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            name = f"{stem}.{width}w.{fmt}"
+            if fmt == "avif":
+                resized.save(source_path.with_name(name), "AVIF", quality=AVIF_QUALITY, speed=AVIF_SPEED)
+            else:
+                resized.save(source_path.with_name(name), "WEBP", quality=WEBP_QUALITY, method=4)
+            results.append([name, width, fmt])
+    return results
+
+
+class ImageTranscoder:
+    """make_renditions() ni jarayonlar havzasida chaqiruvchi (havza birinchi rasmda ochiladi)"""
+
+    def __init__(self, workers: int = TRANSCODE_WORKERS):
+        self.workers = workers
+        self._formats: Optional[tuple[str, ...]] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Navbatdagi rasmlar soni cheklangan - yuklab olish kodlashdan juda o'zib ketmaydi
+        self.slots = asyncio.Semaphore(workers * 2)
+
+    @property
+    def formats(self) -> tuple[str, ...]:
+        """Formatlar birinchi murojaatda aniqlanadi (Pillow shu yerda import qilinadi)"""
+        if self._formats is None:
+            self._formats = rendition_formats()
+        return self._formats
+
+    @property
+    def enabled(self) -> bool:
+        return bool(IMAGE_RENDITION_WIDTHS and self.formats)
+
+    def supports(self, media_name: str, file_path: str) -> bool:
+        return media_name in RENDITION_MEDIA and Path(file_path).suffix.lower() in RENDITION_EXTENSIONS
+
+    def needs_preview(self, media_name: str, file_path: str) -> bool:
+        """Faylning o'zi ochilmaydi - statik ko'rinish thumbnail/posterdan (.tgs/.webm stiker, GIF)"""
+        return media_name in PREVIEW_MEDIA and not self.supports(media_name, file_path)
+
+    async def renditions(self, file_path: str, stem: Optional[str] = None) -> list[list]:
+        """Nusxalarni yaratadi; xato bo'lsa (buzilgan rasm) bo'sh ro'yxat"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._pool, make_renditions, file_path, IMAGE_RENDITION_WIDTHS, self.formats, stem
+            )
+        except Exception as e:
+            print(f"   ⚠️ Rasm nusxalarini yaratib bo'lmadi ({Path(file_path).name}): {e}")
+            return []
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
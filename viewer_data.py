@@ -0,0 +1,199 @@
+"""
+Web viewer uchun bo'laklangan ma'lumotlar va indekslar
+
+Butun xabarlar ro'yxatini index.html ichiga joylash millionlab xabarli exportlarda
+brauzerni to'xtatib qo'yadi. write_viewer_data() xabarlarni (eski -> yangi tartibda)
+VIEWER_CHUNK_MESSAGES tadan data/messages_NNNNN.js fayllariga yozadi, index.html ga
+esa faqat kichik indeks joylanadi. Bo'laklar JSONP ko'rinishida (viewerChunk(n, {...})):
+<script> orqali yuklanadi, shuning uchun file:// da ham, S3 da ham fetch siz ishlaydi.
+
+Indeks:
+- chunks: [birinchi_id, oxirgi_id, xabarlar_soni] - ID lar o'suvchi, shuning uchun
+  istalgan ID ning bo'lagi binar qidiruv bilan topiladi (bo'lak ichida - Map)
+- days / months: [sana, birinchi_id, bo'lak, xabarlar_soni] - sanaga sakrash va
+  sana ajratgichlari uchun (har bir xabar uchun sanani formatlash shart emas)
+- senders / sender_shards: yuboruvchilar jadvali (data/senders.js - id, nom, username,
+  xabarlar soni, birinchi/oxirgi sana) va har bir yuboruvchining xabar ID lari
+  (data/sender_ids_NNN.js, yuboruvchi ID si bo'yicha bo'lingan) - faqat kerak
+  bo'lganda yuklanadi, sender bo'yicha filtr barcha xabarlarni ko'rib chiqmaydi
+- har bir bo'lakda replies (javob -> ota xabarning qisqa ko'rinishi, ota boshqa
+  bo'lakda bo'lsa ham) va children (ota -> javoblar ID lari)
+Albom a'zolari bitta bo'lakda qoladi.
+"""
+
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+import jsonio
+from records import MessageRecord
+
+# Bitta bo'lakdagi xabarlar soni (albom oxirigacha oshishi mumkin)
+VIEWER_CHUNK_MESSAGES = int(os.getenv("VIEWER_CHUNK_MESSAGES", "1000"))
+
+# Bo'lak fayllari papkasi (export papkasiga nisbatan)
+VIEWER_DATA_DIR = "data"
+
+# Reply ko'rinishidagi matn uzunligi
+REPLY_PREVIEW_CHARS = 100
+
+# Bitta sender_ids_NNN.js faylidagi taxminiy xabar ID lari soni
+SENDER_SHARD_MESSAGES = 100_000
+
+
+def chunk_file_name(index: int) -> str:
+    return f"{VIEWER_DATA_DIR}/messages_{index:05d}.js"
+
+
+def sender_name(record: MessageRecord) -> str:
+    """Viewer dagi renderMessage() bilan bir xil yuboruvchi nomi"""
+    user = record.from_user
+    if user:
+        name = f"{user.first_name or ''} {user.last_name or ''}".strip()
+        return name or user.username or "Anonymous"
+    if record.sender_chat:
+        return record.sender_chat.title or "Anonymous"
+    return "Anonymous"
+
+
+def sender_key(record: MessageRecord) -> Optional[int]:
+    """Yuboruvchi ID si (foydalanuvchi yoki kanal/guruh nomidan yozilgan xabarlarda chat)"""
+    if record.from_user:
+        return record.from_user.id
+    if record.sender_chat:
+        return record.sender_chat.id
+    return None
+
+
+def reply_preview(record: MessageRecord) -> dict[str, Any]:
+    """Ota xabarning reply uchun qisqa ko'rinishi"""
+    text = record.text or record.caption or ""
+    return {
+        "id": record.id,
+        "sender": sender_name(record),
+        "text": text[:REPLY_PREVIEW_CHARS],
+        "media_type": record.media_type,
+    }
+
+
+def split_chunks(records: Sequence[MessageRecord], size: int = VIEWER_CHUNK_MESSAGES) -> Iterator[tuple[int, int]]:
+    """[start, end) oraliqlari; albom bo'lak chegarasida bo'linmaydi"""
+    start = 0
+    while start < len(records):
+        end = min(start + size, len(records))
+        while end < len(records) and records[end].media_group_id is not None \
+                and records[end].media_group_id == records[end - 1].media_group_id:
+            end += 1
+        yield start, end
+        start = end
+
+
+def write_viewer_data(records: Sequence[MessageRecord], output_dir: Path,
+                      to_dict: Callable[[MessageRecord], dict]) -> dict[str, Any]:
+    """Bo'lak fayllarini yozadi va index.html ga joylanadigan indeksni qaytaradi
+
+    to_dict - MessageRecord dan viewer uchun dict (media URL lari nisbiy qilingan).
+    """
+    by_id = {record.id: record for record in records}
+    children: dict[int, list[int]] = defaultdict(list)
+    for record in records:
+        if record.reply_to_message_id is not None:
+            children[record.reply_to_message_id].append(record.id)
+
+    data_dir = output_dir / VIEWER_DATA_DIR
+    data_dir.mkdir(parents=True, exist_ok=True)
+    for stale in data_dir.glob("*.js"):
+        stale.unlink()
+
+    chunks = []
+    days: dict[str, list] = {}
+    for index, (start, end) in enumerate(split_chunks(records)):
+        part = records[start:end]
+        replies = {}
+        chunk_children = {}
+        for record in part:
+            if record.date is not None:
+                day = record.date.date().isoformat()
+                if day in days:
+                    days[day][3] += 1
+                else:
+                    days[day] = [day, record.id, index, 1]
+            parent = by_id.get(record.reply_to_message_id) if record.reply_to_message_id is not None else None
+            if parent is not None:
+                replies[str(record.id)] = reply_preview(parent)
+            if record.id in children:
+                chunk_children[str(record.id)] = children[record.id]
+
+        with open(output_dir / chunk_file_name(index), "wb") as f:
+            f.write(b"viewerChunk(" + str(index).encode() + b",")
+            jsonio.write_document(f, {}, "messages", (to_dict(record) for record in part),
+                                  trailer={"replies": replies, "children": chunk_children})
+            f.write(b");\n")
+        chunks.append([part[0].id, part[-1].id, len(part)])
+
+    # Sanaga sakrash binar qidiruvi uchun sana bo'yicha tartiblangan
+    day_list = sorted(days.values())
+    return {
+        "chunks": chunks,
+        "days": day_list,
+        "months": month_buckets(day_list),
+        **write_sender_index(records, output_dir),
+    }
+
+
+def write_sender_index(records: Sequence[MessageRecord], output_dir: Path) -> dict[str, int]:
+    """data/senders.js va data/sender_ids_NNN.js ni yozadi"""
+    senders: dict[int, list] = {}
+    ids: dict[int, list[int]] = defaultdict(list)
+    for record in records:
+        key = sender_key(record)
+        if key is None:
+            continue
+        date = record.date.isoformat() if record.date else None
+        entry = senders.get(key)
+        if entry is None:
+            username = record.from_user.username if record.from_user else record.sender_chat.username
+            senders[key] = [key, sender_name(record), username, 1, date, date]
+        else:
+            entry[3] += 1
+            if date:
+                entry[4] = min(entry[4] or date, date)
+                entry[5] = max(entry[5] or date, date)
+        ids[key].append(record.id)
+
+    # Ko'p yozganlar birinchi (viewer ro'yxati shu tartibda)
+    table = sorted(senders.values(), key=lambda entry: -entry[3])
+    with open(output_dir / VIEWER_DATA_DIR / "senders.js", "wb") as f:
+        f.write(b"viewerSenders(" + jsonio.dumps(table) + b");\n")
+
+    shards = max(1, -(-len(records) // SENDER_SHARD_MESSAGES))
+    buckets: list[dict[str, list[int]]] = [{} for _ in range(shards)]
+    for key, message_ids in ids.items():
+        buckets[key % shards][str(key)] = message_ids
+    for shard, bucket in enumerate(buckets):
+        with open(output_dir / sender_ids_file_name(shard), "wb") as f:
+            f.write(b"viewerSenderIds(" + str(shard).encode() + b"," + jsonio.dumps(bucket) + b");\n")
+
+    return {"senders": len(table), "sender_shards": shards}
+
+
+def sender_ids_file_name(shard: int) -> str:
+    return f"{VIEWER_DATA_DIR}/sender_ids_{shard:03d}.js"
+
+
+def month_buckets(days: list[list]) -> list[list]:
+    """Kunlik bo'limlardan oylik bo'limlar ([YYYY-MM, birinchi_id, bo'lak, soni])"""
+    months: list[list] = []
+    for day, first_id, chunk, count in days:
+        month = day[:7]
+        if months and months[-1][0] == month:
+            months[-1][3] += count
+        else:
+            months.append([month, first_id, chunk, count])
+    return months
+
+
+def viewer_data_paths(output_dir: Path) -> list[Path]:
+    """Yozilgan bo'lak va indeks fayllari (yuklash va ZIP uchun)"""
+    return sorted((output_dir / VIEWER_DATA_DIR).glob("*.js"))